@@ -0,0 +1,106 @@
+"""
+Cache de Análises de Arquivos 3D
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import BinaryIO, Dict, Optional
+
+from mesh_parser import CHUNK_SIZE
+
+
+def file_hash(uploaded_file: BinaryIO) -> str:
+    """Hash BLAKE2 do conteúdo do arquivo, lido em blocos"""
+    hasher = hashlib.blake2b(digest_size=20)
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+
+    while True:
+        bloco = uploaded_file.read(CHUNK_SIZE)
+        if not bloco:
+            break
+        hasher.update(bloco)
+
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+class AnalysisCache:
+    """Cache em disco das análises, com despejo LRU por tamanho total
+
+    Cada análise é gravada como JSON comprimido (gzip); o horário de
+    modificação do arquivo marca o último acesso.
+    """
+
+    def __init__(self, diretorio: str, limite_mb: float):
+        self.diretorio = diretorio
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def key(self, hash_arquivo: str, formato: str, versao: int, nome_arquivo: str = '',
+            unidade: str = 'auto') -> str:
+        """Chave do cache: conteúdo do arquivo + nome + formato + unidade + versão do analisador
+
+        O nome entra na chave porque nomes, tipos e acessórios dos componentes
+        dependem dele (peças sem nome, projetos estimados pelo nome); a
+        unidade escolhida no envio muda todas as medidas.
+        """
+        nome = hashlib.blake2b(os.path.basename(nome_arquivo).encode('utf-8'), digest_size=8).hexdigest()
+        return f"{hash_arquivo}-{nome}-{formato}-{unidade}-v{versao}"
+
+    def _path(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.json.gz")
+
+    def get(self, chave: str) -> Optional[Dict]:
+        """Retorna a análise em cache (None se ausente ou ilegível)"""
+        caminho = self._path(chave)
+        try:
+            with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+                analise = json.load(f)
+            os.utime(caminho)
+            return analise
+        except (OSError, ValueError):
+            return None
+
+    def put(self, chave: str, analise: Dict):
+        """Grava a análise de forma atômica e aplica o limite de tamanho
+
+        Falhas de disco não interrompem a análise: a entrada apenas não é gravada.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as bruto, gzip.GzipFile(fileobj=bruto, mode='wb') as f:
+                f.write(json.dumps(analise, ensure_ascii=False).encode('utf-8'))
+            os.replace(tmp_path, self._path(chave))
+        except (OSError, TypeError):
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas menos usadas até caber no limite"""
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.json.gz'):
+                continue
+            try:
+                info = os.stat(os.path.join(self.diretorio, nome))
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, nome))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, nome in sorted(entradas):
+            if total <= self.limite_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.diretorio, nome))
+                total -= tamanho
+            except OSError:
+                pass
@@ -4,14 +4,16 @@ Sistema Profissional de Orçamento de Marcenaria
 """
 
 import streamlit as st
-import json
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
-# Imports dos módulos
+# Imports dos módulos (só o necessário para a tela de login; o resto em init_components)
 from config import Config
 from auth_manager import AuthManager
-from file_analyzer import FileAnalyzer
-from orcamento_engine import OrcamentoEngine
+
+if TYPE_CHECKING:
+    from fila_analises import FilaAnalises
+    from historico_orcamentos import HistoricoOrcamentos
+    from orcamento_engine import OrcamentoEngine
 
 # Configuração da página
 st.set_page_config(**Config.get_page_config())
@@ -20,27 +22,77 @@ st.set_page_config(**Config.get_page_config())
 st.markdown(Config.get_css_styles(), unsafe_allow_html=True)
 
 # Inicializar componentes
+@st.cache_resource
+def init_auth() -> AuthManager:
+    """Autenticação: o único componente da tela de login"""
+    return AuthManager()
+
 @st.cache_resource
 def init_components():
-    """Inicializa componentes da aplicação"""
+    """Inicializa componentes da aplicação
+    
+    Importados aqui, depois do login: análise e orçamento trazem NumPy e as
+    tabelas de preço, que a tela de login não usa.
+    """
+    from file_analyzer import FileAnalyzer
+    from fila_analises import FilaAnalises
+    from historico_orcamentos import HistoricoOrcamentos
+    from orcamento_engine import OrcamentoEngine
+    
     return {
-        'auth': AuthManager(),
+        'auth': init_auth(),
         'analyzer': FileAnalyzer(),
-        'orcamento': OrcamentoEngine()
+        'orcamento': OrcamentoEngine(),
+        'historico': HistoricoOrcamentos(Config.HISTORICO_DB),
+        'fila': FilaAnalises(Config.FILA_DB, Config.FILA_DIR, Config.FILA_PROCESSOS, Config.FILA_JOBS_POR_USUARIO)
     }
 
+# Chaves dos controles de configuração na sidebar e seus valores iniciais
+CONTROLES_CONFIGURACAO = {
+    'material': ('cfg_material', lambda: next(iter(Config.PRECOS_MATERIAIS))),
+    'acessorios': ('cfg_acessorios', lambda: 'comum'),
+    'complexidade': ('cfg_complexidade', lambda: 'media'),
+    'margem_lucro': ('cfg_margem_lucro', lambda: 30),
+    'otimizar_corte': ('cfg_otimizar_corte', lambda: False),
+    'tempo_corte_s': ('cfg_tempo_corte_s', lambda: Config.CORTE_TEMPO_BUSCA_S),
+    'versao_precos': ('cfg_versao_precos', lambda: None)
+}
+
+# Unidades do modelo no envio ('auto' = declarada no arquivo ou estimada)
+NOMES_UNIDADES = {'auto': 'Automática', 'm': 'Metros', 'cm': 'Centímetros', 'mm': 'Milímetros', 'in': 'Polegadas'}
+
+# Componentes detalhados na prévia do relatório (o arquivo baixado traz todos)
+PREVIA_RELATORIO_COMPONENTES = 200
+
+def abrir_orcamento(historico: 'HistoricoOrcamentos', usuario_id: int, orcamento_id: int):
+    """Carrega um orçamento salvo na sessão (callback: roda antes dos controles existirem)"""
+    salvo = historico.carregar(usuario_id, orcamento_id)
+    if not salvo:
+        return
+    
+    st.session_state.analise = salvo['analise']
+    st.session_state.orcamento = salvo['orcamento']
+    st.session_state.cliente = salvo['cliente']
+    st.session_state.ambiente = salvo['ambiente']
+    st.session_state.orcamento_id = salvo['id']
+    
+    # Controles da sidebar com as configurações do orçamento salvo
+    configuracoes = salvo['orcamento'].get('configuracoes', {})
+    for campo, (chave, _) in CONTROLES_CONFIGURACAO.items():
+        if campo in configuracoes:
+            st.session_state[chave] = configuracoes[campo]
+
 def main():
     """Função principal da aplicação"""
-    # Inicializar componentes
-    components = init_components()
-    auth_manager = components['auth']
+    auth_manager = init_auth()
     
     # Verificar autenticação
     if not auth_manager.is_authenticated():
         auth_manager.show_login_form()
         return
     
-    # Usuário autenticado - mostrar aplicação
+    # Usuário autenticado - inicializar componentes e mostrar aplicação
+    components = init_components()
     usuario = auth_manager.get_current_user()
     mostrar_aplicacao_principal(components, usuario)
 
@@ -49,15 +101,19 @@ def mostrar_aplicacao_principal(components: Dict, usuario: Dict):
     auth_manager = components['auth']
     file_analyzer = components['analyzer']
     orcamento_engine = components['orcamento']
+    historico = components['historico']
+    fila = components['fila']
+    catalogo = orcamento_engine.catalogo
     
     # Dashboard do usuário na sidebar
     auth_manager.show_user_dashboard(usuario)
     
-    # Verificar limite de projetos
-    if not auth_manager.check_project_limit(usuario):
+    # Verificar limite de projetos (só bloqueia novos envios: análises já enviadas e
+    # orçamentos salvos continuam acessíveis)
+    pode_enviar = auth_manager.check_project_limit(usuario)
+    if not pode_enviar:
         st.error("❌ Limite de projetos atingido para seu plano!")
         st.info("💎 Faça upgrade para continuar criando orçamentos.")
-        return
     
     # Header principal
     st.markdown("""
@@ -72,26 +128,44 @@ def mostrar_aplicacao_principal(components: Dict, usuario: Dict):
         st.markdown("---")
         st.markdown("### ⚙️ Configurações do Orçamento")
         
+        # Valores iniciais pelas chaves (um orçamento aberto do histórico as sobrescreve)
+        for chave, padrao in CONTROLES_CONFIGURACAO.values():
+            if chave not in st.session_state:
+                st.session_state[chave] = padrao()
+        
+        # Tabela de preços (None = versão mais recente do catálogo)
+        versao_atual = catalogo.versao_atual()
+        versoes = {v['versao']: v for v in catalogo.versoes()}
+        versao_precos = st.selectbox(
+            "🗂️ Tabela de Preços",
+            options=[None] + list(versoes),
+            format_func=lambda v: f"Atual (v{versao_atual})" if v is None
+            else f"v{v} - {catalogo.fonte_precos(v)}",
+            key='cfg_versao_precos'
+        )
+        versao_vigente = versao_precos or versao_atual
+        
         # Configurações de material
         material = st.selectbox(
             "📦 Material Principal",
-            options=list(Config.PRECOS_MATERIAIS.keys()),
-            index=0
+            options=catalogo.nomes_materiais(versao_vigente),
+            key='cfg_material'
         )
         
         # Tipo de acessórios
         acessorios = st.selectbox(
             "🔧 Tipo de Acessórios",
-            options=['comum', 'premium'],
-            format_func=lambda x: x.title()
+            options=catalogo.linhas_acessorios(versao_vigente),
+            format_func=lambda x: x.title(),
+            key='cfg_acessorios'
         )
         
         # Complexidade do projeto
         complexidade = st.selectbox(
             "⚡ Complexidade",
             options=['simples', 'media', 'complexa', 'premium'],
-            index=1,
-            format_func=lambda x: x.replace('_', ' ').title()
+            format_func=lambda x: x.replace('_', ' ').title(),
+            key='cfg_complexidade'
         )
         
         # Margem de lucro
@@ -99,18 +173,54 @@ def mostrar_aplicacao_principal(components: Dict, usuario: Dict):
             "💰 Margem de Lucro (%)",
             min_value=10,
             max_value=50,
-            value=30,
-            step=5
+            step=5,
+            key='cfg_margem_lucro'
         )
         
-        # Preços atuais da Léo Madeiras
+        # Plano de corte (desperdício real em vez do percentual fixo)
+        otimizar_corte = st.checkbox(
+            "✂️ Otimizar plano de corte",
+            help=f"Encaixa as peças em chapas de {Config.CHAPA_PADRAO['comprimento_mm']}×{Config.CHAPA_PADRAO['largura_mm']} mm",
+            key='cfg_otimizar_corte'
+        )
+        tempo_corte_s = 0
+        if otimizar_corte:
+            tempo_corte_s = st.slider(
+                "⏱️ Tempo de busca do plano (s)",
+                min_value=0,
+                max_value=10,
+                help=f"Busca em {Config.CORTE_PROCESSOS_FILA} processo(s) por um plano com menos chapas",
+                key='cfg_tempo_corte_s'
+            )
+        
+        # Preços da tabela selecionada
         st.markdown("---")
         st.markdown("### 💲 Preços Atuais")
-        st.caption("🔗 Fonte: [Léo Madeiras](https://www.leomadeiras.com.br/)")
-        st.caption("📅 Atualizado em 30/06/2025")
+        st.caption(f"🔗 Fonte: {catalogo.fonte_precos(versao_vigente)} (v{versao_vigente})")
         
-        for mat, info in Config.PRECOS_MATERIAIS.items():
-            st.markdown(f"**{mat}:** R$ {info['preco_m2']:.2f}/m²")
+        for mat in catalogo.nomes_materiais(versao_vigente):
+            st.markdown(f"**{mat}:** R$ {catalogo.material(mat, versao_vigente)['preco_m2']:.2f}/m²")
+    
+    # Configurações do orçamento
+    configuracoes = {
+        'material': material,
+        'acessorios': acessorios,
+        'complexidade': complexidade,
+        'margem_lucro': margem_lucro,
+        'otimizar_corte': otimizar_corte,
+        'tempo_corte_s': tempo_corte_s,
+        'processos_corte': Config.CORTE_PROCESSOS_FILA,
+        'versao_precos': versao_precos
+    }
+    
+    # Configurações alteradas: reprecificar o orçamento atual sem nova análise
+    if st.session_state.get('orcamento') and st.session_state.orcamento.get('configuracoes') != configuracoes:
+        st.session_state.orcamento = orcamento_engine.recalcular_orcamento(
+            st.session_state.orcamento, st.session_state.analise, configuracoes
+        )
+    
+    # Orçamentos salvos
+    mostrar_historico(historico, usuario)
     
     # Área principal
     st.markdown("### 📁 Upload do Projeto 3D")
@@ -125,44 +235,38 @@ def mostrar_aplicacao_principal(components: Dict, usuario: Dict):
         ambiente = st.text_input("🏠 Ambiente", placeholder="Ex: Cozinha, Banheiro, Quarto")
     
     # Upload de arquivo
-    uploaded_file = st.file_uploader(
-        "📎 Selecione o arquivo 3D",
-        type=['obj', 'dae', 'stl', 'ply'],
-        help=f"Formatos suportados: {', '.join(file_analyzer.supported_formats).upper()}"
-    )
+    col1, col2 = st.columns([3, 1])
     
-    if uploaded_file and cliente and ambiente:
-        # Botão para analisar
+    with col1:
+        uploaded_file = st.file_uploader(
+            "📎 Selecione o arquivo 3D",
+            type=['obj', 'dae', 'stl', 'ply'],
+            help=f"Formatos suportados: {', '.join(file_analyzer.supported_formats).upper()}"
+        )
+    
+    with col2:
+        unidade = st.selectbox(
+            "📏 Unidade do modelo",
+            options=['auto'] + list(Config.UNIDADES_MODELO),
+            format_func=lambda u: NOMES_UNIDADES.get(u, u),
+            help="Automática usa a unidade declarada no arquivo (DAE) ou a estima pelo tamanho do modelo",
+            key='unidade_modelo'
+        )
+    
+    if uploaded_file and cliente and ambiente and pode_enviar:
+        # Botão para analisar: a análise roda na fila, fora da thread da sessão
         if st.button("🚀 Analisar Projeto", type="primary", use_container_width=True):
-            with st.spinner("🔍 Analisando arquivo 3D..."):
-                # Analisar arquivo
-                analise = file_analyzer.analyze_file(uploaded_file)
-                
-                if analise:
-                    # Incrementar contador de projetos
-                    auth_manager.increment_project_count(usuario['id'])
-                    
-                    # Configurações do orçamento
-                    configuracoes = {
-                        'material': material,
-                        'acessorios': acessorios,
-                        'complexidade': complexidade,
-                        'margem_lucro': margem_lucro
-                    }
-                    
-                    # Calcular orçamento
-                    with st.spinner("💰 Calculando orçamento..."):
-                        orcamento = orcamento_engine.calcular_orcamento(analise, configuracoes)
-                    
-                    if orcamento:
-                        # Salvar no session state
-                        st.session_state.analise = analise
-                        st.session_state.orcamento = orcamento
-                        st.session_state.cliente = cliente
-                        st.session_state.ambiente = ambiente
-                        
-                        st.success("✅ Análise concluída com sucesso!")
-                        st.rerun()
+            # O projeto conta antes do envio (verificação e incremento atômicos): a análise
+            # só chega ao pool se couber no plano; um envio recusado devolve o projeto
+            if not auth_manager.consume_project(usuario, uploaded_file.name):
+                st.error("❌ Limite de projetos atingido para seu plano!")
+            elif fila.enviar(usuario['id'], uploaded_file, cliente, ambiente, configuracoes, unidade):
+                st.toast("📥 Arquivo enviado para análise")
+            else:
+                auth_manager.refund_project(usuario, uploaded_file.name)
+    
+    # Análises enviadas (em andamento, concluídas ou com erro)
+    mostrar_fila(fila, historico, usuario)
     
     # Mostrar resultados se disponíveis
     if hasattr(st.session_state, 'orcamento') and st.session_state.orcamento:
@@ -173,14 +277,170 @@ def mostrar_aplicacao_principal(components: Dict, usuario: Dict):
             st.session_state.ambiente,
             orcamento_engine
         )
+        
+        # Orçamento repreçado: permitir gravar a nova versão no histórico
+        if st.button("💾 Salvar alterações no histórico", use_container_width=True):
+            orcamento_id = st.session_state.get('orcamento_id')
+            args = (st.session_state.cliente, st.session_state.ambiente,
+                    st.session_state.analise, st.session_state.orcamento)
+            if orcamento_id and historico.atualizar(usuario['id'], orcamento_id, *args):
+                st.success("✅ Orçamento atualizado no histórico!")
+            elif not orcamento_id:
+                st.session_state.orcamento_id = historico.salvar(usuario['id'], *args)
+                if st.session_state.orcamento_id:
+                    st.success("✅ Orçamento salvo no histórico!")
+
+def receber_analise(fila: 'FilaAnalises', historico: 'HistoricoOrcamentos', usuario: Dict, job_id: int):
+    """Leva o resultado de um job concluído para a sessão e o histórico
+    
+    O projeto já foi registrado no uso do mês quando o job foi enviado.
+    """
+    resultado = fila.retirar(usuario['id'], job_id)
+    if not resultado:
+        return
+    
+    st.session_state.analise = resultado['analise']
+    st.session_state.orcamento = resultado['orcamento']
+    st.session_state.cliente = resultado['cliente']
+    st.session_state.ambiente = resultado['ambiente']
+    st.session_state.orcamento_id = historico.salvar(
+        usuario['id'], resultado['cliente'], resultado['ambiente'], resultado['analise'], resultado['orcamento']
+    )
+    st.success(f"✅ Análise de {resultado['analise']['nome_arquivo']} concluída com sucesso!")
+
+def descrever_job(job: Dict) -> str:
+    """Texto de progresso de um job pendente ou em execução"""
+    from fila_analises import ETAPA_ORCAMENTO, PENDENTE
+    
+    if job['cancelar']:
+        return "cancelando..."
+    if job['status'] == PENDENTE:
+        return f"na fila (posição {job['posicao'] + 1})"
+    if job['etapa'] == ETAPA_ORCAMENTO:
+        return f"{job['componentes']} componentes encontrados · calculando orçamento..."
+    if job['bytes_lidos'] >= job['bytes_total']:
+        return "identificando componentes..."
+    mb = 1024 * 1024
+    return f"lendo {job['bytes_lidos'] / mb:.1f} de {job['bytes_total'] / mb:.1f} MB"
+
+@st.fragment(run_every=Config.FILA_INTERVALO_S)
+def acompanhar_fila(fila: 'FilaAnalises', usuario: Dict, ativos: tuple):
+    """Progresso das análises em andamento, atualizado sem recarregar a página
+    
+    Quando alguma delas termina (ou é cancelada) a página inteira é recarregada
+    para receber o resultado; sem análises ativas a consulta periódica para.
+    """
+    from fila_analises import ATIVOS, PENDENTE
+    
+    jobs = [job for job in fila.listar(usuario['id']) if job['status'] in ATIVOS]
+    if tuple(job['id'] for job in jobs) != ativos:
+        st.rerun()
+    
+    for job in jobs:
+        col_progresso, col_cancelar = st.columns([5, 1])
+        with col_progresso:
+            fracao = 0.0 if job['status'] == PENDENTE else min(job['bytes_lidos'] / (job['bytes_total'] or 1), 1.0)
+            st.progress(fracao, text=f"🔍 **{job['nome_arquivo']}** ({job['cliente']} — {job['ambiente']}): "
+                                     f"{descrever_job(job)}")
+        with col_cancelar:
+            st.button("✖️ Cancelar", key=f"cancelar_job_{job['id']}", use_container_width=True,
+                      disabled=bool(job['cancelar']), on_click=fila.cancelar, args=(usuario['id'], job['id']))
+
+def mostrar_fila(fila: 'FilaAnalises', historico: 'HistoricoOrcamentos', usuario: Dict):
+    """Análises enviadas pelo usuário: recebe as concluídas, mostra erros e acompanha as ativas"""
+    from fila_analises import ATIVOS, CONCLUIDO, ERRO
+    
+    jobs = fila.listar(usuario['id'])
+    for job in jobs:
+        if job['status'] == CONCLUIDO:
+            receber_analise(fila, historico, usuario, job['id'])
+        elif job['status'] == ERRO:
+            col_erro, col_descartar = st.columns([5, 1])
+            with col_erro:
+                st.error(f"❌ Erro ao analisar {job['nome_arquivo']}: {job['erro']}")
+            with col_descartar:
+                st.button("Dispensar", key=f"descartar_job_{job['id']}", use_container_width=True,
+                          on_click=fila.descartar, args=(usuario['id'], job['id']))
+    
+    ativos = tuple(job['id'] for job in jobs if job['status'] in ATIVOS)
+    if ativos:
+        acompanhar_fila(fila, usuario, ativos)
+
+def mostrar_historico(historico: 'HistoricoOrcamentos', usuario: Dict):
+    """Lista paginada dos orçamentos salvos, com filtros"""
+    total = historico.contar(usuario['id'])
+    
+    with st.expander(f"📚 Meus Orçamentos ({total})", expanded=False):
+        if total == 0:
+            st.info("Os orçamentos analisados ficam salvos aqui.")
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filtro_cliente = st.text_input("🔍 Cliente", key="hist_cliente", placeholder="Início do nome")
+        with col2:
+            filtro_ambiente = st.text_input("🏠 Ambiente", key="hist_ambiente")
+        with col3:
+            filtro_desde = st.date_input("📅 Desde", value=None, key="hist_desde")
+        
+        # Cursores das páginas já visitadas; recomeça quando os filtros mudam
+        filtros = (filtro_cliente, filtro_ambiente, filtro_desde)
+        if st.session_state.get('hist_filtros') != filtros:
+            st.session_state.hist_filtros = filtros
+            st.session_state.hist_cursores = [None]
+        cursores = st.session_state.hist_cursores
+        
+        pagina = historico.buscar(
+            usuario['id'],
+            cliente=filtro_cliente or None,
+            ambiente=filtro_ambiente.strip() or None,
+            data_inicio=filtro_desde.isoformat() if filtro_desde else None,
+            limite=Config.HISTORICO_POR_PAGINA,
+            apos=cursores[-1]
+        )
+        
+        if not pagina['itens']:
+            st.info("Nenhum orçamento encontrado com esses filtros.")
+        
+        for item in pagina['itens']:
+            col_info, col_total, col_abrir, col_excluir = st.columns([5, 2, 1, 1])
+            with col_info:
+                st.markdown(
+                    f"**{item['cliente']}** — {item['ambiente']}  \n"
+                    f"{item['data_orcamento'][:16].replace('T', ' ')} · {item['material'] or '-'} · "
+                    f"{item['total_componentes'] or 0} componentes"
+                )
+            with col_total:
+                st.markdown(f"**R$ {item['total_final']:,.2f}**")
+            with col_abrir:
+                st.button("📂", key=f"hist_abrir_{item['id']}", help="Abrir",
+                          on_click=abrir_orcamento, args=(historico, usuario['id'], item['id']))
+            with col_excluir:
+                if st.button("🗑️", key=f"hist_excluir_{item['id']}", help="Excluir"):
+                    if historico.excluir(usuario['id'], item['id']):
+                        if st.session_state.get('orcamento_id') == item['id']:
+                            st.session_state.orcamento_id = None
+                        st.rerun()
+        
+        col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1])
+        with col_anterior:
+            if len(cursores) > 1 and st.button("⬅️ Anteriores", key="hist_anterior"):
+                cursores.pop()
+                st.rerun()
+        with col_pagina:
+            st.caption(f"Página {len(cursores)}")
+        with col_proxima:
+            if pagina['proximo'] and st.button("Próximos ➡️", key="hist_proxima"):
+                cursores.append(pagina['proximo'])
+                st.rerun()
 
-def mostrar_resultados(analise: Dict, orcamento: Dict, cliente: str, ambiente: str, orcamento_engine: OrcamentoEngine):
+def mostrar_resultados(analise: Dict, orcamento: Dict, cliente: str, ambiente: str, orcamento_engine: 'OrcamentoEngine'):
     """Mostra resultados da análise e orçamento"""
     
     st.markdown("---")
     
     # Tabs para diferentes visualizações
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Resumo", "🧩 Componentes", "📈 Gráficos", "📄 Relatório"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Resumo", "🧩 Componentes", "📈 Gráficos", "📄 Relatório", "⚖️ Cenários"])
     
     with tab1:
         st.markdown("### 📊 Resumo do Orçamento")
@@ -218,6 +478,16 @@ def mostrar_resultados(analise: Dict, orcamento: Dict, cliente: str, ambiente: s
                 delta=f"{(resumo['custo_mao_obra']/resumo['total_final']*100):.1f}%"
             )
         
+        # Unidade usada para converter as medidas do modelo
+        if analise.get('unidade'):
+            nome_unidade = NOMES_UNIDADES.get(analise['unidade'], analise['unidade'])
+            if analise['unidade_origem'] == 'estimada':
+                st.warning(f"📏 Unidade do modelo estimada pelo tamanho: **{nome_unidade}**. "
+                           "Se as medidas estiverem erradas, envie de novo escolhendo a unidade.")
+            else:
+                origem = 'declarada no arquivo' if analise['unidade_origem'] == 'arquivo' else 'informada no envio'
+                st.caption(f"📏 Unidade do modelo: {nome_unidade} ({origem})")
+        
         # Breakdown detalhado
         st.markdown("### 💸 Breakdown de Custos")
         
@@ -240,30 +510,49 @@ def mostrar_resultados(analise: Dict, orcamento: Dict, cliente: str, ambiente: s
         }
         
         st.dataframe(breakdown_data, use_container_width=True)
+        
+        # Plano de corte
+        plano = orcamento.get('plano_corte')
+        if plano:
+            st.markdown("### ✂️ Plano de Corte")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🪵 Chapas", plano['num_chapas'], delta=f"{plano['num_pecas']} peças")
+            with col2:
+                st.metric("📐 Área de Chapas", f"{plano['area_chapas_m2']:.2f} m²")
+            with col3:
+                st.metric("♻️ Desperdício Real", f"{plano['desperdicio'] * 100:.1f}%")
+            
+            st.dataframe({
+                'Chapa': [c['indice'] for c in plano['chapas']],
+                'Peças': [len(c['pecas']) for c in plano['chapas']],
+                'Aproveitamento (%)': [round(c['aproveitamento'] * 100, 1) for c in plano['chapas']]
+            }, use_container_width=True)
     
     with tab2:
         st.markdown("### 🧩 Detalhamento por Componente")
         
         for comp in orcamento['componentes']:
-            with st.expander(f"🔹 {comp['nome']} - R$ {comp['custo_total']:,.2f}"):
+            with st.expander(f"🔹 {comp.nome} - R$ {comp.custo_total:,.2f}"):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Tipo:** {comp['tipo'].replace('_', ' ').title()}")
-                    st.markdown(f"**Área:** {comp['area_m2']:.2f} m²")
-                    st.markdown(f"**Material:** {comp['material']}")
-                    st.markdown(f"**Preço/m²:** R$ {comp['preco_por_m2']:,.2f}")
+                    st.markdown(f"**Tipo:** {comp.tipo.replace('_', ' ').title()}")
+                    st.markdown(f"**Área:** {comp.area_m2:.2f} m²")
+                    st.markdown(f"**Material:** {comp.material}")
+                    st.markdown(f"**Preço/m²:** R$ {comp.preco_por_m2:,.2f}")
                 
                 with col2:
                     st.markdown("**Custos:**")
-                    st.markdown(f"• Material: R$ {comp['custo_material']:,.2f}")
-                    st.markdown(f"• Acessórios: R$ {comp['custo_acessorios']:,.2f}")
-                    st.markdown(f"• Corte: R$ {comp['custo_corte']:,.2f}")
-                    st.markdown(f"**Total: R$ {comp['custo_total']:,.2f}**")
+                    st.markdown(f"• Material: R$ {comp.custo_material:,.2f}")
+                    st.markdown(f"• Acessórios: R$ {comp.custo_acessorios:,.2f}")
+                    st.markdown(f"• Corte: R$ {comp.custo_corte:,.2f}")
+                    st.markdown(f"**Total: R$ {comp.custo_total:,.2f}**")
                 
-                if comp['acessorios_detalhados']:
+                if comp.acessorios_detalhados:
                     st.markdown("**Acessórios:**")
-                    for acessorio, info in comp['acessorios_detalhados'].items():
+                    for acessorio, info in comp.acessorios_detalhados.items():
                         st.markdown(f"• {info['quantidade']}x {acessorio.replace('_', ' ').title()} @ R$ {info['preco_unitario']:.2f}")
     
     with tab3:
@@ -284,25 +573,59 @@ def mostrar_resultados(analise: Dict, orcamento: Dict, cliente: str, ambiente: s
     with tab4:
         st.markdown("### 📄 Relatório Detalhado")
         
-        # Gerar relatório
-        relatorio = orcamento_engine.gerar_relatorio_detalhado(orcamento, cliente, ambiente)
+        from relatorios import ESCRITORES, conteudo_relatorio
+        
+        # Prévia na tela; o arquivo é gerado em blocos só quando o download é pedido
+        relatorio = orcamento_engine.gerar_relatorio_detalhado(
+            orcamento, cliente, ambiente, limite_componentes=PREVIA_RELATORIO_COMPONENTES
+        )
         
         # Mostrar relatório
         st.markdown(relatorio)
         
         # Botão para download
+        formato = st.radio(
+            "Formato",
+            options=list(ESCRITORES),
+            format_func=lambda f: ESCRITORES[f].nome,
+            horizontal=True,
+            key="formato_relatorio"
+        )
+        escritor = ESCRITORES[formato]
         st.download_button(
-            label="📥 Baixar Relatório (JSON)",
-            data=json.dumps({
-                'cliente': cliente,
-                'ambiente': ambiente,
-                'analise': analise,
-                'orcamento': orcamento
-            }, indent=2, ensure_ascii=False),
-            file_name=f"orcamento_{cliente.replace(' ', '_')}_{ambiente.replace(' ', '_')}.json",
-            mime="application/json"
+            label=f"📥 Baixar {escritor.nome}",
+            data=lambda: conteudo_relatorio(formato, orcamento, analise, cliente, ambiente),
+            file_name=f"orcamento_{cliente.replace(' ', '_')}_{ambiente.replace(' ', '_')}.{escritor.extensao}",
+            mime=escritor.mime,
+            on_click="ignore"
         )
 
+    with tab5:
+        st.markdown("### ⚖️ Comparativo de Cenários")
+        
+        cenarios = orcamento_engine.calcular_cenarios(analise, versao=orcamento.get('versao_precos'))
+        margem = st.select_slider(
+            "💰 Margem de Lucro (%)",
+            options=cenarios['margens'],
+            value=orcamento['configuracoes'].get('margem_lucro', 30),
+            key="margem_cenarios"
+        )
+        g = cenarios['margens'].index(margem)
+        
+        # Linhas: material × acessórios; colunas: complexidade
+        tabela = {'Material': [], 'Acessórios': []}
+        for k, complexidade in enumerate(cenarios['complexidades']):
+            tabela[f"{complexidade.title()} (R$)"] = []
+        for i, material in enumerate(cenarios['materiais']):
+            for j, acessorio in enumerate(cenarios['acessorios']):
+                tabela['Material'].append(material)
+                tabela['Acessórios'].append(acessorio.title())
+                for k, complexidade in enumerate(cenarios['complexidades']):
+                    tabela[f"{complexidade.title()} (R$)"].append(round(cenarios['total_final'][i][j][k][g], 2))
+        
+        st.dataframe(tabela, use_container_width=True)
+        st.caption("Valores com o desperdício padrão de cada material.")
+
 if __name__ == "__main__":
     main()
 
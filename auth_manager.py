@@ -3,161 +3,354 @@ Sistema de Autenticação e Gerenciamento de Usuários
 """
 
 import streamlit as st
+import csv
+import os
 import sqlite3
-import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, TextIO, Union
 from config import Config
+from db_pool import get_pool
+import auth_security
+from auth_security import SessionTokens, needs_rehash, verify_password
 
 class AuthManager:
-    def __init__(self):
-        self.db_path = "usuarios.db"
+    # Versão do esquema (PRAGMA user_version): 1 = usuários e contas demo, 2 = registro de uso
+    SCHEMA_VERSION = 2
+    
+    # Linhas por executemany na importação em massa
+    LOTE_IMPORTACAO = 5000
+    
+    DEMO_USERS = [
+        {
+            'email': 'demo@orcainteriores.com',
+            'senha': 'demo123',
+            'nome': 'Usuário Demo',
+            'plano': 'pro'
+        },
+        {
+            'email': 'arquiteto@teste.com',
+            'senha': 'arq123',
+            'nome': 'Arquiteto Teste',
+            'plano': 'basic'
+        },
+        {
+            'email': 'marceneiro@teste.com',
+            'senha': 'marc123',
+            'nome': 'Marceneiro Teste',
+            'plano': 'enterprise'
+        }
+    ]
+    
+    def __init__(self, db_path: str = "usuarios.db"):
+        self.db_path = db_path
+        self.pool = get_pool(self.db_path)
+        self.sessoes = SessionTokens(
+            Config.SESSION_SECRET.encode() or os.urandom(32),
+            Config.SESSION_TTL_S,
+            Config.SESSION_CACHE_SIZE,
+            self.get_user,
+            Config.SESSION_CACHE_TTL_S
+        )
         self.init_database()
-        self.create_demo_users()
     
     def init_database(self):
-        """Inicializa o banco de dados"""
+        """Inicializa o banco de dados, aplicando as versões de esquema que faltam numa transação só"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            versao = self.pool.query_one('PRAGMA user_version')[0]
+            if versao >= self.SCHEMA_VERSION:
+                return
             
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    senha_hash TEXT NOT NULL,
-                    nome TEXT NOT NULL,
-                    plano TEXT DEFAULT 'free',
-                    projetos_mes INTEGER DEFAULT 0,
-                    data_criacao TEXT NOT NULL,
-                    ultimo_login TEXT,
-                    ativo BOOLEAN DEFAULT 1
-                )
-            ''')
+            # Hashes calculados antes da transação (o KDF é lento e ela segura o lock de escrita)
+            demo = self._preparar_usuarios(self.DEMO_USERS) if versao < 1 else []
             
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                if versao < 1:
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS usuarios (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            email TEXT UNIQUE NOT NULL,
+                            senha_hash TEXT NOT NULL,
+                            nome TEXT NOT NULL,
+                            plano TEXT DEFAULT 'free',
+                            projetos_mes INTEGER DEFAULT 0,
+                            data_criacao TEXT NOT NULL,
+                            ultimo_login TEXT,
+                            ativo BOOLEAN DEFAULT 1
+                        )
+                    ''')
+                    self._insert_users(conn, demo)
+                
+                if versao < 2:
+                    # Registro de uso: um projeto por linha, e o total do mês por usuário
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS uso_projetos (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            usuario_id INTEGER NOT NULL,
+                            mes TEXT NOT NULL,
+                            arquivo TEXT,
+                            data_registro TEXT NOT NULL
+                        )
+                    ''')
+                    conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_uso_projetos_usuario_mes
+                        ON uso_projetos (usuario_id, mes)
+                    ''')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS uso_mensal (
+                            usuario_id INTEGER NOT NULL,
+                            mes TEXT NOT NULL,
+                            total INTEGER NOT NULL,
+                            PRIMARY KEY (usuario_id, mes)
+                        ) WITHOUT ROWID
+                    ''')
+                
+                conn.execute(f'PRAGMA user_version = {int(self.SCHEMA_VERSION)}')
         except Exception as e:
             st.error(f"Erro ao inicializar banco: {e}")
     
     def hash_password(self, password: str) -> str:
-        """Gera hash da senha"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Gera hash da senha (scrypt com salt)"""
+        return auth_security.hash_password(password)
+    
+    def _hash_passwords(self, senhas: List[str]) -> List[str]:
+        """Hashes de várias senhas; o KDF libera o GIL, então roda em threads"""
+        processos = os.cpu_count() or 1
+        if len(senhas) < 2 or processos < 2:
+            return [self.hash_password(senha) for senha in senhas]
+        with ThreadPoolExecutor(max_workers=processos) as executor:
+            return list(executor.map(self.hash_password, senhas))
     
     def create_demo_users(self):
         """Cria usuários demo para teste"""
-        demo_users = [
-            {
-                'email': 'demo@orcainteriores.com',
-                'senha': 'demo123',
-                'nome': 'Usuário Demo',
-                'plano': 'pro'
-            },
-            {
-                'email': 'arquiteto@teste.com',
-                'senha': 'arq123',
-                'nome': 'Arquiteto Teste',
-                'plano': 'basic'
-            },
-            {
-                'email': 'marceneiro@teste.com',
-                'senha': 'marc123',
-                'nome': 'Marceneiro Teste',
-                'plano': 'enterprise'
-            }
-        ]
-        
-        for user in demo_users:
-            self.create_user(
-                user['email'],
-                user['senha'],
-                user['nome'],
-                user['plano']
-            )
+        self.create_users(self.DEMO_USERS)
     
     def create_user(self, email: str, password: str, nome: str, plano: str = 'free') -> bool:
         """Cria novo usuário"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            senha_hash = self.hash_password(password)
-            data_criacao = datetime.now().isoformat()
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO usuarios 
-                (email, senha_hash, nome, plano, data_criacao)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (email, senha_hash, nome, plano, data_criacao))
-            
-            conn.commit()
-            conn.close()
+            linhas = self._preparar_usuarios([{'email': email, 'senha': password, 'nome': nome, 'plano': plano}])
+            with self.pool.transaction() as conn:
+                self._insert_users(conn, linhas)
             return True
         except Exception as e:
             st.error(f"Erro ao criar usuário: {e}")
             return False
     
+    def create_users(self, usuarios: Iterable[Dict]) -> int:
+        """Cria vários usuários em lotes; retorna quantos foram inseridos
+        
+        Cada usuário é um dict com email, senha, nome e plano (opcional).
+        E-mails já cadastrados são ignorados. As senhas de cada lote são
+        processadas pelo KDF fora da transação, que fica só com os INSERTs
+        e não segura o lock de escrita durante os hashes (logins concorrentes
+        gravam ultimo_login).
+        """
+        try:
+            inseridos = 0
+            lote = []
+            for usuario in usuarios:
+                lote.append(usuario)
+                if len(lote) >= self.LOTE_IMPORTACAO:
+                    inseridos += self._gravar_lote(lote)
+                    lote = []
+            inseridos += self._gravar_lote(lote)
+            return inseridos
+        except Exception as e:
+            st.error(f"Erro ao criar usuários: {e}")
+            return 0
+    
+    def _gravar_lote(self, usuarios: List[Dict]) -> int:
+        """Hashes do lote e depois uma transação curta com os INSERTs"""
+        linhas = self._preparar_usuarios(usuarios)
+        if not linhas:
+            return 0
+        with self.pool.transaction() as conn:
+            return self._insert_users(conn, linhas)
+    
+    def import_users_csv(self, arquivo: Union[str, TextIO]) -> int:
+        """Importa contas de um CSV com colunas email, senha, nome e plano (opcional)"""
+        if isinstance(arquivo, str):
+            with open(arquivo, newline='', encoding='utf-8') as f:
+                return self.import_users_csv(f)
+        
+        linhas = csv.DictReader(arquivo)
+        return self.create_users(
+            linha for linha in linhas
+            if linha.get('email') and linha.get('senha')
+        )
+    
+    def _preparar_usuarios(self, usuarios: List[Dict]) -> List[tuple]:
+        """Linhas para _insert_users, com o hash de cada senha (fora de transação)"""
+        data_criacao = datetime.now().isoformat()
+        hashes = self._hash_passwords([u['senha'] for u in usuarios])
+        return [
+            (
+                u['email'].strip(),
+                senha_hash,
+                (u.get('nome') or u['email']).strip(),
+                u.get('plano') if u.get('plano') in Config.PLANOS else 'free',
+                data_criacao
+            )
+            for u, senha_hash in zip(usuarios, hashes)
+        ]
+    
+    def _insert_users(self, conn: sqlite3.Connection, linhas: List[tuple]) -> int:
+        """INSERT OR IGNORE em lote (executemany) dentro da transação do chamador"""
+        if not linhas:
+            return 0
+        
+        antes = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO usuarios 
+            (email, senha_hash, nome, plano, data_criacao)
+            VALUES (?, ?, ?, ?, ?)
+        ''', linhas)
+        return conn.total_changes - antes
+    
     def authenticate(self, email: str, password: str) -> Optional[Dict]:
-        """Autentica usuário"""
+        """Autentica usuário
+        
+        Hashes SHA-256 legados (ou com parâmetros antigos) são regravados com
+        o KDF atual no primeiro login bem-sucedido.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            senha_hash = self.hash_password(password)
-            
-            cursor.execute('''
-                SELECT id, email, nome, plano, projetos_mes, data_criacao
+            result = self.pool.query_one('''
+                SELECT id, email, nome, plano, data_criacao, senha_hash
                 FROM usuarios 
-                WHERE email = ? AND senha_hash = ? AND ativo = 1
-            ''', (email, senha_hash))
-            
-            result = cursor.fetchone()
+                WHERE email = ? AND ativo = 1
+            ''', (email,))
             
-            if result:
-                # Atualizar último login
-                cursor.execute('''
-                    UPDATE usuarios 
-                    SET ultimo_login = ? 
-                    WHERE email = ?
-                ''', (datetime.now().isoformat(), email))
+            if result and verify_password(password, result[5]):
+                novo_hash = self.hash_password(password) if needs_rehash(result[5]) else result[5]
                 
-                conn.commit()
+                # Atualizar último login (e o hash, se não mudou desde a leitura)
+                with self.pool.transaction() as conn:
+                    conn.execute('''
+                        UPDATE usuarios 
+                        SET ultimo_login = ?,
+                            senha_hash = CASE WHEN senha_hash = ? THEN ? ELSE senha_hash END
+                        WHERE id = ?
+                    ''', (datetime.now().isoformat(), result[5], novo_hash, result[0]))
                 
-                user_data = {
+                return {
                     'id': result[0],
                     'email': result[1],
                     'nome': result[2],
                     'plano': result[3],
-                    'projetos_mes': result[4],
-                    'data_criacao': result[5]
+                    'projetos_mes': self.get_monthly_usage(result[0]),
+                    'data_criacao': result[4]
                 }
-                
-                conn.close()
-                return user_data
             
-            conn.close()
             return None
         except Exception as e:
             st.error(f"Erro na autenticação: {e}")
             return None
     
-    def increment_project_count(self, user_id: int):
-        """Incrementa contador de projetos do usuário"""
+    def get_user(self, user_id: int) -> Optional[Dict]:
+        """Usuário ativo pelo id (usado ao validar um token que não está em cache)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE usuarios 
-                SET projetos_mes = projetos_mes + 1 
-                WHERE id = ?
+            result = self.pool.query_one('''
+                SELECT id, email, nome, plano, data_criacao
+                FROM usuarios 
+                WHERE id = ? AND ativo = 1
             ''', (user_id,))
             
-            conn.commit()
-            conn.close()
+            if not result:
+                return None
+            
+            return {
+                'id': result[0],
+                'email': result[1],
+                'nome': result[2],
+                'plano': result[3],
+                'projetos_mes': self.get_monthly_usage(result[0]),
+                'data_criacao': result[4]
+            }
+        except Exception as e:
+            st.error(f"Erro ao carregar usuário: {e}")
+            return None
+    
+    def login(self, email: str, password: str) -> Optional[Dict]:
+        """Autentica e abre a sessão (token assinado no session state)"""
+        user = self.authenticate(email, password)
+        if user:
+            st.session_state.token = self.sessoes.issue(user)
+        return user
+    
+    def logout(self):
+        """Encerra a sessão atual e revoga o token"""
+        self.sessoes.revoke(st.session_state.get('token'))
+        st.session_state.pop('token', None)
+    
+    def consume_project(self, usuario: Dict, arquivo: Optional[str] = None) -> bool:
+        """Registra um projeto do mês se o plano permitir (verificação e incremento atômicos)
+        
+        O UPSERT só soma quando o total do mês está abaixo do limite, no mesmo
+        statement; sessões concorrentes não passam do limite. Retorna False
+        quando o limite já foi atingido.
+        """
+        plano_info = Config.PLANOS.get(usuario['plano'], Config.PLANOS['free'])
+        mes = datetime.now().strftime('%Y-%m')
+        
+        try:
+            with self.pool.transaction() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO uso_mensal (usuario_id, mes, total)
+                    VALUES (?, ?, 1)
+                    ON CONFLICT (usuario_id, mes) DO UPDATE SET total = total + 1
+                    WHERE total < ?
+                ''', (usuario['id'], mes, plano_info['projetos_mes']))
+                
+                if cursor.rowcount == 0:
+                    return False
+                
+                conn.execute('''
+                    INSERT INTO uso_projetos (usuario_id, mes, arquivo, data_registro)
+                    VALUES (?, ?, ?, ?)
+                ''', (usuario['id'], mes, arquivo, datetime.now().isoformat()))
+            return True
+        except Exception as e:
+            st.error(f"Erro ao registrar projeto: {e}")
+            return False
+    
+    def refund_project(self, usuario: Dict, arquivo: Optional[str] = None):
+        """Devolve o último projeto do mês registrado com `arquivo` (envio que falhou após consume_project)"""
+        mes = datetime.now().strftime('%Y-%m')
+        
+        try:
+            with self.pool.transaction() as conn:
+                registro = conn.execute('''
+                    SELECT id FROM uso_projetos
+                    WHERE usuario_id = ? AND mes = ? AND arquivo IS ?
+                    ORDER BY id DESC LIMIT 1
+                ''', (usuario['id'], mes, arquivo)).fetchone()
+                if registro is None:
+                    return
+                
+                conn.execute('DELETE FROM uso_projetos WHERE id = ?', registro)
+                conn.execute('''
+                    UPDATE uso_mensal SET total = total - 1
+                    WHERE usuario_id = ? AND mes = ? AND total > 0
+                ''', (usuario['id'], mes))
+        except Exception as e:
+            st.error(f"Erro ao devolver projeto: {e}")
+    
+    def increment_project_count(self, user_id: int):
+        """Incrementa contador de projetos do usuário (sem verificar o limite)"""
+        self.consume_project({'id': user_id, 'plano': 'enterprise'})
+    
+    def get_monthly_usage(self, user_id: int) -> int:
+        """Projetos registrados pelo usuário no mês atual"""
+        try:
+            resultado = self.pool.query_one('''
+                SELECT total FROM uso_mensal
+                WHERE usuario_id = ? AND mes = ?
+            ''', (user_id, datetime.now().strftime('%Y-%m')))
+            return resultado[0] if resultado else 0
         except Exception as e:
-            st.error(f"Erro ao incrementar contador: {e}")
+            st.error(f"Erro ao consultar uso: {e}")
+            return 0
     
     def check_project_limit(self, usuario: Dict) -> bool:
         """Verifica se usuário pode criar mais projetos"""
@@ -167,7 +360,7 @@ class AuthManager:
         if limite == 999999:  # Ilimitado
             return True
         
-        return usuario['projetos_mes'] < limite
+        return self.get_monthly_usage(usuario['id']) < limite
     
     def show_login_form(self):
         """Exibe formulário de login"""
@@ -196,9 +389,8 @@ class AuthManager:
                     demo_button = st.form_submit_button("🧪 Conta Demo", use_container_width=True)
             
             if login_button and email and password:
-                user = self.authenticate(email, password)
+                user = self.login(email, password)
                 if user:
-                    st.session_state.user = user
                     st.success(f"✅ Bem-vindo, {user['nome']}!")
                     st.rerun()
                 else:
@@ -206,9 +398,8 @@ class AuthManager:
             
             if demo_button:
                 # Login automático com conta demo
-                user = self.authenticate("demo@orcainteriores.com", "demo123")
+                user = self.login("demo@orcainteriores.com", "demo123")
                 if user:
-                    st.session_state.user = user
                     st.success(f"✅ Logado como {user['nome']} (Conta Demo)")
                     st.rerun()
             
@@ -237,13 +428,14 @@ class AuthManager:
             st.markdown(f"**Email:** {usuario['email']}")
             st.markdown(f"**Plano:** {plano_info['nome']}")
             
-            # Progresso de projetos
+            # Progresso de projetos (uso do mês, lido do registro)
+            projetos_mes = self.get_monthly_usage(usuario['id'])
             if plano_info['projetos_mes'] != 999999:
-                progresso = usuario['projetos_mes'] / plano_info['projetos_mes']
+                progresso = min(projetos_mes / plano_info['projetos_mes'], 1.0)
                 st.progress(progresso)
-                st.markdown(f"**Projetos:** {usuario['projetos_mes']}/{plano_info['projetos_mes']}")
+                st.markdown(f"**Projetos:** {projetos_mes}/{plano_info['projetos_mes']}")
             else:
-                st.markdown(f"**Projetos:** {usuario['projetos_mes']} (Ilimitado)")
+                st.markdown(f"**Projetos:** {projetos_mes} (Ilimitado)")
             
             # Recursos do plano
             st.markdown("**Recursos:**")
@@ -251,14 +443,14 @@ class AuthManager:
                 st.markdown(f"✅ {recurso}")
             
             if st.button("🚪 Sair", use_container_width=True):
-                del st.session_state.user
+                self.logout()
                 st.rerun()
     
     def is_authenticated(self) -> bool:
         """Verifica se usuário está autenticado"""
-        return 'user' in st.session_state
+        return self.get_current_user() is not None
     
     def get_current_user(self) -> Optional[Dict]:
-        """Retorna usuário atual"""
-        return st.session_state.get('user', None)
+        """Retorna usuário atual (pelo token da sessão, sem repetir o KDF)"""
+        return self.sessoes.verify(st.session_state.get('token'))
 
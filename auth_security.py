@@ -0,0 +1,165 @@
+"""
+Hash de Senhas (KDF com salt) e Tokens de Sessão Assinados
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Parâmetros do scrypt (~16 MB e algumas dezenas de ms por hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# PBKDF2 quando o OpenSSL não oferece scrypt
+PBKDF2_ITERACOES = 600_000
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b'=').decode('ascii')
+
+
+def _unb64(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def hash_password(senha: str) -> str:
+    """Hash com salt aleatório, no formato 'algoritmo$parâmetros$salt$hash'"""
+    salt = os.urandom(SALT_BYTES)
+    if hasattr(hashlib, 'scrypt'):
+        derivado = hashlib.scrypt(senha.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                  dklen=HASH_BYTES)
+        return f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}${_b64(salt)}${_b64(derivado)}"
+
+    derivado = hashlib.pbkdf2_hmac('sha256', senha.encode(), salt, PBKDF2_ITERACOES, HASH_BYTES)
+    return f"pbkdf2_sha256${PBKDF2_ITERACOES}${_b64(salt)}${_b64(derivado)}"
+
+
+def is_legacy_hash(senha_hash: str) -> bool:
+    """Hash antigo: SHA-256 sem salt (64 caracteres hexadecimais)"""
+    return '$' not in senha_hash and len(senha_hash) == 64
+
+
+def verify_password(senha: str, senha_hash: str) -> bool:
+    """Confere a senha contra qualquer formato suportado (inclusive o SHA-256 legado)"""
+    try:
+        if is_legacy_hash(senha_hash):
+            return hmac.compare_digest(hashlib.sha256(senha.encode()).hexdigest(), senha_hash)
+
+        algoritmo, parametros, salt, esperado = senha_hash.split('$')
+        salt, esperado = _unb64(salt), _unb64(esperado)
+        if algoritmo == 'scrypt':
+            n, r, p = (int(v) for v in parametros.split(','))
+            derivado = hashlib.scrypt(senha.encode(), salt=salt, n=n, r=r, p=p,
+                                      maxmem=256 * r * (n + p + 2), dklen=len(esperado))
+        elif algoritmo == 'pbkdf2_sha256':
+            derivado = hashlib.pbkdf2_hmac('sha256', senha.encode(), salt, int(parametros), len(esperado))
+        else:
+            return False
+        return hmac.compare_digest(derivado, esperado)
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(senha_hash: str) -> bool:
+    """Hash legado ou com parâmetros diferentes dos atuais"""
+    if is_legacy_hash(senha_hash):
+        return True
+    if hasattr(hashlib, 'scrypt'):
+        return not senha_hash.startswith(f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}$")
+    return not senha_hash.startswith(f"pbkdf2_sha256${PBKDF2_ITERACOES}$")
+
+
+class SessionTokens:
+    """Tokens de sessão assinados (HMAC-SHA256) com cache LRU dos já verificados
+
+    O token é 'usuario_id.expira.nonce.assinatura'. A senha (KDF) só é
+    conferida no login; depois, cada requisição valida o token. Tokens no
+    cache são resolvidos sem assinatura nem banco; numa falta, a assinatura
+    é conferida e o usuário é carregado com `carregar_usuario`. O usuário em
+    cache vale só `cache_ttl_s` (bem menos que o token): depois disso é
+    recarregado, então desativação ou troca de plano valem logo.
+    """
+
+    def __init__(self, segredo: bytes, ttl_s: float, max_entradas: int,
+                 carregar_usuario: Callable[[int], Optional[Dict]], cache_ttl_s: float = 60):
+        self.segredo = segredo
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self.cache_ttl_s = cache_ttl_s
+        self.carregar_usuario = carregar_usuario
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._revogados: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _assinar(self, conteudo: str) -> str:
+        return _b64(hmac.new(self.segredo, conteudo.encode(), hashlib.sha256).digest())
+
+    def issue(self, usuario: Dict) -> str:
+        """Emite um token para o usuário autenticado e já o coloca no cache"""
+        expira = int(time.time() + self.ttl_s)
+        conteudo = f"{usuario['id']}.{expira}.{_b64(os.urandom(12))}"
+        token = f"{conteudo}.{self._assinar(conteudo)}"
+        self._guardar(token, usuario, expira, time.time())
+        return token
+
+    def verify(self, token: Optional[str]) -> Optional[Dict]:
+        """Usuário do token (None se inválido, expirado ou revogado)"""
+        if not token:
+            return None
+        agora = time.time()
+
+        with self._lock:
+            entrada = self._cache.get(token)
+            if entrada is not None:
+                usuario, valido_ate = entrada
+                if valido_ate > agora:
+                    self._cache.move_to_end(token)
+                    return usuario
+                # Token expirado ou usuário antigo no cache: conferir de novo abaixo
+                del self._cache[token]
+            if token in self._revogados:
+                return None
+
+        try:
+            conteudo, assinatura = token.rsplit('.', 1)
+            usuario_id, expira, _ = conteudo.split('.')
+            usuario_id, expira = int(usuario_id), int(expira)
+        except ValueError:
+            return None
+        if expira <= agora or not hmac.compare_digest(assinatura, self._assinar(conteudo)):
+            return None
+
+        usuario = self.carregar_usuario(usuario_id)
+        if usuario is not None:
+            self._guardar(token, usuario, expira, agora)
+        return usuario
+
+    def revoke(self, token: Optional[str]):
+        """Invalida o token (logout) até a sua expiração"""
+        if not token:
+            return
+        agora = time.time()
+        with self._lock:
+            self._cache.pop(token, None)
+            try:
+                self._revogados[token] = int(token.split('.')[1])
+            except (IndexError, ValueError):
+                return
+            for antigo in [t for t, expira in self._revogados.items() if expira <= agora]:
+                del self._revogados[antigo]
+
+    def _guardar(self, token: str, usuario: Dict, expira: float, agora: float):
+        with self._lock:
+            self._cache[token] = (usuario, min(expira, agora + self.cache_ttl_s))
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
@@ -0,0 +1,223 @@
+"""
+Orçamento em Lote - Pasta ou ZIP de Arquivos 3D
+
+Uso: python batch_orcamento.py projetos.zip -o resultados.jsonl --processos 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from catalogo_precos import CatalogoPrecos
+from componentes import para_json
+from config import Config
+
+# Instâncias por processo (criadas uma vez no inicializador do pool)
+_analisador = None
+_engine = None
+
+
+def _inicializar_processo():
+    global _analisador, _engine
+    from file_analyzer import FileAnalyzer
+    from orcamento_engine import OrcamentoEngine
+    _analisador = FileAnalyzer()
+    _engine = OrcamentoEngine()
+
+
+def orcar_arquivo(caminho: str, nome: str, configuracoes: Dict, completo: bool = False,
+                  unidade: str = 'auto') -> Dict:
+    """Analisa e orça um arquivo; executado nos processos do pool"""
+    inicio = time.perf_counter()
+    registro = {'arquivo': nome, 'tamanho_mb': round(os.path.getsize(caminho) / (1024 * 1024), 2)}
+
+    try:
+        analise = _analisador.analyze_path(caminho, nome, unidade=unidade)
+        orcamento = _engine.calcular_orcamento(analise, configuracoes)
+        if not orcamento:
+            raise ValueError("Erro ao calcular orçamento")
+
+        registro.update({
+            'status': 'sucesso',
+            'formato': analise['formato'],
+            'total_componentes': analise['total_componentes'],
+            'resumo': orcamento['resumo']
+        })
+        if 'unidade' in analise:
+            registro['unidade'] = analise['unidade']
+            registro['unidade_origem'] = analise['unidade_origem']
+        if 'plano_corte' in orcamento:
+            registro['num_chapas'] = orcamento['plano_corte']['num_chapas']
+        if completo:
+            registro['analise'] = analise
+            registro['orcamento'] = orcamento
+    except Exception as e:
+        registro.update({'status': 'erro', 'erro': str(e)})
+
+    registro['tempo_s'] = round(time.perf_counter() - inicio, 3)
+    return registro
+
+
+def listar_entrada(entrada: str) -> Iterator[Tuple[str, str]]:
+    """(nome, caminho ou membro do ZIP) dos arquivos 3D suportados"""
+    extensoes = tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS)
+
+    if zipfile.is_zipfile(entrada):
+        with zipfile.ZipFile(entrada) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(extensoes):
+                    yield info.filename, info.filename
+        return
+
+    for raiz, _, arquivos in os.walk(entrada):
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(extensoes):
+                caminho = os.path.join(raiz, nome)
+                yield os.path.relpath(caminho, entrada), caminho
+
+
+def _extrair(zip_path: str, membro: str, destino: str) -> str:
+    """Extrai um membro do ZIP em blocos (cada thread abre o seu handle)"""
+    with zipfile.ZipFile(zip_path) as zf, zf.open(membro) as origem, open(destino, 'wb') as saida:
+        shutil.copyfileobj(origem, saida, 1024 * 1024)
+    return destino
+
+
+def processar_lote(entrada: str, saida: TextIO, configuracoes: Dict, processos: Optional[int] = None,
+                   threads: int = 4, completo: bool = False, unidade: str = 'auto') -> Dict:
+    """Orça todos os arquivos da entrada, gravando um JSON por linha conforme terminam
+
+    A extração do ZIP roda em threads; análise e orçamento em processos.
+    Retorna as estatísticas de vazão do lote.
+    """
+    processos = processos or os.cpu_count() or 1
+    eh_zip = zipfile.is_zipfile(entrada)
+    temporario = tempfile.mkdtemp(prefix='orca_lote_') if eh_zip else None
+
+    estatisticas = {'arquivos': 0, 'sucesso': 0, 'erro': 0, 'total_mb': 0.0, 'valor_total': 0.0}
+    inicio = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as io_pool, \
+                ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo) as cpu_pool:
+            # Extração (I/O) em threads; cada arquivo pronto vai para um processo
+            extracoes, orcamentos = {}, {}
+            for indice, (nome, origem) in enumerate(listar_entrada(entrada)):
+                if eh_zip:
+                    destino = os.path.join(temporario, f"{indice}_{os.path.basename(origem)}")
+                    extracoes[io_pool.submit(_extrair, entrada, origem, destino)] = nome
+                else:
+                    orcamentos[cpu_pool.submit(orcar_arquivo, origem, nome, configuracoes, completo, unidade)] = origem
+
+            pendentes = set(extracoes) | set(orcamentos)
+            while pendentes:
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if futuro in extracoes:
+                        nome = extracoes.pop(futuro)
+                        try:
+                            caminho = futuro.result()
+                        except (OSError, zipfile.BadZipFile) as e:
+                            _gravar(saida, {'arquivo': nome, 'status': 'erro', 'erro': str(e)}, estatisticas)
+                            continue
+                        novo = cpu_pool.submit(orcar_arquivo, caminho, nome, configuracoes, completo, unidade)
+                        orcamentos[novo] = caminho
+                        pendentes.add(novo)
+                    else:
+                        caminho = orcamentos.pop(futuro)
+                        _gravar(saida, futuro.result(), estatisticas)
+                        if eh_zip:
+                            os.unlink(caminho)
+    finally:
+        if temporario:
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    duracao = time.perf_counter() - inicio
+    estatisticas.update({
+        'total_mb': round(estatisticas['total_mb'], 2),
+        'valor_total': round(estatisticas['valor_total'], 2),
+        'duracao_s': round(duracao, 3),
+        'arquivos_por_s': round(estatisticas['arquivos'] / duracao, 2) if duracao > 0 else 0.0,
+        'mb_por_s': round(estatisticas['total_mb'] / duracao, 2) if duracao > 0 else 0.0
+    })
+    return estatisticas
+
+
+def _gravar(saida: TextIO, registro: Dict, estatisticas: Dict):
+    """Grava uma linha JSONL e atualiza os totais do lote"""
+    saida.write(json.dumps(registro, ensure_ascii=False, default=para_json) + '\n')
+    saida.flush()
+
+    estatisticas['arquivos'] += 1
+    estatisticas[registro['status']] += 1
+    estatisticas['total_mb'] += registro.get('tamanho_mb', 0)
+    if registro['status'] == 'sucesso':
+        estatisticas['valor_total'] += registro['resumo']['total_final']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento em lote de uma pasta ou ZIP de arquivos 3D")
+    parser.add_argument('entrada', help="Pasta ou arquivo ZIP com arquivos OBJ/STL/PLY/DAE")
+    parser.add_argument('-o', '--saida', default='-', help="Arquivo JSONL de saída (padrão: stdout)")
+    parser.add_argument('--material', default='MDF 15mm', help="Material do catálogo de preços")
+    parser.add_argument('--acessorios', default='comum', help="Linha de acessórios do catálogo")
+    parser.add_argument('--versao-precos', type=int, default=None,
+                        help="Versão do catálogo de preços (padrão: a mais recente)")
+    parser.add_argument('--complexidade', default='media', choices=['simples', 'media', 'complexa', 'premium'])
+    parser.add_argument('--margem', type=int, default=30, help="Margem de lucro (%%)")
+    parser.add_argument('--unidade', default='auto', choices=['auto'] + list(Config.UNIDADES_MODELO),
+                        help="Unidade dos modelos (padrão: a declarada no arquivo ou estimada)")
+    parser.add_argument('--otimizar-corte', action='store_true', help="Usar o plano de corte no desperdício")
+    parser.add_argument('--processos', type=int, default=None, help="Processos de análise (padrão: CPUs)")
+    parser.add_argument('--threads', type=int, default=4, help="Threads de extração")
+    parser.add_argument('--completo', action='store_true', help="Incluir análise e orçamento completos")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        parser.error(f"Entrada não encontrada: {args.entrada}")
+
+    # Versão fixada no início: todos os arquivos do lote usam a mesma tabela
+    catalogo = CatalogoPrecos(Config.CATALOGO_DB)
+    if args.versao_precos is not None and catalogo.info_versao(args.versao_precos) is None:
+        parser.error(f"Versão de preços inexistente: {args.versao_precos}")
+    versao = catalogo.resolver(args.versao_precos)
+    if args.material not in catalogo.nomes_materiais(versao):
+        parser.error(f"Material fora do catálogo (v{versao}): {args.material}")
+    if args.acessorios not in catalogo.linhas_acessorios(versao):
+        parser.error(f"Linha de acessórios fora do catálogo (v{versao}): {args.acessorios}")
+
+    configuracoes = {
+        'material': args.material,
+        'acessorios': args.acessorios,
+        'complexidade': args.complexidade,
+        'margem_lucro': args.margem,
+        'otimizar_corte': args.otimizar_corte,
+        'versao_precos': versao
+    }
+
+    saida = sys.stdout if args.saida == '-' else open(args.saida, 'w', encoding='utf-8')
+    try:
+        estatisticas = processar_lote(args.entrada, saida, configuracoes, args.processos,
+                                      args.threads, args.completo, args.unidade)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+    print(
+        f"{estatisticas['arquivos']} arquivos ({estatisticas['sucesso']} ok, {estatisticas['erro']} com erro), "
+        f"{estatisticas['total_mb']:.2f} MB em {estatisticas['duracao_s']:.2f} s - "
+        f"{estatisticas['arquivos_por_s']:.2f} arquivos/s, {estatisticas['mb_por_s']:.2f} MB/s, "
+        f"total R$ {estatisticas['valor_total']:,.2f}",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
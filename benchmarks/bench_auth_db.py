@@ -0,0 +1,118 @@
+"""
+Benchmark de concorrência do banco de usuários: conexão por chamada vs pool WAL
+
+Simula sessões simultâneas do Streamlit carregando o usuário (validação de
+sessão sem cache) e incrementando o contador de projetos. O custo do KDF no
+login fica em bench_login.py.
+
+Uso: python benchmarks/bench_auth_db.py [sessoes] [operacoes_por_sessao]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_manager import AuthManager
+
+EMAIL = 'demo@orcainteriores.com'
+SENHA = 'demo123'
+
+
+class AcessoLegado:
+    """Acesso como era antes do pool: uma conexão nova por chamada, journal padrão"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def get_user(self, user_id: int):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, email, nome, plano, projetos_mes, data_criacao FROM usuarios '
+            'WHERE id = ? AND ativo = 1',
+            (user_id,)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        return result
+
+    def increment_project_count(self, user_id: int):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('UPDATE usuarios SET projetos_mes = projetos_mes + 1 WHERE id = ?', (user_id,))
+        conn.commit()
+        conn.close()
+
+
+def executar(acesso, user_id: int, sessoes: int, operacoes: int):
+    """Cada sessão alterna leitura do usuário e incremento; retorna (ops/s, erros, p95 ms)"""
+    latencias, erros = [], []
+    barreira = threading.Barrier(sessoes)
+    lock = threading.Lock()
+
+    def sessao():
+        minhas, meus_erros = [], 0
+        barreira.wait()
+        for i in range(operacoes):
+            inicio = time.perf_counter()
+            try:
+                if i % 2 == 0:
+                    acesso.get_user(user_id)
+                else:
+                    acesso.increment_project_count(user_id)
+            except sqlite3.OperationalError:
+                meus_erros += 1
+            minhas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(minhas)
+            erros.append(meus_erros)
+
+    threads = [threading.Thread(target=sessao) for _ in range(sessoes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    p95 = latencias[int(len(latencias) * 0.95)] * 1000
+    return sessoes * operacoes / duracao, sum(erros), p95
+
+
+def main():
+    sessoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    operacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    print(f"{sessoes} sessões × {operacoes} operações (usuário / incremento alternados)")
+    print(f"{'modo':>22} {'ops/s':>10} {'erros':>7} {'p95 (ms)':>10}")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # Banco legado: journal padrão (rollback)
+        caminho = os.path.join(pasta, 'legado.db')
+        auth = AuthManager(caminho)
+        user_id = auth.authenticate(EMAIL, SENHA)['id']
+        auth.pool.connection().execute('PRAGMA journal_mode=DELETE')
+        auth.pool.close_all()
+        ops, erros, p95 = executar(AcessoLegado(caminho), user_id, sessoes, operacoes)
+        print(f"{'conexão por chamada':>22} {ops:>10.0f} {erros:>7} {p95:>10.1f}")
+
+        # Pool com conexões por thread em WAL
+        auth = AuthManager(os.path.join(pasta, 'pool.db'))
+        user_id = auth.authenticate(EMAIL, SENHA)['id']
+        ops, erros, p95 = executar(auth, user_id, sessoes, operacoes)
+        print(f"{'pool WAL':>22} {ops:>10.0f} {erros:>7} {p95:>10.1f}")
+
+        # Nenhum incremento pode se perder
+        contador = auth.get_monthly_usage(user_id)
+        esperado = sessoes * (operacoes // 2)
+        print(f"contador de projetos: {contador} (esperado {esperado})")
+        auth.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
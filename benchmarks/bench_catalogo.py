@@ -0,0 +1,106 @@
+"""
+Benchmark do catálogo de preços: 50.000 SKUs, carga sob demanda e cache por versão
+
+Uso: python benchmarks/bench_catalogo.py [skus]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_orcamento import gerar_analise
+from catalogo_precos import CatalogoPrecos
+from config import Config
+from orcamento_engine import OrcamentoEngine
+
+CATEGORIAS = ['MDF', 'MDP', 'Compensado', 'Melamina', 'OSB', 'Laminado']
+ESPESSURAS = [3, 6, 9, 12, 15, 18, 25]
+REPETICOES = 20000
+
+
+def catalogo_sintetico(skus: int, fator: float = 1.0) -> dict:
+    """Config.PRECOS_MATERIAIS mais `skus` materiais de categorias e espessuras variadas"""
+    aleatorio = random.Random(7)
+    materiais = {nome: dict(info, preco_m2=info['preco_m2'] * fator)
+                 for nome, info in Config.PRECOS_MATERIAIS.items()}
+    for i in range(skus - len(materiais)):
+        categoria = aleatorio.choice(CATEGORIAS)
+        espessura = aleatorio.choice(ESPESSURAS)
+        materiais[f"{categoria} {espessura}mm Ref {i:05d}"] = {
+            'sku': f"MAT-{i:06d}",
+            'categoria': categoria,
+            'preco_m2': round(aleatorio.uniform(30, 250) * fator, 2),
+            'desperdicio': aleatorio.choice([0.10, 0.12, 0.15]),
+            'descricao': f"{categoria} {espessura}mm"
+        }
+    return materiais
+
+
+def por_chamada(funcao, repeticoes: int = REPETICOES) -> float:
+    """Tempo médio por chamada em µs"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def main():
+    skus = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'catalogo.db')
+        catalogo = CatalogoPrecos(caminho)
+
+        inicio = time.perf_counter()
+        v1 = catalogo.publicar(catalogo_sintetico(skus), Config.PRECOS_ACESSORIOS, 'Sintético', '2025-07-01')
+        v2 = catalogo.publicar(catalogo_sintetico(skus, 1.08), Config.PRECOS_ACESSORIOS, 'Sintético', '2025-10-01')
+        print(f"2 versões de {skus} SKUs publicadas em {time.perf_counter() - inicio:.2f} s")
+
+        # Abrir o catálogo não lê os preços; carregar tudo seria o equivalente aos dicts do Config
+        inicio = time.perf_counter()
+        catalogo = CatalogoPrecos(caminho)
+        abrir_ms = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        tudo = catalogo.pool.query_all('SELECT * FROM materiais WHERE versao = ?', (v2,))
+        carregar_ms = (time.perf_counter() - inicio) * 1000
+        print(f"abrir o catálogo: {abrir_ms:.2f} ms; carregar os {len(tudo)} SKUs da versão: {carregar_ms:.1f} ms")
+
+        aleatorio = random.Random(1)
+        existentes = catalogo.nomes_materiais(v2, categoria='MDF', espessura_mm=18)
+        print(f"MDF 18mm na v{v2}: {len(existentes)} SKUs")
+
+        catalogo.limpar_cache()
+        frios = aleatorio.sample(existentes, min(2000, len(existentes)))
+        frio = por_chamada(lambda: catalogo.material(frios.pop(), v2), len(frios))
+        quente = por_chamada(lambda: catalogo.material('MDF 18mm', v2))
+        print(f"\n{'consulta':>34} {'µs':>9}")
+        print(f"{'material sem cache':>34} {frio:>9.1f}")
+        print(f"{'material em cache':>34} {quente:>9.2f}")
+        print(f"{'versão atual':>34} {por_chamada(catalogo.versao_atual):>9.1f}")
+        catalogo.limpar_cache()
+        filtro = por_chamada(lambda: catalogo.pool.query_all(
+            'SELECT nome FROM materiais WHERE versao = ? AND categoria = ? AND espessura_mm = ?',
+            (v1, 'OSB', 9)), 200)
+        print(f"{'categoria + espessura (índice)':>34} {filtro:>9.1f}")
+
+        # Orçamento com 500 componentes em cada versão (a v1 segue disponível)
+        engine = OrcamentoEngine(catalogo)
+        analise = gerar_analise(500)
+        configuracoes = {'material': 'MDF 18mm', 'acessorios': 'premium', 'complexidade': 'media',
+                         'margem_lucro': 30}
+        print(f"\n{'orçamento (500 componentes)':>34} {'ms':>9} {'total (R$)':>14}")
+        for versao in (v1, v2):
+            inicio = time.perf_counter()
+            orcamento = engine.calcular_orcamento(analise, dict(configuracoes, versao_precos=versao))
+            duracao = (time.perf_counter() - inicio) * 1000
+            print(f"{f'v{versao}':>34} {duracao:>9.2f} {orcamento['resumo']['total_final']:>14,.2f}")
+
+        catalogo.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark de memória: componentes em dicts x Componente/LinhaOrcamento (__slots__)
+
+Mede com tracemalloc a memória retida pela análise e pelo orçamento de um
+projeto grande nas duas representações. Os dicts são cópias independentes
+(ida e volta pelo JSON), como chegam do cache de análises ou do histórico.
+
+Uso: python benchmarks/bench_componentes.py [componentes]
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_orcamento import gerar_analise
+from catalogo_precos import CatalogoPrecos
+from componentes import compactar_analise, para_json
+from orcamento_engine import OrcamentoEngine
+
+CONFIGURACOES = {'material': 'MDF 18mm', 'acessorios': 'premium', 'complexidade': 'media', 'margem_lucro': 30}
+
+
+def retido(criar):
+    """(objeto criado, MB retidos depois da criação)"""
+    gc.collect()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = criar()
+    gc.collect()
+    return objeto, (tracemalloc.get_traced_memory()[0] - antes) / 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = OrcamentoEngine(CatalogoPrecos(os.path.join(pasta, 'catalogo.db')))
+        texto_analise = json.dumps(gerar_analise(n), default=para_json)
+        engine.calcular_orcamento(json.loads(texto_analise), CONFIGURACOES)
+
+        tracemalloc.start()
+        analise_dicts, mb_analise_dicts = retido(lambda: json.loads(texto_analise))
+        analise, mb_analise = retido(lambda: compactar_analise(json.loads(texto_analise)))
+
+        inicio = time.perf_counter()
+        orcamento, mb_linhas = retido(lambda: engine.calcular_orcamento(analise, CONFIGURACOES)['componentes'])
+        duracao = (time.perf_counter() - inicio) * 1000
+        texto_linhas = json.dumps(orcamento, default=para_json)
+        linhas_dicts, mb_linhas_dicts = retido(lambda: json.loads(texto_linhas))
+        tracemalloc.stop()
+
+        print(f"{n} componentes (orçamento calculado em {duracao:.0f} ms com tracemalloc ativo)")
+        print(f"{'':>12} {'dicts (MB)':>11} {'slots (MB)':>11} {'redução':>8}")
+        for nome, antes, depois in (('análise', mb_analise_dicts, mb_analise),
+                                    ('orçamento', mb_linhas_dicts, mb_linhas),
+                                    ('total', mb_analise_dicts + mb_linhas_dicts, mb_analise + mb_linhas)):
+            print(f"{nome:>12} {antes:>11.1f} {depois:>11.1f} {antes / depois:>7.1f}x")
+
+        del analise_dicts, linhas_dicts
+        engine.catalogo.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark da fila de análises: tempo que a sessão fica presa por arquivo
+
+Compara a análise síncrona (analyze_file + calcular_orcamento, como o botão
+fazia) com o envio para a FilaAnalises, que só copia o upload para disco e
+grava o job. Depois envia vários arquivos de usuários diferentes de uma vez
+e mede a vazão do pool de processos até todos terminarem.
+
+Uso: python benchmarks/bench_fila.py [objetos] [arquivos] [processos]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalogo_precos import CatalogoPrecos
+from fila_analises import ATIVOS, FilaAnalises
+from file_analyzer import FileAnalyzer
+from orcamento_engine import OrcamentoEngine
+
+CONFIGURACOES = {'material': 'MDF 18mm', 'acessorios': 'comum', 'complexidade': 'media', 'margem_lucro': 30}
+
+
+class Upload(io.BytesIO):
+    """Arquivo em memória com nome, como o UploadedFile do Streamlit"""
+
+    def __init__(self, dados: bytes, name: str):
+        super().__init__(dados)
+        self.name = name
+
+
+def gerar_obj(objetos: int, semente: int = 0) -> bytes:
+    """OBJ com `objetos` caixas (uma chapa de 18 mm cada)"""
+    linhas = []
+    for k in range(objetos):
+        x, largura, altura = k * 100, 40 + (k + semente) % 50, 30 + (k * 7 + semente) % 60
+        linhas.append(f"o peca_{k}")
+        for dx, dy, dz in ((0, 0, 0), (largura, 0, 0), (largura, altura, 0), (0, altura, 0),
+                           (0, 0, 1.8), (largura, 0, 1.8), (largura, altura, 1.8), (0, altura, 1.8)):
+            linhas.append(f"v {x + dx} {dy} {dz}")
+        base = k * 8
+        for a, b, c, d in ((1, 2, 3, 4), (5, 6, 7, 8), (1, 2, 6, 5), (2, 3, 7, 6), (3, 4, 8, 7), (4, 1, 5, 8)):
+            linhas.append(f"f {base + a} {base + b} {base + c} {base + d}")
+    return ('\n'.join(linhas) + '\n').encode()
+
+
+def main():
+    objetos = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    arquivos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    processos = int(sys.argv[3]) if len(sys.argv) > 3 else max(1, (os.cpu_count() or 2) - 1)
+
+    origem = os.getcwd()
+    with tempfile.TemporaryDirectory() as pasta:
+        # Bancos, cache de análises e uploads ficam na pasta temporária
+        os.chdir(pasta)
+        dados = [gerar_obj(objetos, semente) for semente in range(arquivos)]
+        print(f"{arquivos} arquivos de {len(dados[0]) / 1e6:.1f} MB ({objetos} objetos), {processos} processo(s)")
+
+        # Antes: análise e orçamento na thread da sessão (arquivo à parte, para não aquecer o cache)
+        analisador, engine = FileAnalyzer(), OrcamentoEngine(CatalogoPrecos('catalogo.db'))
+        inicio = time.perf_counter()
+        analise = analisador.analyze_file(Upload(gerar_obj(objetos, arquivos), 'projeto.obj'))
+        engine.calcular_orcamento(analise, CONFIGURACOES)
+        sincrono = time.perf_counter() - inicio
+        print(f"{'síncrono (sessão presa)':>28} {sincrono * 1000:>9.0f} ms")
+
+        # Depois: a sessão só envia; o pool analisa (usuários distintos, sem limite por usuário)
+        fila = FilaAnalises('fila.db', 'fila', processos)
+        inicio = time.perf_counter()
+        jobs = [fila.enviar(usuario, Upload(d, f'projeto_{usuario}.obj'), 'Cliente', 'Sala', CONFIGURACOES)
+                for usuario, d in enumerate(dados, start=1)]
+        envio = (time.perf_counter() - inicio) / arquivos
+        print(f"{'fila (sessão presa)':>28} {envio * 1000:>9.1f} ms por arquivo")
+
+        pendentes = set(range(1, arquivos + 1))
+        while pendentes:
+            time.sleep(0.1)
+            for usuario in list(pendentes):
+                if all(job['status'] not in ATIVOS for job in fila.listar(usuario)):
+                    pendentes.discard(usuario)
+        total = time.perf_counter() - inicio
+
+        concluidos = sum(1 for usuario, job_id in enumerate(jobs, start=1)
+                         if fila.retirar(usuario, job_id) is not None)
+        print(f"{'fila (todos concluídos)':>28} {total * 1000:>9.0f} ms "
+              f"({concluidos}/{arquivos} ok, {arquivos / total:.2f} arquivos/s; síncrono: {1 / sincrono:.2f}/s)")
+
+        fila.encerrar()
+        fila.pool.close_all()
+        engine.catalogo.pool.close_all()
+        os.chdir(origem)
+
+
+if __name__ == '__main__':
+    main()
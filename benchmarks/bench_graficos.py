@@ -0,0 +1,60 @@
+"""
+Benchmark dos gráficos: figuras refeitas x cache por impressão digital
+
+Para cada tamanho de projeto mede gerar_graficos sem cache (primeira
+chamada), em cache (um rerun do Streamlit com o mesmo orçamento) e o
+tamanho do JSON enviado ao navegador, com e sem agregação das séries.
+
+Uso: python benchmarks/bench_graficos.py [componentes ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_orcamento import gerar_analise
+from catalogo_precos import CatalogoPrecos
+from orcamento_engine import OrcamentoEngine
+
+CONFIGURACOES = {'material': 'MDF 18mm', 'acessorios': 'premium', 'complexidade': 'media', 'margem_lucro': 30}
+
+
+def kb(graficos: dict) -> float:
+    return sum(len(fig.to_json()) for fig in graficos.values() if fig is not None) / 1024
+
+
+def main():
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [50, 2000, 20000]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = OrcamentoEngine(CatalogoPrecos(os.path.join(pasta, 'catalogo.db')))
+        engine.gerar_graficos(engine.calcular_orcamento(gerar_analise(10), CONFIGURACOES))  # importa o plotly
+
+        print(f"{'componentes':>11} {'sem cache (ms)':>15} {'em cache (ms)':>14} {'payload (KB)':>13} "
+              f"{'sem agregar (KB)':>17}")
+        for n in tamanhos:
+            orcamento = engine.calcular_orcamento(gerar_analise(n), CONFIGURACOES)
+
+            inicio = time.perf_counter()
+            graficos = engine.gerar_graficos(orcamento)
+            frio = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            repetido = engine.gerar_graficos(orcamento)
+            quente = (time.perf_counter() - inicio) * 1000
+            assert repetido is graficos
+
+            # Mesmas figuras com as séries completas (comportamento anterior)
+            completo = OrcamentoEngine(engine.catalogo)
+            completo.LIMITE_BARRAS = completo.LIMITE_PONTOS = n + 1
+            print(f"{n:>11} {frio:>15.1f} {quente:>14.2f} {kb(graficos):>13.1f} "
+                  f"{kb(completo.gerar_graficos(orcamento)):>17.1f}")
+
+        engine.catalogo.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
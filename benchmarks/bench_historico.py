@@ -0,0 +1,95 @@
+"""
+Benchmark do histórico de orçamentos: listagem paginada e filtros para um
+usuário com 10.000 orçamentos (mais orçamentos de outros usuários no banco)
+
+Uso: python benchmarks/bench_historico.py [orcamentos_do_usuario] [componentes_por_orcamento]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_orcamento import gerar_analise
+from componentes import para_json
+from historico_orcamentos import HistoricoOrcamentos
+from orcamento_engine import OrcamentoEngine
+
+CLIENTES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Fernando', 'Gabriela', 'Henrique']
+AMBIENTES = ['Cozinha', 'Banheiro', 'Quarto', 'Sala', 'Escritório']
+REPETICOES = 200
+
+
+def medir(funcao) -> float:
+    """Tempo médio em ms"""
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        funcao()
+    return (time.perf_counter() - inicio) / REPETICOES * 1000
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_componentes = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    engine = OrcamentoEngine()
+    analise = gerar_analise(num_componentes)
+    analise.update({'nome_arquivo': 'projeto.obj', 'formato': 'obj', 'total_componentes': num_componentes})
+    orcamento = engine.calcular_orcamento(analise, {'material': 'MDF 15mm', 'margem_lucro': 30})
+    bruto = len(json.dumps({'analise': analise, 'orcamento': orcamento}, ensure_ascii=False, default=para_json).encode('utf-8'))
+
+    rng = random.Random(42)
+    base = datetime(2025, 1, 1)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        historico = HistoricoOrcamentos(os.path.join(pasta, 'orcamentos.db'))
+
+        inicio = time.perf_counter()
+        for i in range(total + total // 5):
+            orcamento['data_orcamento'] = (base + timedelta(minutes=rng.randrange(525600))).isoformat()
+            orcamento['resumo']['total_final'] = rng.uniform(1000, 50000)
+            usuario_id = rng.randrange(2, 50) if i % 6 == 5 else 1
+            historico.salvar(usuario_id, f"{rng.choice(CLIENTES)} {i}", rng.choice(AMBIENTES),
+                             analise, orcamento)
+        duracao = time.perf_counter() - inicio
+
+        armazenado = historico.pool.query_one('SELECT AVG(LENGTH(dados)) FROM orcamentos_dados')[0]
+        codec = historico.pool.query_one('SELECT codec FROM orcamentos_dados LIMIT 1')[0]
+        gravados = total + total // 5
+        print(f"{gravados} orçamentos gravados em {duracao:.2f} s ({gravados / duracao:.0f}/s)")
+        print(f"payload: {bruto / 1024:.1f} KB em JSON -> {armazenado / 1024:.1f} KB em {codec} "
+              f"({bruto / armazenado:.1f}x)")
+        print(f"orçamentos do usuário 1: {historico.contar(1)}")
+
+        # Cursor da página 200, percorrendo a listagem
+        profundo = None
+        for _ in range(199):
+            profundo = historico.buscar(1, limite=20, apos=profundo)['proximo']
+
+        ultimo_id = historico.buscar(1, limite=1)['itens'][0]['id']
+        consultas = [
+            ('primeira página', lambda: historico.buscar(1, limite=20)),
+            ('página 200 (cursor)', lambda: historico.buscar(1, limite=20, apos=profundo)),
+            ('cliente por prefixo', lambda: historico.buscar(1, cliente='gab', limite=20)),
+            ('ambiente + período', lambda: historico.buscar(1, ambiente='Cozinha', data_inicio='2025-06-01',
+                                                            data_fim='2025-06-30', limite=20)),
+            ('faixa de total', lambda: historico.buscar(1, total_min=10000, total_max=12000, limite=20)),
+            ('contagem', lambda: historico.contar(1)),
+            ('abrir orçamento', lambda: historico.carregar(1, ultimo_id)),
+        ]
+
+        print(f"\n{'consulta':>22} {'ms':>8}")
+        for nome, funcao in consultas:
+            print(f"{nome:>22} {medir(funcao):>8.3f}")
+
+        historico.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de login: KDF (scrypt) sob carga concorrente e validação de sessão por token
+
+Compara o login com o SHA-256 legado e com o KDF atual, e o custo por
+requisição de revalidar a senha, validar o token sem cache (HMAC + banco) e
+validar o token pelo cache LRU.
+
+Uso: python benchmarks/bench_login.py [sessoes] [logins_por_sessao]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_manager import AuthManager
+from auth_security import SessionTokens
+
+SENHA = 'senha-de-teste'
+REQUISICOES = 2000
+
+
+def concorrente(funcao, sessoes: int, operacoes: int):
+    """Executa `funcao(sessao, i)` em paralelo; retorna (ops/s, p50 ms, p95 ms, falhas)"""
+    latencias, falhas = [], []
+    barreira = threading.Barrier(sessoes)
+    lock = threading.Lock()
+
+    def sessao(indice):
+        minhas, minhas_falhas = [], 0
+        barreira.wait()
+        for i in range(operacoes):
+            inicio = time.perf_counter()
+            if not funcao(indice, i):
+                minhas_falhas += 1
+            minhas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(minhas)
+            falhas.append(minhas_falhas)
+
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(sessoes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return (sessoes * operacoes / duracao, latencias[len(latencias) // 2] * 1000,
+            latencias[int(len(latencias) * 0.95)] * 1000, sum(falhas))
+
+
+def main():
+    sessoes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as pasta:
+        auth = AuthManager(os.path.join(pasta, 'login.db'))
+
+        inicio = time.perf_counter()
+        auth.create_users({'email': f'usuario{i}@teste.com', 'senha': SENHA, 'nome': f'Usuário {i}'}
+                          for i in range(sessoes))
+        print(f"{sessoes} contas criadas em {time.perf_counter() - inicio:.2f} s (hash em threads)")
+
+        # Contas legadas: SHA-256 sem salt, regravadas no primeiro login
+        legado = hashlib.sha256(SENHA.encode()).hexdigest()
+        with auth.pool.transaction() as conn:
+            conn.execute("UPDATE usuarios SET senha_hash = ? WHERE email LIKE 'usuario%'", (legado,))
+
+        print(f"\n{sessoes} sessões × {logins} logins")
+        print(f"{'modo':>30} {'ops/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'falhas':>7}")
+
+        def login(sessao, _):
+            return auth.authenticate(f'usuario{sessao}@teste.com', SENHA) is not None
+
+        def legado_sha(sessao, _):
+            senha_hash = hashlib.sha256(SENHA.encode()).hexdigest()
+            return auth.pool.query_one(
+                'SELECT id FROM usuarios WHERE email = ? AND senha_hash = ? AND ativo = 1',
+                (f'usuario{sessao}@teste.com', senha_hash)
+            ) is not None
+
+        ops, p50, p95, falhas = concorrente(legado_sha, sessoes, logins)
+        print(f"{'login SHA-256 (legado)':>30} {ops:>10.0f} {p50:>10.2f} {p95:>10.2f} {falhas:>7}")
+        ops, p50, p95, falhas = concorrente(login, sessoes, 1)
+        print(f"{'1º login (rehash)':>30} {ops:>10.1f} {p50:>10.2f} {p95:>10.2f} {falhas:>7}")
+        ops, p50, p95, falhas = concorrente(login, sessoes, logins)
+        print(f"{'login scrypt':>30} {ops:>10.1f} {p50:>10.2f} {p95:>10.2f} {falhas:>7}")
+
+        regravados = auth.pool.query_one(
+            "SELECT COUNT(*) FROM usuarios WHERE email LIKE 'usuario%' AND senha_hash LIKE 'scrypt$%'")[0]
+        print(f"hashes legados regravados: {regravados}/{sessoes}")
+
+        # Validação por requisição depois do login
+        usuarios = [auth.authenticate(f'usuario{i}@teste.com', SENHA) for i in range(sessoes)]
+        tokens = [auth.sessoes.issue(u) for u in usuarios]
+        sem_cache = SessionTokens(auth.sessoes.segredo, auth.sessoes.ttl_s, 0, auth.get_user)
+        por_sessao = max(REQUISICOES // sessoes, 1)
+
+        print(f"\n{sessoes} sessões × {por_sessao} requisições autenticadas")
+        print(f"{'modo':>30} {'ops/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'falhas':>7}")
+        modos = [
+            ('senha a cada requisição', login, max(logins, 1)),
+            ('token sem cache', lambda s, _: sem_cache.verify(tokens[s]) is not None, por_sessao),
+            ('token em cache (LRU)', lambda s, _: auth.sessoes.verify(tokens[s]) is not None, por_sessao),
+        ]
+        for nome, funcao, operacoes in modos:
+            ops, p50, p95, falhas = concorrente(funcao, sessoes, operacoes)
+            print(f"{nome:>30} {ops:>10.0f} {p50:>10.3f} {p95:>10.3f} {falhas:>7}")
+
+        auth.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
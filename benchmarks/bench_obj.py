@@ -0,0 +1,104 @@
+"""
+Benchmark do leitor de OBJ: variações de sintaxe e vazão em MB/s
+
+Confere que variações válidas do formato (tabs, indentação, comentários no
+fim da linha, continuação com '\\', CRLF e linhas continuadas na fronteira
+entre blocos) dão a mesma malha que o arquivo canônico; depois mede a
+leitura de um OBJ grande.
+
+Uso: python benchmarks/bench_obj.py [caixas]
+"""
+
+import functools
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mesh_parser
+from mesh_parser import parse_obj
+
+
+def gerar_obj(caixas: int) -> str:
+    """OBJ canônico com `caixas` caixas em objetos e materiais alternados"""
+    linhas = []
+    for k in range(caixas):
+        x = k * 100.0
+        linhas.append(f"o caixa_{k}")
+        linhas.append(f"usemtl {'MDF' if k % 2 else 'Melamina'}")
+        for dx in (0, 60):
+            for dy in (0, 70):
+                for dz in (0, 18):
+                    linhas.append(f"v {x + dx:g} {dy:g} {dz:g}")
+        base = 8 * k
+        for a, b, c, d in ((1, 2, 4, 3), (5, 7, 8, 6), (1, 5, 6, 2), (3, 4, 8, 7), (1, 3, 7, 5), (2, 6, 8, 4)):
+            linhas.append(f"f {base + a} {base + b} {base + c} {base + d}")
+    return '\n'.join(linhas) + '\n'
+
+
+def variacoes(canonico: str) -> dict:
+    """Mesmo conteúdo escrito de formas diferentes"""
+    linhas = canonico.splitlines()
+    return {
+        'tabs': '\n'.join(l.replace(' ', '\t') for l in linhas) + '\n',
+        'indentado': '\n'.join('  \t' + l for l in linhas) + '\n',
+        'comentarios': '# exportado\n' + '\n'.join(l + '  # nota' for l in linhas) + '\n',
+        'continuacao': '\n'.join(l.replace(' ', ' \\\n  ', 1) if l[0] in 'vf' else l for l in linhas) + '\n',
+        'crlf': '\r\n'.join(linhas) + '\r\n',
+        'sem_quebra_final': '\n'.join(linhas),
+    }
+
+
+def ler(texto: str):
+    with tempfile.NamedTemporaryFile('w', suffix='.obj', delete=False, newline='') as f:
+        f.write(texto)
+    try:
+        return parse_obj(f.name)
+    finally:
+        os.unlink(f.name)
+
+
+def mesma_malha(a, b) -> bool:
+    return (np.array_equal(a.vertices, b.vertices) and np.array_equal(a.faces, b.faces) and
+            np.array_equal(a.face_object, b.face_object) and a.object_names == b.object_names and
+            np.array_equal(a.face_material, b.face_material) and a.material_names == b.material_names)
+
+
+def main():
+    caixas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    canonico = gerar_obj(200)
+    referencia = ler(canonico)
+    # Blocos pequenos: linhas continuadas e comentários caem na fronteira entre blocos
+    iter_chunks = mesh_parser.iter_chunks
+    for tamanho_bloco in (mesh_parser.CHUNK_SIZE, 97):
+        mesh_parser.iter_chunks = functools.partial(iter_chunks, chunk_size=tamanho_bloco)
+        try:
+            for nome, texto in variacoes(canonico).items():
+                if not mesma_malha(ler(texto), referencia):
+                    raise SystemExit(f"Malha diferente do OBJ canônico: {nome} (bloco de {tamanho_bloco} bytes)")
+        finally:
+            mesh_parser.iter_chunks = iter_chunks
+    print(f"{len(variacoes(canonico))} variações de sintaxe: mesma malha que o OBJ canônico")
+
+    texto = gerar_obj(caixas)
+    with tempfile.NamedTemporaryFile('w', suffix='.obj', delete=False) as f:
+        f.write(texto)
+    try:
+        tamanho_mb = os.path.getsize(f.name) / (1024 * 1024)
+        melhor = float('inf')
+        for _ in range(3):
+            inicio = time.perf_counter()
+            malha = parse_obj(f.name)
+            melhor = min(melhor, time.perf_counter() - inicio)
+    finally:
+        os.unlink(f.name)
+    print(f"{tamanho_mb:.1f} MB, {malha.num_faces} triângulos: {melhor * 1000:.0f} ms ({tamanho_mb / melhor:.1f} MB/s)")
+
+
+if __name__ == '__main__':
+    main()
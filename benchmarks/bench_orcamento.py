@@ -0,0 +1,123 @@
+"""
+Benchmark do cálculo de orçamento: caminho por componente vs colunar
+
+Uso: python benchmarks/bench_orcamento.py [num_componentes ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from componentes import compactar_analise
+from mesh_metrics import build_component
+from orcamento_engine import OrcamentoEngine
+
+TIPOS = ['armario', 'gaveteiro', 'prateleira', 'bancada', 'guarda_roupa', 'porta', 'painel']
+
+
+def gerar_componentes(num_componentes: int, semente: int = 42) -> list:
+    """Componentes sintéticos (dicts) de tamanhos e tipos variados"""
+    aleatorio = random.Random(semente)
+    componentes = []
+    for i in range(num_componentes):
+        componente = build_component(
+            f"{aleatorio.choice(TIPOS)}_{i}", 'projeto.obj',
+            aleatorio.uniform(20, 240), aleatorio.uniform(10, 260),
+            aleatorio.uniform(2, 70), aleatorio.uniform(0.05, 6)
+        )
+        if aleatorio.random() < 0.3:
+            componente['acessorios'] += ['fechadura'] + ['parafuso'] * aleatorio.randint(0, 12)
+        componentes.append(componente)
+    return componentes
+
+
+def gerar_analise(num_componentes: int, semente: int = 42) -> dict:
+    """Projeto sintético com componentes de tamanhos e tipos variados"""
+    componentes = gerar_componentes(num_componentes, semente)
+    return compactar_analise({
+        'componentes': componentes,
+        'area_total_m2': sum(c['area_m2'] for c in componentes)
+    })
+
+
+def orcamento_referencia(componentes: list, configuracoes: dict) -> dict:
+    """Resumo pelo cálculo original: um dict por componente, somas item a item na ordem da lista"""
+    info = Config.PRECOS_MATERIAIS[configuracoes['material']]
+    precos = Config.PRECOS_ACESSORIOS[configuracoes['acessorios']]
+    custos, total_material, total_acessorios, total_corte = [], 0, 0, 0
+    for comp in componentes:
+        custo_material = comp['area_m2'] * (1 + info['desperdicio']) * info['preco_m2']
+        custo_acessorios = 0
+        for acessorio in comp['acessorios']:
+            custo_acessorios += precos.get(acessorio, 0)
+        perimetro = (2 * (comp['largura_cm'] / 100 + comp['profundidade_cm'] / 100) +
+                     2 * (comp['altura_cm'] / 100 + comp['profundidade_cm'] / 100))
+        furos = len([a for a in comp['acessorios'] if a in ['dobradica', 'fechadura']])
+        custo_corte = max(perimetro * 2.50 + furos * 1.50, 15.00)
+        custos.append((custo_material, custo_acessorios, custo_corte,
+                       custo_material + custo_acessorios + custo_corte))
+        total_material += custo_material
+        total_acessorios += custo_acessorios
+        total_corte += custo_corte
+
+    subtotal = total_material + total_acessorios + total_corte
+    margem = configuracoes['margem_lucro'] / 100
+    total_final = (subtotal + subtotal * margem +
+                   subtotal * OrcamentoEngine.PERCENTUAL_MAO_OBRA[configuracoes['complexidade']])
+    return {'componentes': custos, 'custo_acessorios': total_acessorios, 'total_final': total_final}
+
+
+def conferir_referencia(orcamento: dict, referencia: dict) -> bool:
+    """Mesmos valores e tipos (repr) que o cálculo original, componente a componente"""
+    custos = [(l.custo_material, l.custo_acessorios, l.custo_corte, l.custo_total)
+              for l in orcamento['componentes']]
+    return (repr(custos) == repr(referencia['componentes']) and
+            repr(orcamento['resumo']['custo_acessorios']) == repr(referencia['custo_acessorios']) and
+            repr(orcamento['resumo']['total_final']) == repr(referencia['total_final']))
+
+
+def medir(funcao, repeticoes: int = 7) -> float:
+    """Menor tempo (s) entre as repetições"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [200, 2000, 20000]
+    engine = OrcamentoEngine()
+
+    print(f"{'componentes':>12} {'por comp. (ms)':>14} {'colunar (ms)':>13} {'ganho':>7}  idênticos")
+    for tamanho in tamanhos:
+        componentes = gerar_componentes(tamanho)
+        analise = gerar_analise(tamanho)
+        for material in Config.PRECOS_MATERIAIS:
+            for acessorios in Config.PRECOS_ACESSORIOS:
+                configuracoes = {'material': material, 'acessorios': acessorios,
+                                 'complexidade': 'complexa', 'margem_lucro': 35}
+                por_dict = engine.calcular_orcamento(analise, configuracoes, colunar=False)
+                colunar = engine.calcular_orcamento(analise, configuracoes, colunar=True)
+                for orcamento in (por_dict, colunar):
+                    orcamento.pop('data_orcamento')
+                if por_dict != colunar:
+                    raise SystemExit(f"Divergência com {tamanho} componentes: {material}/{acessorios}")
+                if not conferir_referencia(por_dict, orcamento_referencia(componentes, configuracoes)):
+                    raise SystemExit(f"Diferente do cálculo original com {tamanho} componentes: "
+                                     f"{material}/{acessorios}")
+
+        configuracoes = {'material': 'MDF 18mm', 'acessorios': 'premium',
+                         'complexidade': 'media', 'margem_lucro': 30}
+        t_dict = medir(lambda: engine.calcular_orcamento(analise, configuracoes, colunar=False))
+        t_col = medir(lambda: engine.calcular_orcamento(analise, configuracoes, colunar=True))
+        print(f"{tamanho:>12} {t_dict * 1000:>14.2f} {t_col * 1000:>13.2f} {t_dict / t_col:>6.1f}x  sim")
+
+
+if __name__ == '__main__':
+    main()
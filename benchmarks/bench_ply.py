@@ -0,0 +1,120 @@
+"""
+Benchmark do leitor de PLY binário com listas de tamanho variável
+
+Confere que faces com triângulos, quadriláteros e pentágonos misturados
+(little/big endian, tipos de contagem e de índice diferentes, propriedades
+antes e depois da lista) dão a triangulação em leque esperada; depois mede
+a leitura de um PLY com faces mistas contra um só de quadriláteros (caminho
+de tamanho fixo).
+
+Uso: python benchmarks/bench_ply.py [faces]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mesh_parser import parse_ply
+
+
+def gerar_poligonos(faces: int, vertices: int, tamanhos=(3, 4, 5), semente: int = 7):
+    rng = np.random.default_rng(semente)
+    contagens = rng.choice(tamanhos, size=faces)
+    return [rng.integers(0, vertices, size=n) for n in contagens]
+
+
+def leque(poligonos) -> np.ndarray:
+    """Triangulação em leque de referência, polígono a polígono"""
+    triangulos = [(p[0], p[k], p[k + 1]) for p in poligonos for k in range(1, len(p) - 1)]
+    return np.array(triangulos, dtype=np.int64).reshape(-1, 3)
+
+
+def gravar_ply(caminho: str, vertices: np.ndarray, poligonos, ordem: str = '<', contagem: str = 'uchar',
+               indice: str = 'int', extras: bool = False):
+    tipos = {'uchar': 'u1', 'ushort': 'u2', 'int': 'i4', 'uint': 'u4'}
+    formato = 'binary_little_endian' if ordem == '<' else 'binary_big_endian'
+    cabecalho = [
+        'ply', f'format {formato} 1.0', f'element vertex {len(vertices)}',
+        'property float x', 'property float y', 'property float z',
+        f'element face {len(poligonos)}',
+    ]
+    if extras:
+        cabecalho.append('property uchar flags')
+    cabecalho.append(f'property list {contagem} {indice} vertex_indices')
+    if extras:
+        cabecalho += ['property list uchar float texcoord', 'property int material']
+    cabecalho.append('end_header')
+
+    tipo_contagem = np.dtype(tipos[contagem]).newbyteorder(ordem)
+    tipo_indice = np.dtype(tipos[indice]).newbyteorder(ordem)
+    partes = [('\n'.join(cabecalho) + '\n').encode(), vertices.astype(np.dtype('f4').newbyteorder(ordem)).tobytes()]
+    for k, p in enumerate(poligonos):
+        if extras:
+            partes.append(np.uint8(k % 256).tobytes())
+        partes.append(np.array([len(p)], dtype=tipo_contagem).tobytes())
+        partes.append(p.astype(tipo_indice).tobytes())
+        if extras:
+            partes.append(np.array([2 * len(p)], dtype='u1').tobytes())
+            partes.append(np.zeros(2 * len(p), dtype=np.dtype('f4').newbyteorder(ordem)).tobytes())
+            partes.append(np.array([k], dtype=np.dtype('i4').newbyteorder(ordem)).tobytes())
+    with open(caminho, 'wb') as f:
+        f.write(b''.join(partes))
+
+
+def ler(vertices, poligonos, **opcoes):
+    with tempfile.NamedTemporaryFile(suffix='.ply', delete=False) as f:
+        caminho = f.name
+    try:
+        gravar_ply(caminho, vertices, poligonos, **opcoes)
+        return parse_ply(caminho)
+    finally:
+        os.unlink(caminho)
+
+
+def cronometrar(vertices, poligonos) -> float:
+    with tempfile.NamedTemporaryFile(suffix='.ply', delete=False) as f:
+        caminho = f.name
+    try:
+        gravar_ply(caminho, vertices, poligonos)
+        melhor = float('inf')
+        for _ in range(3):
+            inicio = time.perf_counter()
+            parse_ply(caminho)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        return melhor
+    finally:
+        os.unlink(caminho)
+
+
+def main():
+    faces = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    vertices = np.random.default_rng(1).random((500, 3))
+    poligonos = gerar_poligonos(3000, len(vertices), tamanhos=(3, 4, 5, 2))
+    esperado = leque(poligonos)
+    variacoes = [
+        {'ordem': ordem, 'contagem': contagem, 'indice': indice, 'extras': extras}
+        for ordem in ('<', '>')
+        for contagem, indice in (('uchar', 'int'), ('int', 'uint'), ('uchar', 'ushort'))
+        for extras in (False, True)
+    ]
+    for opcoes in variacoes:
+        malha = ler(vertices, poligonos, **opcoes)
+        if not np.array_equal(malha.faces, esperado):
+            raise SystemExit(f"Triangulação diferente da esperada: {opcoes}")
+    print(f"{len(variacoes)} variações de PLY binário: mesma triangulação em leque")
+
+    vertices = np.random.default_rng(2).random((faces, 3))
+    mistas = cronometrar(vertices, gerar_poligonos(faces, len(vertices), tamanhos=(3, 4)))
+    quadrilateros = cronometrar(vertices, gerar_poligonos(faces, len(vertices), tamanhos=(4,)))
+    print(f"{faces} faces mistas (triângulos + quadriláteros): {mistas * 1000:.0f} ms")
+    print(f"{faces} quadriláteros (tamanho fixo):            {quadrilateros * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark dos relatórios: documento montado em memória x gravado em blocos
+
+Para cada formato mede tempo e pico de memória (tracemalloc) de gerar o
+arquivo de download com relatorios.arquivo_relatorio, gravando direto no
+disco (limite_memoria=1) para que só a geração conte, e compara com montar
+o documento inteiro como texto (o que o app fazia antes).
+
+Uso: python benchmarks/bench_relatorio.py [componentes]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_orcamento import gerar_analise
+from componentes import para_json
+from catalogo_precos import CatalogoPrecos
+from orcamento_engine import OrcamentoEngine
+from relatorios import ESCRITORES, arquivo_relatorio, blocos_markdown
+
+CONFIGURACOES = {'material': 'MDF 18mm', 'acessorios': 'premium', 'complexidade': 'media', 'margem_lucro': 30}
+
+
+def medir(funcao):
+    """(resultado, ms, pico de memória em MB)"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = (time.perf_counter() - inicio) * 1000
+    pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return resultado, duracao, pico
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = OrcamentoEngine(CatalogoPrecos(os.path.join(pasta, 'catalogo.db')))
+        analise = gerar_analise(n)
+        orcamento = engine.calcular_orcamento(analise, CONFIGURACOES)
+
+        print(f"{n} componentes")
+        print(f"{'formato':>26} {'MB':>7} {'ms':>9} {'pico (MB)':>10}")
+
+        # Antes: o documento inteiro como texto
+        texto, duracao, pico = medir(lambda: ''.join(blocos_markdown(orcamento, 'Cliente', 'Sala')).encode())
+        print(f"{'Markdown em memória':>26} {len(texto) / 1e6:>7.1f} {duracao:>9.1f} {pico:>10.1f}")
+        texto, duracao, pico = medir(lambda: json.dumps({
+            'cliente': 'Cliente', 'ambiente': 'Sala', 'analise': analise, 'orcamento': orcamento
+        }, indent=2, ensure_ascii=False, default=para_json).encode())
+        print(f"{'JSON em memória':>26} {len(texto) / 1e6:>7.1f} {duracao:>9.1f} {pico:>10.1f}")
+        del texto
+
+        # Depois: blocos gravados no arquivo
+        for formato, escritor in ESCRITORES.items():
+            arquivo, duracao, pico = medir(
+                lambda: arquivo_relatorio(formato, orcamento, analise, 'Cliente', 'Sala', limite_memoria=1)
+            )
+            tamanho = arquivo.seek(0, os.SEEK_END)
+            arquivo.close()
+            print(f"{escritor.nome + ' em blocos':>26} {tamanho / 1e6:>7.1f} {duracao:>9.1f} {pico:>10.1f}")
+
+        engine.catalogo.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
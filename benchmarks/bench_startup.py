@@ -0,0 +1,130 @@
+"""
+Benchmark de inicialização: imports do app.py e tempo até a tela de login
+
+Mede, em processos novos, o custo de importar o app.py (python -X importtime)
+e o tempo para renderizar a tela de login. O custo próprio do app é a soma
+dos tempos dos módulos que uma página Streamlit com o mesmo cabeçalho não
+importa (o que o Streamlit carrega sob demanda fica de fora). Falha
+(código de saída 1) se o caminho de login voltar a importar bibliotecas
+pesadas ou se o custo próprio passar do limite.
+
+Uso: python benchmarks/bench_startup.py [--limite-ms 50] [--limite-login-ms N] [--repeticoes 3]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que a tela de login não pode carregar
+PROIBIDOS = ['pandas', 'plotly.express', 'numpy', 'orcamento_engine', 'file_analyzer', 'mesh_parser', 'fila_analises']
+
+# Imports do app.py além do que o próprio Streamlit carrega (ms)
+LIMITE_IMPORT_MS = 50
+
+# Página só com o cabeçalho do app: o que o Streamlit importa sozinho
+BASE = '''
+import streamlit as st
+from config import Config
+st.set_page_config(**Config.get_page_config())
+st.markdown(Config.get_css_styles(), unsafe_allow_html=True)
+'''
+
+LOGIN = '''
+import sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+pronto = time.perf_counter()
+teste = AppTest.from_file({app!r}, default_timeout=120)
+teste.run()
+fim = time.perf_counter()
+assert not teste.exception, teste.exception
+proibidos = [m for m in {proibidos!r} if m in sys.modules]
+print(round((pronto - inicio) * 1000, 1), round((fim - pronto) * 1000, 1), ','.join(proibidos))
+'''
+
+
+def importtime(pasta: str, codigo: str) -> dict:
+    """(tempo próprio, tempo cumulativo) em ms por módulo importado por `codigo`, num processo novo"""
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=pasta, capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=RAIZ)
+    )
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, proprio, cumulativo, nome = (parte.strip() for parte in linha.replace('import time:', '|').split('|'))
+        tempos[nome] = (int(proprio) / 1000, int(cumulativo) / 1000)
+    return tempos
+
+
+def tela_login(pasta: str):
+    """(ms para importar o Streamlit, ms até a tela de login, módulos proibidos carregados)"""
+    codigo = LOGIN.format(app=os.path.join(RAIZ, 'app.py'), proibidos=PROIBIDOS)
+    resultado = subprocess.run([sys.executable, '-c', codigo], cwd=pasta, capture_output=True, text=True,
+                               env=dict(os.environ, PYTHONPATH=RAIZ))
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr[-2000:])
+    campos = resultado.stdout.splitlines()[-1].split(' ')
+    return float(campos[0]), float(campos[1]), [m for m in campos[2].split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do app")
+    parser.add_argument('--limite-ms', type=float, default=LIMITE_IMPORT_MS,
+                        help="Limite dos imports próprios do app.py (ms)")
+    parser.add_argument('--limite-login-ms', type=float, default=None,
+                        help="Limite opcional do tempo até a tela de login (ms)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    falhas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        # Banco de usuários numa pasta temporária (não toca o usuarios.db do repositório)
+        shutil.copy(os.path.join(RAIZ, 'usuarios.db'), pasta)
+
+        # import app: melhor de N processos, comparado com a página mínima
+        medicoes = [importtime(pasta, 'import app') for _ in range(args.repeticoes)]
+        melhor = min(medicoes, key=lambda tempos: tempos['app'][1])
+        base = set()
+        for _ in range(args.repeticoes):
+            base |= set(importtime(pasta, BASE))
+
+        extras = {nome: proprio for nome, (proprio, _) in melhor.items() if nome not in base and nome != 'app'}
+        proprio_ms = sum(extras.values())
+        print(f"import app: {melhor['app'][1]:.1f} ms no total, {proprio_ms:.1f} ms além do Streamlit "
+              f"({len(extras)} módulos)")
+        for nome, ms in sorted(extras.items(), key=lambda item: -item[1])[:8]:
+            print(f"  {nome:<28} {ms:>8.1f} ms")
+
+        if proprio_ms > args.limite_ms:
+            falhas.append(f"imports do app.py em {proprio_ms:.1f} ms (limite {args.limite_ms:.0f} ms)")
+        carregados = [m for m in PROIBIDOS if m in melhor]
+        if carregados:
+            falhas.append(f"import app carrega {', '.join(carregados)}")
+
+        # Tela de login renderizada (o primeiro processo cria/migra o banco e fica de fora)
+        tela_login(pasta)
+        logins = [tela_login(pasta) for _ in range(args.repeticoes)]
+        streamlit_ms, login_ms, proibidos = min(logins, key=lambda medida: medida[1])
+        print(f"tela de login: {login_ms:.1f} ms após importar o Streamlit ({streamlit_ms:.1f} ms)")
+
+        if proibidos:
+            falhas.append(f"a tela de login carrega {', '.join(proibidos)}")
+        if args.limite_login_ms is not None and login_ms > args.limite_login_ms:
+            falhas.append(f"tela de login em {login_ms:.1f} ms (limite {args.limite_login_ms:.0f} ms)")
+
+    if falhas:
+        for falha in falhas:
+            print(f"REGRESSÃO: {falha}", file=sys.stderr)
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == '__main__':
+    main()
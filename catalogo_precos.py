@@ -0,0 +1,304 @@
+"""
+Catálogo de Preços Versionado
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+from config import Config
+from db_pool import get_pool
+
+# Entradas mantidas no cache de leitura (materiais, tabelas de acessórios, listas)
+CACHE_ENTRADAS = 4096
+# Por quanto tempo o número da versão atual vale sem reconsultar o banco
+VERSAO_TTL_S = 5.0
+
+
+def _sku(*partes: str) -> str:
+    """SKU legível a partir do nome (ex.: 'MAT-MDF-15MM')"""
+    texto = unicodedata.normalize('NFKD', '-'.join(partes)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^A-Z0-9]+', '-', texto.upper()).strip('-')
+
+
+def _espessura(nome: str) -> Optional[float]:
+    encontrado = re.search(r'(\d+(?:[.,]\d+)?)\s*mm', nome)
+    return float(encontrado.group(1).replace(',', '.')) if encontrado else None
+
+
+class CatalogoPrecos:
+    """Preços de materiais e acessórios em versões imutáveis
+
+    Cada versão é uma fotografia completa da tabela de preços, indexada por
+    SKU, categoria e espessura; as listas seguem a ordem de publicação. Um
+    orçamento guarda a versão usada e pode ser reprecificado com qualquer
+    versão antiga. As leituras passam por um cache
+    LRU em memória com a versão na chave: como uma versão nunca muda depois
+    de publicada, publicar uma nova basta para que as próximas consultas à
+    versão atual leiam preços novos. O número da versão atual também fica em
+    memória: `publicar` o atualiza na hora e, a cada `versao_ttl_s`, um
+    `SELECT MAX(versao)` enxerga versões publicadas por outros processos.
+    Nada é carregado até a primeira consulta.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: str = "catalogo.db", cache_entradas: int = CACHE_ENTRADAS,
+                 versao_ttl_s: float = VERSAO_TTL_S):
+        self.db_path = db_path
+        self.pool = get_pool(self.db_path)
+        self.cache_entradas = cache_entradas
+        self.versao_ttl_s = versao_ttl_s
+        self._cache: 'OrderedDict[tuple, object]' = OrderedDict()
+        self._versao_atual: Optional[int] = None
+        self._versao_conferida = 0.0
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        """Cria as tabelas e publica a tabela inicial (Config) se o catálogo estiver vazio"""
+        try:
+            if self.pool.query_one('PRAGMA user_version')[0] >= self.SCHEMA_VERSION:
+                return
+
+            with self.pool.transaction() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS versoes (
+                        versao INTEGER PRIMARY KEY,
+                        fonte TEXT NOT NULL,
+                        data_referencia TEXT NOT NULL,
+                        data_publicacao TEXT NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS materiais (
+                        versao INTEGER NOT NULL,
+                        sku TEXT NOT NULL,
+                        nome TEXT NOT NULL,
+                        categoria TEXT NOT NULL,
+                        espessura_mm REAL,
+                        preco_m2 REAL NOT NULL,
+                        desperdicio REAL NOT NULL,
+                        veio INTEGER NOT NULL DEFAULT 0,
+                        descricao TEXT,
+                        UNIQUE (versao, sku)
+                    )
+                ''')
+                # Índices de filtro incluem o nome: a listagem não precisa ler a tabela
+                conn.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_materiais_nome
+                    ON materiais (versao, nome)
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_materiais_categoria_espessura
+                    ON materiais (versao, categoria, espessura_mm, nome)
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_materiais_espessura
+                    ON materiais (versao, espessura_mm, nome)
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS acessorios (
+                        versao INTEGER NOT NULL,
+                        sku TEXT NOT NULL,
+                        linha TEXT NOT NULL,
+                        tipo TEXT NOT NULL,
+                        preco REAL NOT NULL,
+                        UNIQUE (versao, sku)
+                    )
+                ''')
+                conn.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_acessorios_linha
+                    ON acessorios (versao, linha, tipo)
+                ''')
+
+                if conn.execute('SELECT COUNT(*) FROM versoes').fetchone()[0] == 0:
+                    self._inserir_versao(
+                        conn, Config.PRECOS_MATERIAIS, Config.PRECOS_ACESSORIOS,
+                        Config.FONTE_PRECOS_INICIAL, Config.DATA_PRECOS_INICIAL
+                    )
+                conn.execute(f'PRAGMA user_version = {int(self.SCHEMA_VERSION)}')
+        except Exception as e:
+            st.error(f"Erro ao inicializar catálogo de preços: {e}")
+
+    def publicar(self, materiais: Dict[str, Dict], acessorios: Dict[str, Dict[str, float]],
+                 fonte: str, data_referencia: str) -> int:
+        """Publica uma nova versão completa da tabela; retorna o número da versão
+
+        `materiais` e `acessorios` têm o formato de Config.PRECOS_MATERIAIS e
+        Config.PRECOS_ACESSORIOS; materiais podem trazer 'sku' e 'categoria'.
+        """
+        with self.pool.transaction() as conn:
+            versao = self._inserir_versao(conn, materiais, acessorios, fonte, data_referencia)
+        self._lembrar_versao(versao)
+        return versao
+
+    def _inserir_versao(self, conn, materiais: Dict[str, Dict], acessorios: Dict[str, Dict[str, float]],
+                        fonte: str, data_referencia: str) -> int:
+        versao = conn.execute('SELECT COALESCE(MAX(versao), 0) + 1 FROM versoes').fetchone()[0]
+        conn.execute('''
+            INSERT INTO versoes (versao, fonte, data_referencia, data_publicacao)
+            VALUES (?, ?, ?, ?)
+        ''', (versao, fonte, data_referencia, datetime.now().isoformat()))
+
+        conn.executemany('''
+            INSERT INTO materiais
+            (versao, sku, nome, categoria, espessura_mm, preco_m2, desperdicio, veio, descricao)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (
+                versao,
+                info.get('sku') or _sku('MAT', nome),
+                nome,
+                info.get('categoria') or nome.split()[0],
+                info.get('espessura_mm', _espessura(nome)),
+                info['preco_m2'],
+                info['desperdicio'],
+                int(bool(info.get('veio', False))),
+                info.get('descricao')
+            )
+            for nome, info in materiais.items()
+        ))
+        conn.executemany('''
+            INSERT INTO acessorios (versao, sku, linha, tipo, preco)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            (versao, _sku('ACE', linha, tipo), linha, tipo, preco)
+            for linha, precos in acessorios.items()
+            for tipo, preco in precos.items()
+        ))
+        return versao
+
+    def versao_atual(self) -> int:
+        """Versão mais recente publicada"""
+        with self._lock:
+            if (self._versao_atual is not None and
+                    time.monotonic() - self._versao_conferida < self.versao_ttl_s):
+                return self._versao_atual
+            conferida = time.monotonic()
+        versao = self.pool.query_one('SELECT MAX(versao) FROM versoes')[0]
+        with self._lock:
+            self._versao_conferida = max(self._versao_conferida, conferida)
+        return self._lembrar_versao(versao)
+
+    def _lembrar_versao(self, versao: Optional[int]) -> Optional[int]:
+        # Versões só crescem: guardar o maior valor visto evita que uma leitura
+        # antiga, concluída depois de um `publicar`, volte a versão para trás
+        with self._lock:
+            if versao is not None and (self._versao_atual is None or versao > self._versao_atual):
+                self._versao_atual = versao
+            return self._versao_atual
+
+    def resolver(self, versao: Optional[int] = None) -> int:
+        """A versão informada, ou a atual quando None"""
+        return versao if versao is not None else self.versao_atual()
+
+    def versoes(self) -> List[Dict]:
+        """Versões publicadas, da mais recente para a mais antiga"""
+        return [
+            {'versao': versao, 'fonte': fonte, 'data_referencia': data_referencia, 'data_publicacao': publicacao}
+            for versao, fonte, data_referencia, publicacao in self.pool.query_all(
+                'SELECT versao, fonte, data_referencia, data_publicacao FROM versoes ORDER BY versao DESC'
+            )
+        ]
+
+    def _em_cache(self, chave: tuple, carregar):
+        with self._lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                return self._cache[chave]
+
+        valor = carregar()
+        with self._lock:
+            self._cache[chave] = valor
+            while len(self._cache) > self.cache_entradas:
+                self._cache.popitem(last=False)
+        return valor
+
+    def info_versao(self, versao: Optional[int] = None) -> Optional[Dict]:
+        """Fonte e data de referência de uma versão"""
+        versao = self.resolver(versao)
+
+        def carregar():
+            linha = self.pool.query_one(
+                'SELECT fonte, data_referencia, data_publicacao FROM versoes WHERE versao = ?', (versao,)
+            )
+            if not linha:
+                return None
+            return {'versao': versao, 'fonte': linha[0], 'data_referencia': linha[1], 'data_publicacao': linha[2]}
+
+        return self._em_cache(('versao', versao), carregar)
+
+    def fonte_precos(self, versao: Optional[int] = None) -> str:
+        """Texto da fonte de preços (ex.: 'Léo Madeiras - Atualizado em 30/06/2025')"""
+        info = self.info_versao(versao)
+        if not info:
+            return ''
+        data = datetime.fromisoformat(info['data_referencia']).strftime('%d/%m/%Y')
+        return f"{info['fonte']} - Atualizado em {data}"
+
+    def material(self, nome: str, versao: Optional[int] = None) -> Optional[Dict]:
+        """Preço e desperdício de um material (mesmo formato de Config.PRECOS_MATERIAIS)"""
+        versao = self.resolver(versao)
+
+        def carregar():
+            linha = self.pool.query_one('''
+                SELECT sku, categoria, espessura_mm, preco_m2, desperdicio, veio, descricao
+                FROM materiais WHERE versao = ? AND nome = ?
+            ''', (versao, nome))
+            if not linha:
+                return None
+            return {
+                'sku': linha[0],
+                'categoria': linha[1],
+                'espessura_mm': linha[2],
+                'preco_m2': linha[3],
+                'desperdicio': linha[4],
+                'veio': bool(linha[5]),
+                'descricao': linha[6]
+            }
+
+        return self._em_cache(('material', versao, nome), carregar)
+
+    def precos_acessorios(self, linha: str, versao: Optional[int] = None) -> Dict[str, float]:
+        """Preço por tipo de acessório de uma linha ('comum', 'premium'...)"""
+        versao = self.resolver(versao)
+        return self._em_cache(('acessorios', versao, linha), lambda: dict(self.pool.query_all(
+            'SELECT tipo, preco FROM acessorios WHERE versao = ? AND linha = ?', (versao, linha)
+        )))
+
+    def nomes_materiais(self, versao: Optional[int] = None, categoria: Optional[str] = None,
+                        espessura_mm: Optional[float] = None) -> List[str]:
+        """Nomes dos materiais da versão, opcionalmente por categoria e/ou espessura"""
+        versao = self.resolver(versao)
+        condicoes, parametros = ['versao = ?'], [versao]
+        if categoria is not None:
+            condicoes.append('categoria = ?')
+            parametros.append(categoria)
+        if espessura_mm is not None:
+            condicoes.append('espessura_mm = ?')
+            parametros.append(espessura_mm)
+
+        sql = f"SELECT nome FROM materiais WHERE {' AND '.join(condicoes)} ORDER BY rowid"
+        return self._em_cache(('nomes', versao, categoria, espessura_mm),
+                              lambda: [nome for (nome,) in self.pool.query_all(sql, parametros)])
+
+    def linhas_acessorios(self, versao: Optional[int] = None) -> List[str]:
+        """Linhas de acessórios da versão"""
+        versao = self.resolver(versao)
+        return self._em_cache(('linhas', versao), lambda: [linha for (linha,) in self.pool.query_all(
+            'SELECT linha FROM acessorios WHERE versao = ? GROUP BY linha ORDER BY MIN(rowid)', (versao,)
+        )])
+
+    def limpar_cache(self):
+        """Esvazia o cache de leitura"""
+        with self._lock:
+            self._cache.clear()
+            self._versao_atual = None
+            self._versao_conferida = 0.0
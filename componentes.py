@@ -0,0 +1,256 @@
+"""
+Componentes e Linhas de Orçamento - Representação Compacta
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+class Acessorio(IntEnum):
+    """Ferragens conhecidas; o valor é a posição no vetor de contagens"""
+
+    DOBRADICA = 0
+    CORREDICAO = 1
+    PUXADOR = 2
+    FECHADURA = 3
+    PARAFUSO = 4
+
+    @property
+    def chave(self) -> str:
+        """Nome usado no catálogo e nos dicts ('dobradica', ...)"""
+        return self.name.lower()
+
+
+NUM_ACESSORIOS = len(Acessorio)
+CHAVES_ACESSORIOS = tuple(a.chave for a in Acessorio)
+_INDICE_ACESSORIO = {chave: a for a, chave in zip(Acessorio, CHAVES_ACESSORIOS)}
+
+# Vetores de contagem e de preços são tuplas compartilhadas: projetos grandes
+# repetem poucas combinações, então cada componente guarda só a referência.
+# As combinações menos usadas saem primeiro (LRU) num servidor de longa duração.
+VETORES_MAX = 4096
+_VETORES: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_VETORES_LOCK = threading.Lock()
+
+
+def _compartilhado(vetor: tuple) -> tuple:
+    with _VETORES_LOCK:
+        existente = _VETORES.get(vetor)
+        if existente is not None:
+            _VETORES.move_to_end(vetor)
+            return existente
+        _VETORES[vetor] = vetor
+        if len(_VETORES) > VETORES_MAX:
+            _VETORES.popitem(last=False)
+        return vetor
+
+
+def contar_acessorios(nomes: Iterable[str]) -> Tuple[int, ...]:
+    """Vetor de contagens (indexado por Acessorio) a partir da lista de nomes
+
+    Nomes fora de Acessorio são ignorados: não têm preço na tabela (como
+    antes, custo zero) e análises salvas com eles continuam abrindo.
+    """
+    contagens = [0] * NUM_ACESSORIOS
+    for nome in nomes:
+        indice = _INDICE_ACESSORIO.get(nome)
+        if indice is not None:
+            contagens[indice] += 1
+    return _compartilhado(tuple(contagens))
+
+
+def vetor_precos(precos: Mapping[str, float]) -> Tuple[float, ...]:
+    """Preço unitário por Acessorio a partir de uma tabela do catálogo (0 se ausente)"""
+    return _compartilhado(tuple(float(precos.get(chave, 0)) for chave in CHAVES_ACESSORIOS))
+
+
+def soma_repetida(preco: float, quantidade: int) -> float:
+    """Preço somado `quantidade` vezes, como no laço item a item"""
+    total = 0.0
+    for _ in range(quantidade):
+        total += preco
+    return total
+
+
+class Componente:
+    """Componente identificado na análise
+
+    As ferragens são um vetor de contagens por Acessorio em vez da lista de
+    nomes repetidos. to_dict devolve o formato de dict usado no JSON.
+    """
+
+    __slots__ = ('id', 'nome', 'tipo', 'largura_cm', 'altura_cm', 'profundidade_cm', 'area_m2',
+                 'material_sugerido', 'acessorios', 'espessura_mm', 'num_chapas')
+
+    def __init__(self, id: str, nome: str, tipo: str, largura_cm: float, altura_cm: float,
+                 profundidade_cm: float, area_m2: float, material_sugerido: str,
+                 acessorios: Tuple[int, ...] = (0,) * NUM_ACESSORIOS,
+                 espessura_mm: Optional[float] = None, num_chapas: Optional[int] = None):
+        self.id = id
+        self.nome = nome
+        self.tipo = sys.intern(tipo)
+        self.largura_cm = largura_cm
+        self.altura_cm = altura_cm
+        self.profundidade_cm = profundidade_cm
+        self.area_m2 = area_m2
+        self.material_sugerido = sys.intern(material_sugerido)
+        self.acessorios = _compartilhado(tuple(acessorios))
+        self.espessura_mm = espessura_mm
+        self.num_chapas = num_chapas
+
+    def __eq__(self, outro):
+        if type(outro) is not type(self):
+            return NotImplemented
+        return all(getattr(self, nome) == getattr(outro, nome) for nome in self.__slots__)
+
+    __hash__ = None
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> 'Componente':
+        return cls(
+            dados['id'], dados['nome'], dados['tipo'],
+            dados['largura_cm'], dados['altura_cm'], dados['profundidade_cm'], dados['area_m2'],
+            dados.get('material_sugerido', 'MDF 15mm'),
+            contar_acessorios(dados.get('acessorios', [])),
+            dados.get('espessura_mm'), dados.get('num_chapas')
+        )
+
+    def nomes_acessorios(self) -> List[str]:
+        """Lista de nomes repetidos (formato antigo), na ordem de Acessorio"""
+        return [chave for chave, quantidade in zip(CHAVES_ACESSORIOS, self.acessorios) for _ in range(quantidade)]
+
+    def to_dict(self) -> Dict:
+        dados = {
+            'id': self.id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'largura_cm': self.largura_cm,
+            'altura_cm': self.altura_cm,
+            'profundidade_cm': self.profundidade_cm,
+            'area_m2': self.area_m2,
+            'material_sugerido': self.material_sugerido,
+            'acessorios': self.nomes_acessorios()
+        }
+        if self.espessura_mm is not None:
+            dados['espessura_mm'] = self.espessura_mm
+        if self.num_chapas is not None:
+            dados['num_chapas'] = self.num_chapas
+        return dados
+
+
+class LinhaOrcamento:
+    """Custo de um componente no orçamento
+
+    Guarda só os custos calculados; as ferragens ficam como referência ao
+    vetor de contagens do componente e ao vetor de preços da tabela usada,
+    e o detalhamento é montado sob demanda.
+    """
+
+    __slots__ = ('id', 'nome', 'tipo', 'area_m2', 'material', 'area_com_desperdicio', 'custo_material',
+                 'custo_acessorios', 'custo_corte', 'custo_total', 'quantidades', 'precos')
+
+    def __init__(self, id: str, nome: str, tipo: str, area_m2: float, material: str,
+                 area_com_desperdicio: float, custo_material: float, custo_acessorios: float,
+                 custo_corte: float, custo_total: float, quantidades: Tuple[int, ...],
+                 precos: Tuple[float, ...]):
+        self.id = id
+        self.nome = nome
+        self.tipo = tipo
+        self.area_m2 = area_m2
+        self.material = sys.intern(material)
+        self.area_com_desperdicio = area_com_desperdicio
+        self.custo_material = custo_material
+        self.custo_acessorios = custo_acessorios
+        self.custo_corte = custo_corte
+        self.custo_total = custo_total
+        self.quantidades = quantidades
+        self.precos = precos
+
+    def __eq__(self, outro):
+        # Preços de acessórios ausentes não aparecem (nem voltam do JSON): compara o detalhamento
+        if type(outro) is not type(self):
+            return NotImplemented
+        return (all(getattr(self, nome) == getattr(outro, nome) for nome in self.__slots__ if nome != 'precos') and
+                self.acessorios_detalhados == outro.acessorios_detalhados)
+
+    __hash__ = None
+
+    @property
+    def preco_por_m2(self) -> float:
+        return self.custo_total / self.area_m2 if self.area_m2 > 0 else 0
+
+    @property
+    def acessorios_detalhados(self) -> Dict[str, Dict]:
+        """{acessório: {'quantidade', 'preco_unitario', 'custo_total'}} dos acessórios presentes"""
+        return {
+            chave: {
+                'quantidade': quantidade,
+                'preco_unitario': preco,
+                'custo_total': soma_repetida(preco, quantidade)
+            }
+            for chave, quantidade, preco in zip(CHAVES_ACESSORIOS, self.quantidades, self.precos)
+            if quantidade
+        }
+
+    def substituir(self, **campos) -> 'LinhaOrcamento':
+        """Cópia com alguns campos trocados"""
+        valores = {nome: getattr(self, nome) for nome in self.__slots__}
+        valores.update(campos)
+        return LinhaOrcamento(**valores)
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> 'LinhaOrcamento':
+        detalhados = dados.get('acessorios_detalhados', {})
+        return cls(
+            dados['id'], dados['nome'], dados['tipo'], dados['area_m2'], dados['material'],
+            dados['area_com_desperdicio'], dados['custo_material'], dados['custo_acessorios'],
+            dados['custo_corte'], dados['custo_total'],
+            _compartilhado(tuple(detalhados.get(chave, {}).get('quantidade', 0) for chave in CHAVES_ACESSORIOS)),
+            _compartilhado(tuple(float(detalhados.get(chave, {}).get('preco_unitario', 0))
+                                 for chave in CHAVES_ACESSORIOS))
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'area_m2': self.area_m2,
+            'area_com_desperdicio': self.area_com_desperdicio,
+            'material': self.material,
+            'custo_material': self.custo_material,
+            'custo_acessorios': self.custo_acessorios,
+            'custo_corte': self.custo_corte,
+            'custo_total': self.custo_total,
+            'acessorios_detalhados': self.acessorios_detalhados,
+            'preco_por_m2': self.preco_por_m2
+        }
+
+
+def componentes_de(analise: Dict) -> List[Componente]:
+    """Componentes da análise como Componente (aceita análises com dicts)"""
+    return [c if isinstance(c, Componente) else Componente.de_dict(c) for c in analise.get('componentes', [])]
+
+
+def compactar_analise(analise: Dict) -> Dict:
+    """Análise com os componentes em Componente"""
+    return {**analise, 'componentes': componentes_de(analise)}
+
+
+def compactar_orcamento(orcamento: Dict) -> Dict:
+    """Orçamento (ex.: lido do JSON) com os componentes em LinhaOrcamento"""
+    if not orcamento:
+        return orcamento
+    return {**orcamento, 'componentes': [
+        c if isinstance(c, LinhaOrcamento) else LinhaOrcamento.de_dict(c) for c in orcamento.get('componentes', [])
+    ]}
+
+
+def para_json(objeto):
+    """`default` do json: serializa Componente e LinhaOrcamento como dict"""
+    if isinstance(objeto, (Componente, LinhaOrcamento)):
+        return objeto.to_dict()
+    raise TypeError(f"Objeto do tipo {type(objeto).__name__} não é serializável em JSON")
@@ -2,6 +2,8 @@
 Configurações da Aplicação Orça Interiores SaaS
 """
 
+import os
+
 import streamlit as st
 
 class Config:
@@ -14,6 +16,31 @@ class Config:
     MAX_FILE_SIZE_MB = 500
     ALLOWED_EXTENSIONS = ['obj', 'dae', 'stl', 'ply']
     
+    # Unidades do modelo 3D (metros por unidade); 'auto' usa a do arquivo ou estima
+    UNIDADES_MODELO = {'m': 1.0, 'cm': 0.01, 'mm': 0.001, 'in': 0.0254}
+    
+    # Cache de análises (arquivos reenviados não são processados de novo)
+    CACHE_DIR = '.cache_analises'
+    CACHE_MAX_MB = 256
+    
+    # Histórico de orçamentos (ao lado de usuarios.db)
+    HISTORICO_DB = 'orcamentos.db'
+    HISTORICO_POR_PAGINA = 20
+
+    # Fila de análises: jobs em SQLite executados por um pool de processos
+    FILA_DB = 'fila_analises.db'
+    FILA_DIR = '.fila_analises'
+    FILA_PROCESSOS = max(1, (os.cpu_count() or 2) - 1)
+    FILA_JOBS_POR_USUARIO = 2
+    FILA_INTERVALO_S = 1.0
+
+    # Sessões: tokens assinados com este segredo (aleatório por processo se não definido)
+    SESSION_SECRET = os.environ.get('ORCA_SESSION_SECRET', '')
+    SESSION_TTL_S = 8 * 3600
+    SESSION_CACHE_SIZE = 4096
+    # Usuário de um token em cache é recarregado do banco após este tempo
+    SESSION_CACHE_TTL_S = 60
+    
     # Cores do tema
     CORES = {
         'primaria': '#2E86AB',
@@ -69,6 +96,11 @@ class Config:
         }
     }
     
+    # Catálogo de preços versionado; as tabelas abaixo são a versão inicial
+    CATALOGO_DB = 'catalogo.db'
+    FONTE_PRECOS_INICIAL = 'Léo Madeiras'
+    DATA_PRECOS_INICIAL = '2025-06-30'
+    
     # Preços de materiais (Léo Madeiras)
     PRECOS_MATERIAIS = {
         'MDF 15mm': {
@@ -84,6 +116,7 @@ class Config:
         'Compensado 15mm': {
             'preco_m2': 64.00,
             'desperdicio': 0.12,
+            'veio': True,
             'descricao': 'Compensado Naval 15mm'
         },
         'Melamina 15mm': {
@@ -93,6 +126,21 @@ class Config:
         }
     }
     
+    # Chapa padrão para o plano de corte
+    CHAPA_PADRAO = {
+        'comprimento_mm': 2750,
+        'largura_mm': 1840,
+        'kerf_mm': 3,
+        'refilo_mm': 10
+    }
+    
+    # Busca do plano de corte: prazo padrão e processos em paralelo
+    CORTE_TEMPO_BUSCA_S = 2
+    CORTE_PROCESSOS = os.cpu_count() or 1
+    # Nos jobs da fila as CPUs são divididas entre os processos da fila (cada um
+    # com um pool de CORTE_PROCESSOS somaria cerca de CPUs² processos)
+    CORTE_PROCESSOS_FILA = max(1, CORTE_PROCESSOS // FILA_PROCESSOS)
+    
     # Preços de acessórios
     PRECOS_ACESSORIOS = {
         'comum': {
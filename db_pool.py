@@ -0,0 +1,105 @@
+"""
+Pool de Conexões SQLite
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+# Espera máxima por um lock de escrita antes de "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Statements preparados mantidos por conexão (cache do módulo sqlite3, pelo texto SQL)
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """Uma conexão SQLite por thread, em modo WAL
+
+    Com WAL, leituras não bloqueiam a escrita nem são bloqueadas por ela; as
+    escritas usam transações explícitas (BEGIN IMMEDIATE), que pegam o lock de
+    escrita no início e esperam até o busy timeout em vez de falhar no meio.
+    As conexões ficam em modo autocommit fora dessas transações. Os
+    statements são reaproveitados pelo cache do sqlite3 quando o texto SQL é
+    o mesmo, por isso as consultas usam SQL constante com parâmetros.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+                 cached_statements: int = CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexoes: Dict[int, sqlite3.Connection] = {}
+
+    def connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (criada na primeira chamada)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._fechar_orfas()
+                self._conexoes[threading.get_ident()] = conn
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        return conn
+
+    def _fechar_orfas(self):
+        """Fecha conexões de threads que já terminaram"""
+        vivas = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._conexoes if i not in vivas]:
+            self._conexoes.pop(ident).close()
+
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """Transação explícita: COMMIT ao final, ROLLBACK em caso de erro"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def query_one(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        """Primeira linha de uma consulta de leitura"""
+        return self.connection().execute(sql, params).fetchone()
+
+    def query_all(self, sql: str, params: Sequence = ()) -> list:
+        """Todas as linhas de uma consulta de leitura"""
+        return self.connection().execute(sql, params).fetchall()
+
+    def close_all(self):
+        """Fecha todas as conexões do pool"""
+        with self._lock:
+            for conn in self._conexoes.values():
+                conn.close()
+            self._conexoes.clear()
+        self._local = threading.local()
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Pool compartilhado por caminho de banco"""
+    with _POOLS_LOCK:
+        if db_path not in _POOLS:
+            _POOLS[db_path] = ConnectionPool(db_path)
+        return _POOLS[db_path]
@@ -0,0 +1,388 @@
+"""
+Fila de Análises - Jobs em SQLite Executados por um Pool de Processos
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+
+import streamlit as st
+
+from componentes import compactar_analise, compactar_orcamento, para_json
+from config import Config
+from db_pool import ConnectionPool, get_pool
+from historico_orcamentos import comprimir, descomprimir
+from mesh_parser import spool_upload
+
+# Estados de um job
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+CANCELADO = 'cancelado'
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+# Etapas de um job em execução
+ETAPA_LEITURA = 'leitura'
+ETAPA_ORCAMENTO = 'orcamento'
+
+# Intervalo mínimo entre gravações de progresso (e verificações de cancelamento)
+INTERVALO_PROGRESSO_S = 0.25
+
+# Instâncias por processo (criadas uma vez no inicializador do pool)
+_analisador = None
+_engine = None
+
+
+class JobCancelado(Exception):
+    """Cancelamento pedido enquanto o job executava"""
+
+
+def _inicializar_processo():
+    global _analisador, _engine
+    from file_analyzer import FileAnalyzer
+    from orcamento_engine import OrcamentoEngine
+    _analisador = FileAnalyzer()
+    _engine = OrcamentoEngine()
+
+
+def _agora() -> str:
+    return datetime.now().isoformat()
+
+
+class _Progresso:
+    """Callback de progresso do parser para um job
+
+    Grava os bytes lidos no máximo a cada INTERVALO_PROGRESSO_S e, na mesma
+    transação, lê o pedido de cancelamento: o parser é interrompido com
+    JobCancelado no bloco seguinte.
+    """
+
+    def __init__(self, pool: ConnectionPool, job_id: int):
+        self.pool = pool
+        self.job_id = job_id
+        self._ultima = 0.0
+
+    def __call__(self, lidos: int):
+        agora = time.monotonic()
+        if agora - self._ultima < INTERVALO_PROGRESSO_S:
+            return
+        self._ultima = agora
+        self._gravar('UPDATE jobs SET bytes_lidos = ? WHERE id = ?', (lidos, self.job_id))
+
+    def etapa(self, etapa: str, componentes: int):
+        """Leitura terminada: registra a etapa e os componentes encontrados"""
+        self._gravar('UPDATE jobs SET etapa = ?, componentes = ?, bytes_lidos = bytes_total WHERE id = ?',
+                     (etapa, componentes, self.job_id))
+
+    def _gravar(self, sql: str, params: tuple):
+        with self.pool.transaction() as conn:
+            conn.execute(sql, params)
+            cancelar = conn.execute('SELECT cancelar FROM jobs WHERE id = ?', (self.job_id,)).fetchone()
+        if cancelar and cancelar[0]:
+            raise JobCancelado()
+
+
+def executar_job(db_path: str, job_id: int):
+    """Analisa e orça o arquivo de um job; executado nos processos do pool
+
+    Só começa se o job ainda estiver pendente (cancelados antes da vez são
+    ignorados). O resultado fica comprimido no próprio job até a sessão do
+    usuário buscá-lo.
+    """
+    pool = get_pool(db_path)
+    with pool.transaction() as conn:
+        job = conn.execute('SELECT caminho, nome_arquivo, configuracoes, unidade FROM jobs '
+                           'WHERE id = ? AND status = ?', (job_id, PENDENTE)).fetchone()
+        if job is None:
+            return
+        conn.execute('UPDATE jobs SET status = ?, iniciado_em = ? WHERE id = ?', (EXECUTANDO, _agora(), job_id))
+
+    caminho, nome, configuracoes, unidade = job
+    progresso = _Progresso(pool, job_id)
+    status, erro, codec, dados = CONCLUIDO, None, None, None
+    try:
+        analise = _analisador.analyze_path(caminho, nome, progresso, unidade)
+        progresso.etapa(ETAPA_ORCAMENTO, analise['total_componentes'])
+
+        configuracoes = json.loads(configuracoes)
+        # Cada processo da fila usa só a sua parte das CPUs no plano de corte
+        if configuracoes.get('processos_corte', 1) > Config.CORTE_PROCESSOS_FILA:
+            configuracoes['processos_corte'] = Config.CORTE_PROCESSOS_FILA
+        orcamento = _engine.calcular_orcamento(analise, configuracoes)
+        if not orcamento:
+            raise ValueError("Erro ao calcular orçamento")
+
+        codec, dados = comprimir(json.dumps({'analise': analise, 'orcamento': orcamento}, ensure_ascii=False,
+                                            separators=(',', ':'), default=para_json).encode('utf-8'))
+    except JobCancelado:
+        status = CANCELADO
+    except Exception as e:
+        status, erro = ERRO, str(e)
+    finally:
+        _remover_arquivo(caminho)
+
+    # Cancelamento pedido depois da última verificação também vale
+    with pool.transaction() as conn:
+        conn.execute('''
+            UPDATE jobs SET status = CASE WHEN cancelar THEN ? ELSE ? END,
+                            erro = ?, codec = ?, dados = ?, concluido_em = ?
+            WHERE id = ?
+        ''', (CANCELADO, status, erro, codec, dados, _agora(), job_id))
+
+
+def _remover_arquivo(caminho: str):
+    try:
+        os.unlink(caminho)
+    except FileNotFoundError:
+        pass
+
+
+class FilaAnalises:
+    """Análises de arquivos 3D executadas fora da sessão do Streamlit
+
+    O upload é copiado para disco e registrado como job pendente; um pool de
+    processos lê a malha e calcula o orçamento, gravando o progresso (bytes
+    lidos, componentes encontrados) no banco. A interface só consulta o
+    estado dos jobs, então a thread da sessão nunca espera o parser. O banco
+    é a fonte da verdade: enviar ao pool é só um aviso, e o processo que
+    recebe um job já cancelado não faz nada.
+    """
+
+    SCHEMA_VERSION = 2
+
+    # Colunas devolvidas na listagem (o resultado comprimido fica de fora)
+    CAMPOS_JOB = ('id', 'status', 'etapa', 'cliente', 'ambiente', 'nome_arquivo', 'bytes_total',
+                  'bytes_lidos', 'componentes', 'cancelar', 'erro', 'criado_em', 'posicao')
+
+    def __init__(self, db_path: str = "fila_analises.db", diretorio: str = ".fila_analises",
+                 processos: int = 1, jobs_por_usuario: int = 2):
+        self.db_path = db_path
+        self.diretorio = diretorio
+        self.processos = processos
+        self.jobs_por_usuario = jobs_por_usuario
+        self.pool = get_pool(self.db_path)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.init_database()
+        self._retomar()
+
+    def init_database(self):
+        """Cria a tabela de jobs e seus índices (ou migra uma fila de versão anterior)"""
+        try:
+            versao = self.pool.query_one('PRAGMA user_version')[0]
+            if versao >= self.SCHEMA_VERSION:
+                return
+
+            with self.pool.transaction() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        usuario_id INTEGER NOT NULL,
+                        status TEXT NOT NULL,
+                        etapa TEXT NOT NULL,
+                        cliente TEXT NOT NULL,
+                        ambiente TEXT NOT NULL,
+                        nome_arquivo TEXT NOT NULL,
+                        caminho TEXT NOT NULL,
+                        configuracoes TEXT NOT NULL,
+                        unidade TEXT NOT NULL DEFAULT 'auto',
+                        bytes_total INTEGER NOT NULL,
+                        bytes_lidos INTEGER NOT NULL DEFAULT 0,
+                        componentes INTEGER,
+                        cancelar INTEGER NOT NULL DEFAULT 0,
+                        erro TEXT,
+                        codec TEXT,
+                        dados BLOB,
+                        criado_em TEXT NOT NULL,
+                        iniciado_em TEXT,
+                        concluido_em TEXT
+                    )
+                ''')
+                if versao == 1:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN unidade TEXT NOT NULL DEFAULT 'auto'")
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_usuario ON jobs (usuario_id, id)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)')
+                conn.execute(f'PRAGMA user_version = {int(self.SCHEMA_VERSION)}')
+        except Exception as e:
+            st.error(f"Erro ao inicializar fila de análises: {e}")
+
+    def _retomar(self):
+        """Jobs deixados por uma execução anterior do servidor voltam ao pool"""
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute('DELETE FROM jobs WHERE status = ?', (CANCELADO,))
+                conn.execute('UPDATE jobs SET status = ?, etapa = ?, bytes_lidos = 0 WHERE status = ?',
+                             (PENDENTE, ETAPA_LEITURA, EXECUTANDO))
+                pendentes = conn.execute('SELECT id FROM jobs WHERE status = ? ORDER BY id',
+                                         (PENDENTE,)).fetchall()
+            for (job_id,) in pendentes:
+                self._submeter(job_id)
+        except Exception as e:
+            st.error(f"Erro ao retomar fila de análises: {e}")
+
+    def _submeter(self, job_id: int):
+        """Entrega o job ao pool (criado no primeiro uso ou depois de uma falha)"""
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: o servidor tem várias threads, e fork copiaria locks em uso
+                self._executor = ProcessPoolExecutor(max_workers=self.processos,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_inicializar_processo)
+            executor = self._executor
+            futuro = executor.submit(executar_job, self.db_path, job_id)
+        futuro.add_done_callback(lambda f: self._job_terminou(executor, job_id, f))
+
+    def _job_terminou(self, executor: ProcessPoolExecutor, job_id: int, futuro: Future):
+        """Processo do pool morto (ex.: sem memória): o job em execução falha e os pendentes são reenviados"""
+        if futuro.cancelled() or futuro.exception() is None:
+            return
+
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+
+        try:
+            with self.pool.transaction() as conn:
+                job = conn.execute('SELECT status, caminho FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                if job and job[0] == EXECUTANDO:
+                    conn.execute('UPDATE jobs SET status = ?, erro = ?, concluido_em = ? WHERE id = ?',
+                                 (ERRO, f"Análise interrompida: {futuro.exception()}", _agora(), job_id))
+            if job and job[0] == EXECUTANDO:
+                _remover_arquivo(job[1])
+            elif job and job[0] == PENDENTE:
+                self._submeter(job_id)
+        except Exception:
+            # Callback do pool: sem sessão para exibir o erro; o job segue no estado gravado
+            pass
+
+    def enviar(self, usuario_id: int, uploaded_file: BinaryIO, cliente: str, ambiente: str,
+               configuracoes: Dict, unidade: str = 'auto') -> Optional[int]:
+        """Copia o upload para disco e enfileira a análise; retorna o id do job (None se recusado)
+
+        `unidade` é a unidade do modelo escolhida no envio ('auto' = do arquivo ou estimada).
+        """
+        caminho = None
+        try:
+            extensao = uploaded_file.name.split('.')[-1].lower()
+            caminho = spool_upload(uploaded_file, suffix=f".{extensao}", diretorio=self.diretorio)
+
+            with self.pool.transaction() as conn:
+                ativos = conn.execute('SELECT COUNT(*) FROM jobs WHERE usuario_id = ? AND status IN (?, ?)',
+                                      (usuario_id,) + ATIVOS).fetchone()[0]
+                if ativos >= self.jobs_por_usuario:
+                    job_id = None
+                else:
+                    job_id = conn.execute('''
+                        INSERT INTO jobs
+                        (usuario_id, status, etapa, cliente, ambiente, nome_arquivo, caminho,
+                         configuracoes, unidade, bytes_total, criado_em)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (usuario_id, PENDENTE, ETAPA_LEITURA, cliente, ambiente, uploaded_file.name, caminho,
+                          json.dumps(configuracoes), unidade, os.path.getsize(caminho), _agora())).lastrowid
+
+            if job_id is None:
+                _remover_arquivo(caminho)
+                st.warning(f"⏳ Você já tem {ativos} análises em andamento. Aguarde uma terminar.")
+                return None
+
+            self._submeter(job_id)
+            return job_id
+        except Exception as e:
+            if caminho:
+                _remover_arquivo(caminho)
+            st.error(f"Erro ao enviar arquivo para análise: {e}")
+            return None
+
+    def listar(self, usuario_id: int) -> List[Dict]:
+        """Jobs do usuário (exceto cancelados), do mais antigo ao mais novo
+
+        `posicao` é quantos jobs pendentes (de qualquer usuário) estão à frente.
+        """
+        try:
+            linhas = self.pool.query_all('''
+                SELECT j.id, j.status, j.etapa, j.cliente, j.ambiente, j.nome_arquivo, j.bytes_total,
+                       j.bytes_lidos, j.componentes, j.cancelar, j.erro, j.criado_em,
+                       CASE WHEN j.status = ?
+                            THEN (SELECT COUNT(*) FROM jobs p WHERE p.status = ? AND p.id < j.id)
+                       END
+                FROM jobs j
+                WHERE j.usuario_id = ? AND j.status != ?
+                ORDER BY j.id
+            ''', (PENDENTE, PENDENTE, usuario_id, CANCELADO))
+            return [dict(zip(self.CAMPOS_JOB, linha)) for linha in linhas]
+        except Exception as e:
+            st.error(f"Erro ao consultar fila de análises: {e}")
+            return []
+
+    def cancelar(self, usuario_id: int, job_id: int) -> bool:
+        """Cancela um job pendente na hora ou pede ao processo que interrompa um em execução"""
+        try:
+            with self.pool.transaction() as conn:
+                job = conn.execute('SELECT status, caminho FROM jobs WHERE id = ? AND usuario_id = ?',
+                                   (job_id, usuario_id)).fetchone()
+                if not job or job[0] not in ATIVOS:
+                    return False
+                if job[0] == PENDENTE:
+                    conn.execute('UPDATE jobs SET status = ?, cancelar = 1, concluido_em = ? WHERE id = ?',
+                                 (CANCELADO, _agora(), job_id))
+                else:
+                    conn.execute('UPDATE jobs SET cancelar = 1 WHERE id = ?', (job_id,))
+
+            if job[0] == PENDENTE:
+                _remover_arquivo(job[1])
+            return True
+        except Exception as e:
+            st.error(f"Erro ao cancelar análise: {e}")
+            return False
+
+    def retirar(self, usuario_id: int, job_id: int) -> Optional[Dict]:
+        """Resultado de um job concluído, removido da fila (só uma sessão o recebe)
+
+        Retorna {'cliente', 'ambiente', 'analise', 'orcamento'}.
+        """
+        try:
+            with self.pool.transaction() as conn:
+                job = conn.execute('''
+                    SELECT cliente, ambiente, codec, dados FROM jobs
+                    WHERE id = ? AND usuario_id = ? AND status = ?
+                ''', (job_id, usuario_id, CONCLUIDO)).fetchone()
+                if job is None:
+                    return None
+                conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+            cliente, ambiente, codec, dados = job
+            payload = json.loads(descomprimir(codec, dados))
+            return {
+                'cliente': cliente,
+                'ambiente': ambiente,
+                'analise': compactar_analise(payload['analise']),
+                'orcamento': compactar_orcamento(payload['orcamento'])
+            }
+        except Exception as e:
+            st.error(f"Erro ao carregar resultado da análise: {e}")
+            return None
+
+    def descartar(self, usuario_id: int, job_id: int) -> bool:
+        """Remove um job que terminou com erro"""
+        try:
+            with self.pool.transaction() as conn:
+                cursor = conn.execute('DELETE FROM jobs WHERE id = ? AND usuario_id = ? AND status = ?',
+                                      (job_id, usuario_id, ERRO))
+            return cursor.rowcount > 0
+        except Exception as e:
+            st.error(f"Erro ao descartar análise: {e}")
+            return False
+
+    def encerrar(self):
+        """Encerra o pool; jobs não iniciados continuam pendentes no banco"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -4,14 +4,31 @@ Analisador de Arquivos 3D
 
 import streamlit as st
 import io
-from typing import Dict, List, Optional
+import os
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+from analysis_cache import AnalysisCache, file_hash
+from componentes import CHAVES_ACESSORIOS, compactar_analise
+from config import Config
+from mesh_metrics import MeshMetrics, component_type, estimate_accessories, resolve_unit, unit_name
+from mesh_panels import apply_panels, detect_panels
+from mesh_parser import MeshData, parse_mesh, spool_upload
+from mesh_segmentation import segment_mesh
 
 class FileAnalyzer:
+    # Incrementar ao mudar o resultado da análise (invalida o cache)
+    ANALYZER_VERSION = 4
+    
     def __init__(self):
         self.supported_formats = ['obj', 'dae', 'stl', 'ply']
+        self.cache = AnalysisCache(Config.CACHE_DIR, Config.CACHE_MAX_MB)
     
-    def analyze_file(self, uploaded_file) -> Optional[Dict]:
-        """Analisa arquivo 3D uploadado"""
+    def analyze_file(self, uploaded_file, unidade: str = 'auto') -> Optional[Dict]:
+        """Analisa arquivo 3D uploadado
+        
+        `unidade` é a unidade do modelo (chave de Config.UNIDADES_MODELO) ou
+        'auto' para usar a declarada no arquivo ou a estimada.
+        """
         if not uploaded_file:
             return None
         
@@ -22,27 +39,110 @@ class FileAnalyzer:
                 st.error(f"❌ Formato não suportado: {file_extension}")
                 return None
             
-            # Ler conteúdo do arquivo
-            file_content = uploaded_file.read()
-            file_size_mb = len(file_content) / (1024 * 1024)
+            # Mesmo conteúdo já analisado: devolver sem abrir o parser
+            chave = self.cache.key(file_hash(uploaded_file), file_extension, self.ANALYZER_VERSION,
+                                   uploaded_file.name, unidade)
+            analise = self.cache.get(chave)
+            if analise is not None:
+                analise['nome_arquivo'] = uploaded_file.name
+                return compactar_analise(analise)
             
-            # Simular análise do arquivo (versão simplificada para teste)
-            componentes = self._simulate_component_analysis(uploaded_file.name, file_size_mb)
+            # Copiar upload para disco em blocos (sem carregar tudo na memória)
+            tmp_path = spool_upload(uploaded_file, suffix=f".{file_extension}")
+            try:
+                analise = self._build_analysis(tmp_path, uploaded_file.name, file_extension, unidade=unidade)
+            finally:
+                os.unlink(tmp_path)
             
-            return {
-                'nome_arquivo': uploaded_file.name,
-                'tamanho_mb': round(file_size_mb, 2),
-                'formato': file_extension.upper(),
-                'componentes': componentes,
-                'total_componentes': len(componentes),
-                'area_total_m2': sum(comp['area_m2'] for comp in componentes),
-                'status': 'sucesso'
-            }
+            self.cache.put(chave, analise)
+            return compactar_analise(analise)
             
         except Exception as e:
             st.error(f"❌ Erro ao analisar arquivo: {e}")
             return None
     
+    def analyze_path(self, path: str, name: Optional[str] = None,
+                     progress: Optional[Callable[[int], None]] = None, unidade: str = 'auto') -> Dict:
+        """Analisa um arquivo 3D em disco (uso fora da interface)
+        
+        Ao contrário de analyze_file, erros são lançados como exceção.
+        `progress` recebe os bytes já lidos pelo parser.
+        """
+        name = name or os.path.basename(path)
+        file_extension = name.split('.')[-1].lower()
+        if file_extension not in self.supported_formats:
+            raise ValueError(f"Formato não suportado: {file_extension}")
+        
+        with open(path, 'rb') as f:
+            chave = self.cache.key(file_hash(f), file_extension, self.ANALYZER_VERSION, name, unidade)
+        analise = self.cache.get(chave)
+        if analise is not None:
+            analise['nome_arquivo'] = name
+            return compactar_analise(analise)
+        
+        analise = self._build_analysis(path, name, file_extension, progress, unidade)
+        self.cache.put(chave, analise)
+        return compactar_analise(analise)
+    
+    def _build_analysis(self, path: str, name: str, file_extension: str,
+                        progress: Optional[Callable[[int], None]] = None, unidade: str = 'auto') -> Dict:
+        """Lê a malha do arquivo e monta o dicionário da análise"""
+        file_size_mb = os.path.getsize(path) / (1024 * 1024)
+        malha = parse_mesh(path, file_extension, progress)
+        medidas = {}
+        
+        if malha is not None and malha.num_faces > 0:
+            escala, origem = resolve_unit(malha, unidade)
+            medidas = {'unidade': unit_name(escala), 'unidade_origem': origem}
+            pecas = None
+            montagem = None
+            if malha.face_object.min() == malha.face_object.max():
+                # Sem grupos o/g: separar a malha em peças conectadas
+                base = malha.object_names[int(malha.face_object[0])]
+                if base == 'objeto':
+                    base = os.path.splitext(os.path.basename(name))[0]
+                segmentada = segment_mesh(malha, base, escala)
+                if segmentada is not malha:
+                    # Já soldada e um objeto por peça: a detecção de chapas reaproveita
+                    pecas = segmentada.face_object
+                    montagem = base
+                malha = segmentada
+            componentes, chapas = self._components_from_mesh(malha, name, pecas, escala, montagem)
+        else:
+            # Sem geometria legível: estimar pelos dados do arquivo
+            componentes = self._simulate_component_analysis(name, file_size_mb)
+            chapas = []
+        
+        return {
+            'nome_arquivo': name,
+            'tamanho_mb': round(file_size_mb, 2),
+            'formato': file_extension.upper(),
+            'componentes': componentes,
+            'total_componentes': len(componentes),
+            'area_total_m2': sum(comp['area_m2'] for comp in componentes),
+            'chapas': chapas,
+            **medidas,
+            'status': 'sucesso'
+        }
+    
+    def _components_from_mesh(self, malha: MeshData, filename: str, pecas: Optional[np.ndarray] = None,
+                              escala: Optional[float] = None,
+                              montagem: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Gera componentes e chapas a partir da geometria real de cada objeto
+
+        `montagem` é o nome do móvel quando os objetos são peças separadas
+        por segment_mesh: as ferragens são estimadas uma vez para o móvel.
+        """
+        metricas = MeshMetrics(malha, escala)
+        componentes = metricas.to_components(filename)
+        chapas = apply_panels(componentes, metricas.objetos, detect_panels(metricas, pecas),
+                              Config.PRECOS_MATERIAIS, montagem is not None)
+        if montagem is not None and componentes and not any(c['acessorios'] for c in componentes):
+            # Nenhuma peça ficou com ferragens: lançar as do móvel montado na maior peça
+            largura, altura, _ = metricas.assembly_dimensions_cm()
+            componentes[0]['acessorios'] = estimate_accessories(component_type(montagem), largura, altura)
+        return componentes, chapas
+    
     def _simulate_component_analysis(self, filename: str, file_size_mb: float) -> List[Dict]:
         """Simula análise de componentes baseada no arquivo"""
         
@@ -303,24 +403,21 @@ class FileAnalyzer:
         st.markdown("### 🧩 Componentes Identificados")
         
         for i, comp in enumerate(analise['componentes']):
-            with st.expander(f"🔹 {comp['nome']} - {comp['area_m2']:.2f} m²"):
+            with st.expander(f"🔹 {comp.nome} - {comp.area_m2:.2f} m²"):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Tipo:** {comp['tipo'].replace('_', ' ').title()}")
-                    st.markdown(f"**Material:** {comp['material_sugerido']}")
-                    st.markdown(f"**Dimensões:** {comp['largura_cm']}×{comp['altura_cm']}×{comp['profundidade_cm']} cm")
+                    st.markdown(f"**Tipo:** {comp.tipo.replace('_', ' ').title()}")
+                    st.markdown(f"**Material:** {comp.material_sugerido}")
+                    st.markdown(f"**Dimensões:** {comp.largura_cm}×{comp.altura_cm}×{comp.profundidade_cm} cm")
                 
                 with col2:
-                    st.markdown(f"**Área:** {comp['area_m2']:.2f} m²")
-                    if comp['acessorios']:
-                        acessorios_count = {}
-                        for acessorio in comp['acessorios']:
-                            acessorios_count[acessorio] = acessorios_count.get(acessorio, 0) + 1
-                        
+                    st.markdown(f"**Área:** {comp.area_m2:.2f} m²")
+                    if any(comp.acessorios):
                         st.markdown("**Acessórios:**")
-                        for acessorio, qtd in acessorios_count.items():
-                            st.markdown(f"• {qtd}x {acessorio.replace('_', ' ').title()}")
+                        for acessorio, qtd in zip(CHAVES_ACESSORIOS, comp.acessorios):
+                            if qtd:
+                                st.markdown(f"• {qtd}x {acessorio.replace('_', ' ').title()}")
                     else:
                         st.markdown("**Acessórios:** Nenhum")
 
@@ -0,0 +1,280 @@
+"""
+Histórico de Orçamentos - Persistência com Busca Indexada
+"""
+
+import gzip
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from componentes import compactar_analise, compactar_orcamento, para_json
+from db_pool import get_pool
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional; sem ele os payloads usam gzip
+    zstandard = None
+
+# Fim de faixa para busca por prefixo com índice (cliente >= p AND cliente < p + FIM)
+FIM_PREFIXO = '\U0010ffff'
+
+
+def comprimir(dados: bytes) -> Tuple[str, bytes]:
+    """(codec, bytes comprimidos): zstd se disponível, senão gzip"""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=6).compress(dados)
+    return 'gzip', gzip.compress(dados, compresslevel=6)
+
+
+def descomprimir(codec: str, dados: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Payload em zstd, mas o pacote zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(dados)
+    if codec == 'gzip':
+        return gzip.decompress(dados)
+    raise ValueError(f"Codec desconhecido: {codec}")
+
+
+class HistoricoOrcamentos:
+    """Orçamentos salvos por usuário
+
+    Os cabeçalhos (cliente, ambiente, data, total...) ficam numa tabela
+    pequena e indexada, usada pela listagem; a análise e o orçamento completos
+    ficam comprimidos numa tabela à parte e só são lidos ao abrir um orçamento.
+    A paginação é por chave (data, id) e não por OFFSET, então qualquer página
+    custa o mesmo.
+    """
+
+    SCHEMA_VERSION = 2
+
+    # Colunas devolvidas na listagem
+    CAMPOS_CABECALHO = ('id', 'cliente', 'ambiente', 'data_orcamento', 'material',
+                        'total_componentes', 'area_total_m2', 'total_final', 'nome_arquivo')
+
+    def __init__(self, db_path: str = "orcamentos.db"):
+        self.db_path = db_path
+        self.pool = get_pool(self.db_path)
+        self.init_database()
+
+    def init_database(self):
+        """Cria as tabelas e índices do histórico"""
+        try:
+            if self.pool.query_one('PRAGMA user_version')[0] >= self.SCHEMA_VERSION:
+                return
+
+            with self.pool.transaction() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS orcamentos (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        usuario_id INTEGER NOT NULL,
+                        cliente TEXT NOT NULL,
+                        cliente_busca TEXT NOT NULL,
+                        ambiente TEXT NOT NULL,
+                        data_orcamento TEXT NOT NULL,
+                        material TEXT,
+                        total_componentes INTEGER,
+                        area_total_m2 REAL,
+                        total_final REAL NOT NULL,
+                        nome_arquivo TEXT
+                    )
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_orcamentos_usuario_data
+                    ON orcamentos (usuario_id, data_orcamento, id)
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_orcamentos_usuario_cliente
+                    ON orcamentos (usuario_id, cliente_busca, data_orcamento)
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_orcamentos_usuario_ambiente
+                    ON orcamentos (usuario_id, ambiente, data_orcamento, id)
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_orcamentos_usuario_total
+                    ON orcamentos (usuario_id, total_final)
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS orcamentos_dados (
+                        orcamento_id INTEGER PRIMARY KEY,
+                        codec TEXT NOT NULL,
+                        dados BLOB NOT NULL
+                    )
+                ''')
+                conn.execute(f'PRAGMA user_version = {int(self.SCHEMA_VERSION)}')
+        except Exception as e:
+            st.error(f"Erro ao inicializar histórico: {e}")
+
+    def _cabecalho(self, cliente: str, ambiente: str, analise: Dict, orcamento: Dict) -> tuple:
+        resumo = orcamento['resumo']
+        return (
+            cliente,
+            cliente.strip().casefold(),
+            ambiente,
+            orcamento.get('data_orcamento') or datetime.now().isoformat(),
+            orcamento.get('configuracoes', {}).get('material'),
+            resumo.get('total_componentes'),
+            resumo.get('area_total_m2'),
+            resumo['total_final'],
+            analise.get('nome_arquivo')
+        )
+
+    def _payload(self, analise: Dict, orcamento: Dict) -> Tuple[str, bytes]:
+        dados = json.dumps({'analise': analise, 'orcamento': orcamento},
+                           ensure_ascii=False, separators=(',', ':'), default=para_json)
+        return comprimir(dados.encode('utf-8'))
+
+    def salvar(self, usuario_id: int, cliente: str, ambiente: str,
+               analise: Dict, orcamento: Dict) -> Optional[int]:
+        """Salva um orçamento; retorna o id (None em caso de erro)"""
+        try:
+            codec, dados = self._payload(analise, orcamento)
+            with self.pool.transaction() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO orcamentos
+                    (usuario_id, cliente, cliente_busca, ambiente, data_orcamento,
+                     material, total_componentes, area_total_m2, total_final, nome_arquivo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (usuario_id,) + self._cabecalho(cliente, ambiente, analise, orcamento))
+                orcamento_id = cursor.lastrowid
+                conn.execute('''
+                    INSERT INTO orcamentos_dados (orcamento_id, codec, dados)
+                    VALUES (?, ?, ?)
+                ''', (orcamento_id, codec, dados))
+            return orcamento_id
+        except Exception as e:
+            st.error(f"Erro ao salvar orçamento: {e}")
+            return None
+
+    def atualizar(self, usuario_id: int, orcamento_id: int, cliente: str, ambiente: str,
+                  analise: Dict, orcamento: Dict) -> bool:
+        """Regrava um orçamento salvo (ex.: depois de mudar as configurações)"""
+        try:
+            codec, dados = self._payload(analise, orcamento)
+            with self.pool.transaction() as conn:
+                cursor = conn.execute('''
+                    UPDATE orcamentos
+                    SET cliente = ?, cliente_busca = ?, ambiente = ?, data_orcamento = ?,
+                        material = ?, total_componentes = ?, area_total_m2 = ?,
+                        total_final = ?, nome_arquivo = ?
+                    WHERE id = ? AND usuario_id = ?
+                ''', self._cabecalho(cliente, ambiente, analise, orcamento) + (orcamento_id, usuario_id))
+                if cursor.rowcount == 0:
+                    return False
+                conn.execute('''
+                    UPDATE orcamentos_dados SET codec = ?, dados = ?
+                    WHERE orcamento_id = ?
+                ''', (codec, dados, orcamento_id))
+            return True
+        except Exception as e:
+            st.error(f"Erro ao atualizar orçamento: {e}")
+            return False
+
+    def buscar(self, usuario_id: int, cliente: Optional[str] = None, ambiente: Optional[str] = None,
+               data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+               total_min: Optional[float] = None, total_max: Optional[float] = None,
+               limite: int = 20, apos: Optional[Tuple[str, int]] = None) -> Dict:
+        """Página de orçamentos do usuário, do mais recente para o mais antigo
+
+        `cliente` busca por prefixo (sem diferenciar maiúsculas); datas são ISO
+        ('2025-06-30' ou completas). `apos` é o `proximo` da página anterior.
+        Retorna {'itens': [...], 'proximo': (data, id) ou None}.
+        """
+        condicoes = ['usuario_id = ?']
+        parametros: List = [usuario_id]
+
+        if cliente:
+            prefixo = cliente.strip().casefold()
+            condicoes.append('cliente_busca >= ? AND cliente_busca < ?')
+            parametros += [prefixo, prefixo + FIM_PREFIXO]
+        if ambiente:
+            condicoes.append('ambiente = ?')
+            parametros.append(ambiente)
+        if data_inicio:
+            condicoes.append('data_orcamento >= ?')
+            parametros.append(data_inicio)
+        if data_fim:
+            # Data sem horário inclui o dia inteiro
+            condicoes.append('data_orcamento < ?')
+            parametros.append(data_fim + FIM_PREFIXO if len(data_fim) == 10 else data_fim)
+        if total_min is not None:
+            condicoes.append('total_final >= ?')
+            parametros.append(total_min)
+        if total_max is not None:
+            condicoes.append('total_final <= ?')
+            parametros.append(total_max)
+        if apos is not None:
+            condicoes.append('(data_orcamento, id) < (?, ?)')
+            parametros += list(apos)
+
+        sql = f'''
+            SELECT {', '.join(self.CAMPOS_CABECALHO)}
+            FROM orcamentos
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY data_orcamento DESC, id DESC
+            LIMIT ?
+        '''
+
+        try:
+            linhas = self.pool.query_all(sql, parametros + [limite + 1])
+        except Exception as e:
+            st.error(f"Erro ao buscar orçamentos: {e}")
+            return {'itens': [], 'proximo': None}
+
+        itens = [dict(zip(self.CAMPOS_CABECALHO, linha)) for linha in linhas[:limite]]
+        proximo = None
+        if len(linhas) > limite:
+            proximo = (itens[-1]['data_orcamento'], itens[-1]['id'])
+        return {'itens': itens, 'proximo': proximo}
+
+    def contar(self, usuario_id: int) -> int:
+        """Total de orçamentos salvos pelo usuário"""
+        try:
+            return self.pool.query_one(
+                'SELECT COUNT(*) FROM orcamentos WHERE usuario_id = ?', (usuario_id,)
+            )[0]
+        except Exception as e:
+            st.error(f"Erro ao contar orçamentos: {e}")
+            return 0
+
+    def carregar(self, usuario_id: int, orcamento_id: int) -> Optional[Dict]:
+        """Orçamento completo: cliente, ambiente, análise e orçamento"""
+        try:
+            linha = self.pool.query_one('''
+                SELECT o.cliente, o.ambiente, d.codec, d.dados
+                FROM orcamentos o
+                JOIN orcamentos_dados d ON d.orcamento_id = o.id
+                WHERE o.id = ? AND o.usuario_id = ?
+            ''', (orcamento_id, usuario_id))
+            if not linha:
+                return None
+
+            conteudo = json.loads(descomprimir(linha[2], linha[3]))
+            return {
+                'id': orcamento_id,
+                'cliente': linha[0],
+                'ambiente': linha[1],
+                'analise': compactar_analise(conteudo['analise']),
+                'orcamento': compactar_orcamento(conteudo['orcamento'])
+            }
+        except Exception as e:
+            st.error(f"Erro ao carregar orçamento: {e}")
+            return None
+
+    def excluir(self, usuario_id: int, orcamento_id: int) -> bool:
+        """Remove um orçamento salvo"""
+        try:
+            with self.pool.transaction() as conn:
+                cursor = conn.execute(
+                    'DELETE FROM orcamentos WHERE id = ? AND usuario_id = ?', (orcamento_id, usuario_id)
+                )
+                if cursor.rowcount == 0:
+                    return False
+                conn.execute('DELETE FROM orcamentos_dados WHERE orcamento_id = ?', (orcamento_id,))
+            return True
+        except Exception as e:
+            st.error(f"Erro ao excluir orçamento: {e}")
+            return False
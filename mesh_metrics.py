@@ -0,0 +1,225 @@
+"""
+Métricas Geométricas das Malhas
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from mesh_parser import MeshData
+
+# Palavras-chave nos nomes dos objetos para identificar o tipo do componente
+TIPOS_POR_PALAVRA = [
+    ('bancada', 'bancada'), ('countertop', 'bancada'),
+    ('gaveta', 'gaveteiro'), ('drawer', 'gaveteiro'),
+    ('prateleira', 'prateleira'), ('shelf', 'prateleira'),
+    ('guarda', 'guarda_roupa'), ('wardrobe', 'guarda_roupa'),
+    ('armario', 'armario'), ('cabinet', 'armario'),
+    ('gabinete', 'gabinete'), ('estante', 'estante'),
+    ('mesa', 'mesa'), ('desk', 'mesa'), ('porta', 'porta'), ('door', 'porta')
+]
+
+
+def unit_scale(vertices: np.ndarray) -> float:
+    """Fator estimado para converter as coordenadas do modelo em metros
+
+    Só distingue metros de milímetros: é o último recurso de resolve_unit,
+    quando nem o envio nem o arquivo informam a unidade.
+    """
+    if len(vertices) == 0:
+        return 1.0
+
+    # Modelos de marcenaria com mais de 50 unidades de extensão estão em mm
+    extensao = float((vertices.max(axis=0) - vertices.min(axis=0)).max())
+    return 0.001 if extensao > 50 else 1.0
+
+
+def unit_name(escala: float) -> str:
+    """Nome da unidade de um fator ('mm', 'in'...) ou o próprio fator em metros"""
+    for nome, fator in Config.UNIDADES_MODELO.items():
+        if np.isclose(escala, fator):
+            return nome
+    return f"{escala:g} m"
+
+
+def resolve_unit(malha: MeshData, unidade: Optional[str] = None) -> Tuple[float, str]:
+    """(fator para metros, origem) da unidade do modelo
+
+    A ordem é: unidade escolhida no envio ('informada'), a declarada no
+    arquivo, como o <unit> do DAE ('arquivo'), e por último a estimada
+    pela extensão do modelo ('estimada').
+    """
+    if unidade in Config.UNIDADES_MODELO:
+        return Config.UNIDADES_MODELO[unidade], 'informada'
+    if malha.escala is not None:
+        return malha.escala, 'arquivo'
+    return unit_scale(malha.vertices), 'estimada'
+
+
+def triangle_areas(vertices: np.ndarray, faces: np.ndarray):
+    """Áreas e normais unitárias de todos os triângulos de uma vez"""
+    a = vertices[faces[:, 0]]
+    cruzado = np.cross(vertices[faces[:, 1]] - a, vertices[faces[:, 2]] - a)
+    dobro_area = np.linalg.norm(cruzado, axis=1)
+    normais = cruzado / np.where(dobro_area > 0, dobro_area, 1.0)[:, None]
+    return 0.5 * dobro_area, normais
+
+
+class MeshMetrics:
+    """Áreas e caixas envolventes (AABB e OBB) por objeto da malha
+
+    Todas as medidas são calculadas sobre o array de faces inteiro, sem
+    laço por face; valores em metros.
+    """
+
+    def __init__(self, malha: MeshData, escala: float = None):
+        self.malha = malha
+        self.escala = resolve_unit(malha)[0] if escala is None else escala
+
+        vertices = malha.vertices * self.escala
+        self.areas_faces, self.normais = triangle_areas(vertices, malha.faces)
+        num_objetos = len(malha.object_names)
+
+        self.area_objeto = np.bincount(malha.face_object, weights=self.areas_faces,
+                                       minlength=num_objetos)
+        self.faces_objeto = np.bincount(malha.face_object, minlength=num_objetos)
+        self.objetos = np.flatnonzero(self.faces_objeto)
+        self.area_total = float(self.areas_faces.sum())
+
+        # Pontos (vértices de cada face) agrupados por objeto
+        ordem = np.argsort(malha.face_object, kind='stable')
+        pontos = vertices[malha.faces[ordem]].reshape(-1, 3)
+        contagem = self.faces_objeto[self.objetos] * 3
+        inicios = np.concatenate([[0], np.cumsum(contagem)[:-1]]).astype(np.int64)
+        rotulo = np.repeat(np.arange(len(self.objetos)), contagem)
+
+        self.aabb_min = np.minimum.reduceat(pontos, inicios, axis=0)
+        self.aabb_max = np.maximum.reduceat(pontos, inicios, axis=0)
+
+        self.obb_eixos, self.obb_extensoes = self._oriented_boxes(
+            vertices, pontos, inicios, rotulo
+        )
+
+    def _oriented_boxes(self, vertices: np.ndarray, pontos: np.ndarray,
+                        inicios: np.ndarray, rotulo: np.ndarray):
+        """OBB por PCA da superfície de todos os objetos, mantendo a AABB quando for menor"""
+        malha = self.malha
+        compacto = np.full(len(malha.object_names), -1)
+        compacto[self.objetos] = np.arange(len(self.objetos))
+        objeto_face = compacto[malha.face_object]
+
+        # Centrar no meio da AABB para evitar cancelamento numérico
+        centro = (self.aabb_min + self.aabb_max) / 2
+        tri = vertices[malha.faces] - centro[objeto_face][:, None, :]
+        pesos = self.areas_faces
+        area = np.bincount(objeto_face, weights=pesos, minlength=len(self.objetos))
+        area = np.where(area > 0, area, 1.0)
+
+        # Momentos da superfície: E[x] = centróide, E[xx'] = (Σ pp' + (Σp)(Σp)') / 12
+        soma_vertices = tri.sum(axis=1)
+        media = np.stack([
+            np.bincount(objeto_face, weights=pesos * soma_vertices[:, i] / 3, minlength=len(area))
+            for i in range(3)
+        ], axis=1) / area[:, None]
+
+        covariancia = np.empty((len(area), 3, 3))
+        for i in range(3):
+            for j in range(i, 3):
+                momento = (np.einsum('nk,nk->n', tri[:, :, i], tri[:, :, j])
+                           + soma_vertices[:, i] * soma_vertices[:, j]) / 12
+                soma = np.bincount(objeto_face, weights=pesos * momento, minlength=len(area))
+                covariancia[:, i, j] = covariancia[:, j, i] = soma / area - media[:, i] * media[:, j]
+        _, eixos = np.linalg.eigh(covariancia)  # colunas = eixos principais
+
+        projecao = np.empty_like(pontos)
+        for j in range(3):
+            projecao[:, j] = np.einsum('ni,ni->n', pontos, eixos[:, :, j][rotulo])
+        extensoes = (np.maximum.reduceat(projecao, inicios, axis=0)
+                     - np.minimum.reduceat(projecao, inicios, axis=0))
+
+        # Seções quadradas deixam o PCA sem direção definida: usar a AABB se for menor
+        extensoes_aabb = self.aabb_max - self.aabb_min
+        usar_aabb = np.prod(extensoes_aabb, axis=1) <= np.prod(extensoes, axis=1) * (1 + 1e-9)
+        eixos[usar_aabb] = np.eye(3)
+        extensoes[usar_aabb] = extensoes_aabb[usar_aabb]
+        return eixos, extensoes
+
+    def dimensions_cm(self, indice: int):
+        """Largura, altura e profundidade (cm) da OBB do objeto"""
+        eixos = self.obb_eixos[indice]
+        extensoes = self.obb_extensoes[indice] * 100
+
+        # Altura: eixo da OBB mais alinhado com o eixo vertical do modelo
+        vertical = int(np.argmax(np.abs(eixos[self.malha.up_axis, :])))
+        horizontais = sorted((float(extensoes[i]) for i in range(3) if i != vertical), reverse=True)
+        return horizontais[0], float(extensoes[vertical]), horizontais[1]
+
+    def assembly_dimensions_cm(self):
+        """Largura, altura e profundidade (cm) da AABB de todos os objetos juntos"""
+        extensoes = (self.aabb_max.max(axis=0) - self.aabb_min.min(axis=0)) * 100
+        vertical = self.malha.up_axis
+        horizontais = sorted((float(extensoes[i]) for i in range(3) if i != vertical), reverse=True)
+        return horizontais[0], float(extensoes[vertical]), horizontais[1]
+
+    def to_components(self, filename: str) -> List[Dict]:
+        """Componentes no formato consumido pelo OrcamentoEngine"""
+        componentes = []
+        for i, objeto in enumerate(self.objetos):
+            largura, altura, profundidade = self.dimensions_cm(i)
+            componentes.append(build_component(
+                self.malha.object_names[objeto], filename,
+                largura, altura, profundidade, float(self.area_objeto[objeto])
+            ))
+        return componentes
+
+
+def build_component(nome: str, filename: str, largura: float, altura: float,
+                    profundidade: float, area_m2: float) -> Dict:
+    """Monta o dicionário do componente a partir das medidas"""
+    if nome == 'objeto':
+        nome = os.path.splitext(os.path.basename(filename))[0]
+
+    nome_lower = nome.lower()
+    tipo = component_type(nome)
+
+    if tipo == 'bancada':
+        material = 'Melamina 15mm'
+    elif profundidade >= 50:
+        material = 'MDF 18mm'
+    else:
+        material = 'MDF 15mm'
+
+    return {
+        'id': re.sub(r'[^a-z0-9]+', '_', nome_lower).strip('_') or 'componente',
+        'nome': nome.replace('_', ' ').strip().title(),
+        'tipo': tipo,
+        'largura_cm': round(largura, 1),
+        'altura_cm': round(altura, 1),
+        'profundidade_cm': round(profundidade, 1),
+        'area_m2': round(area_m2, 2),
+        'material_sugerido': material,
+        'acessorios': estimate_accessories(tipo, largura, altura)
+    }
+
+
+def component_type(nome: str) -> str:
+    """Tipo do componente pelas palavras do nome"""
+    nome_lower = nome.lower()
+    return next((t for palavra, t in TIPOS_POR_PALAVRA if palavra in nome_lower), 'modulo')
+
+
+def estimate_accessories(tipo: str, largura_cm: float, altura_cm: float) -> List[str]:
+    """Estima ferragens pelo tipo e pelas dimensões do componente"""
+    if tipo in ('armario', 'gabinete', 'guarda_roupa', 'modulo'):
+        portas = max(1, round(largura_cm / 60))
+        dobradicas_por_porta = 3 if altura_cm > 100 else 2
+        return ['dobradica'] * (portas * dobradicas_por_porta) + ['puxador'] * portas
+
+    if tipo == 'gaveteiro':
+        gavetas = max(1, round(altura_cm / 20))
+        return ['corredicao'] * gavetas + ['puxador'] * gavetas
+
+    return []
@@ -0,0 +1,191 @@
+"""
+Detecção de Chapas (Painéis) nas Malhas
+"""
+
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from mesh_metrics import MeshMetrics
+from mesh_parser import MeshData
+from mesh_segmentation import connected_components, ensure_welded
+
+# Resolução do índice de planos: direção da normal e distância à origem
+PASSO_NORMAL = 0.02
+PASSO_OFFSET_M = 0.001
+
+# Limites para uma peça ser considerada chapa
+ESPESSURA_MAXIMA_MM = 60.0
+ESPESSURA_MINIMA_MM = 3.0
+FRACAO_MINIMA_FACES = 0.6
+
+
+def match_material(espessura_mm: float, materiais: Dict[str, Dict]) -> Optional[str]:
+    """Material do catálogo com a espessura mais próxima (ex: 'MDF 18mm')"""
+    melhor, menor_diferenca = None, None
+    for nome in materiais:
+        encontrado = re.search(r'(\d+(?:[.,]\d+)?)\s*mm', nome)
+        if not encontrado:
+            continue
+        diferenca = abs(float(encontrado.group(1).replace(',', '.')) - espessura_mm)
+        if menor_diferenca is None or diferenca < menor_diferenca:
+            melhor, menor_diferenca = nome, diferenca
+    return melhor
+
+
+def detect_panels(metricas: MeshMetrics, pecas: Optional[np.ndarray] = None) -> List[Dict]:
+    """Detecta chapas: peças conectadas com duas faces opostas paralelas e finas
+
+    As faces são agrupadas em um índice de planos (peça, normal quantizada,
+    distância quantizada) por ordenação, sem comparar faces duas a duas.
+    `pecas` são rótulos de peça por face já calculados sobre a malha soldada
+    (ex: o face_object de segment_mesh); sem eles a malha é soldada e
+    segmentada aqui.
+    """
+    malha = metricas.malha
+    if malha.num_faces == 0:
+        return []
+
+    if pecas is not None:
+        vertices, faces, pecas_cc = malha.vertices, malha.faces, pecas
+    else:
+        vertices, faces = ensure_welded(malha.vertices, malha.faces)
+        pecas_cc = connected_components(len(vertices), faces)
+
+    # Peça = parte conectada dentro de um mesmo objeto
+    chave_peca = malha.face_object.astype(np.int64) * (int(pecas_cc.max()) + 1) + pecas_cc
+    chaves_pecas, peca = np.unique(chave_peca, return_inverse=True)
+    objeto_peca = chaves_pecas // (int(pecas_cc.max()) + 1)
+    num_pecas = len(chaves_pecas)
+
+    # Medidas (áreas e OBB) de cada peça
+    medidas = MeshMetrics(
+        MeshData(vertices, faces, peca, [str(i) for i in range(num_pecas)],
+                 malha.face_material, malha.material_names, malha.up_axis),
+        metricas.escala
+    )
+    areas = medidas.areas_faces
+    area_peca = medidas.area_objeto
+
+    # Normal canônica: componente de maior módulo sempre positiva
+    normais = medidas.normais.copy()
+    dominante = np.argmax(np.abs(normais), axis=1)
+    sinal = np.sign(normais[np.arange(len(normais)), dominante])
+    normais *= np.where(sinal == 0, 1.0, sinal)[:, None]
+
+    centroides = vertices[faces].mean(axis=1) * metricas.escala
+    offsets = np.einsum('ij,ij->i', normais, centroides)
+
+    limite = int(round(1 / PASSO_NORMAL))
+    nq = np.rint(normais / PASSO_NORMAL).astype(np.int64) + limite
+    chave_normal = (nq[:, 0] * (2 * limite + 1) + nq[:, 1]) * (2 * limite + 1) + nq[:, 2]
+    grupo = peca.astype(np.int64) * (2 * limite + 1) ** 3 + chave_normal
+    dq = np.rint(offsets / PASSO_OFFSET_M).astype(np.int64)
+
+    # Balde = plano (peça, normal, distância); área e distância média por balde
+    ordem = np.lexsort((dq, grupo))
+    grupo_ord, dq_ord = grupo[ordem], dq[ordem]
+    novo = np.concatenate([[True], (grupo_ord[1:] != grupo_ord[:-1]) | (dq_ord[1:] != dq_ord[:-1])])
+    balde = np.empty(len(ordem), dtype=np.int64)
+    balde[ordem] = np.cumsum(novo) - 1
+
+    area_balde = np.bincount(balde, weights=areas)
+    offset_balde = np.bincount(balde, weights=areas * offsets) / np.where(area_balde > 0, area_balde, 1)
+    grupo_balde = grupo_ord[novo]
+    peca_balde = grupo_balde // (2 * limite + 1) ** 3
+
+    # Dois maiores baldes de cada direção: as faces opostas da chapa
+    ordem_b = np.lexsort((-area_balde, grupo_balde))
+    g = grupo_balde[ordem_b]
+    primeiro = np.concatenate([[True], g[1:] != g[:-1]])
+    segundo = np.concatenate([[False], primeiro[:-1]]) & ~primeiro
+    b1 = ordem_b[np.flatnonzero(segundo) - 1]
+    b2 = ordem_b[segundo]
+    if len(b1) == 0:
+        return []
+
+    area_par = area_balde[b1] + area_balde[b2]
+    espessura_mm = np.abs(offset_balde[b1] - offset_balde[b2]) * 1000
+    peca_par = peca_balde[b1]
+
+    # Melhor par por peça (maior área somada)
+    ordem_p = np.lexsort((-area_par, peca_par))
+    melhor = ordem_p[np.concatenate([[True], peca_par[ordem_p][1:] != peca_par[ordem_p][:-1]])]
+
+    extensoes = np.sort(medidas.obb_extensoes, axis=1)[:, ::-1] * 1000
+    compacto = np.full(num_pecas, -1)
+    compacto[medidas.objetos] = np.arange(len(medidas.objetos))
+
+    p = peca_par[melhor]
+    a1, a2 = area_balde[b1[melhor]], area_balde[b2[melhor]]
+    espessura = espessura_mm[melhor]
+    comprimento, largura = extensoes[compacto[p], 0], extensoes[compacto[p], 1]
+    e_chapa = ((np.minimum(a1, a2) >= 0.5 * np.maximum(a1, a2))
+               & (area_par[melhor] >= FRACAO_MINIMA_FACES * area_peca[p])
+               & (espessura >= ESPESSURA_MINIMA_MM) & (espessura <= ESPESSURA_MAXIMA_MM)
+               & (espessura < 0.5 * largura))
+
+    chapas = []
+    for i in np.flatnonzero(e_chapa):
+        chapas.append({
+            'objeto': int(objeto_peca[p[i]]),
+            'comprimento_mm': round(float(comprimento[i]), 1),
+            'largura_mm': round(float(largura[i]), 1),
+            'espessura_mm': round(float(espessura[i]), 1),
+            'area_m2': round(float(comprimento[i] * largura[i]) / 1e6, 4),
+            'area_superficie_m2': float(area_peca[p[i]])
+        })
+
+    return chapas
+
+
+def apply_panels(componentes: List[Dict], objetos: np.ndarray, chapas: List[Dict],
+                 materiais: Dict[str, Dict], montagem: bool = False) -> List[Dict]:
+    """Ajusta os componentes às chapas detectadas e retorna a lista de chapas
+
+    A área do componente passa a contar cada chapa uma vez (e não as duas
+    faces), e o material é escolhido pela espessura medida. Com `montagem`
+    (peças de um mesmo móvel separadas por segment_mesh), toda peça de uma
+    chapa só vira painel sem ferragens: elas são do móvel, não de cada peça.
+    """
+    indice = {int(objeto): i for i, objeto in enumerate(objetos)}
+    por_componente: Dict[int, List[Dict]] = {}
+    for chapa in chapas:
+        if chapa['objeto'] in indice:
+            por_componente.setdefault(indice[chapa['objeto']], []).append(chapa)
+
+    lista = []
+    for i, comp_chapas in por_componente.items():
+        comp = componentes[i]
+
+        superficie = sum(c['area_superficie_m2'] for c in comp_chapas)
+        area_chapas = sum(c['area_m2'] for c in comp_chapas)
+        comp['area_m2'] = round(max(comp['area_m2'] - superficie, 0) + area_chapas, 2)
+
+        # Material pela espessura que cobre mais área
+        por_espessura: Dict[float, float] = {}
+        for c in comp_chapas:
+            por_espessura[c['espessura_mm']] = por_espessura.get(c['espessura_mm'], 0) + c['area_m2']
+        espessura = max(por_espessura, key=por_espessura.get)
+        comp['material_sugerido'] = match_material(espessura, materiais) or comp['material_sugerido']
+        comp['espessura_mm'] = espessura
+        comp['num_chapas'] = len(comp_chapas)
+
+        if len(comp_chapas) == 1 and (comp['tipo'] == 'modulo' or (montagem and comp['acessorios'])):
+            comp['tipo'] = 'painel'
+            comp['acessorios'] = []
+
+        for n, c in enumerate(comp_chapas, start=1):
+            lista.append({
+                'id': f"{comp['id']}_chapa_{n}",
+                'componente_id': comp['id'],
+                'nome': f"{comp['nome']} - Chapa {n}",
+                'comprimento_mm': c['comprimento_mm'],
+                'largura_mm': c['largura_mm'],
+                'espessura_mm': c['espessura_mm'],
+                'area_m2': c['area_m2'],
+                'material_sugerido': match_material(c['espessura_mm'], materiais) or comp['material_sugerido']
+            })
+
+    return lista
@@ -0,0 +1,932 @@
+"""
+Leitores de Malhas 3D
+"""
+
+import mmap
+import re
+import shutil
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Tamanho do bloco lido por vez do arquivo mapeado em memória
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Eixos vertical padrão por formato (0=x, 1=y, 2=z)
+UP_AXIS_Y = 1
+UP_AXIS_Z = 2
+
+# Sequências de linhas de vértices, de faces, ignoradas ou uma linha avulsa
+# (a palavra-chave pode vir indentada e ser seguida de espaços ou tabs)
+_OBJ_RUNS = re.compile(
+    rb'(?P<v>(?:[ \t]*v[ \t][^\n]*\n)+)'
+    rb'|(?P<f>(?:[ \t]*f[ \t][^\n]*\n)+)'
+    rb'|(?P<ignorar>(?:[ \t]*(?:v[tnp]|#|s[ \t]|l[ \t]|mtllib)[^\n]*\n|[ \t\r]*\n)+)'
+    rb'|(?P<linha>[^\n]*\n)'
+)
+# Registros com nome: objeto, grupo e material
+_OBJ_NOMEADO = re.compile(rb'[ \t]*(o|g|usemtl)(?:[ \t]([^\n]*))?\r?\n')
+# Comentário até o fim da linha e continuação de linha ('\' no fim)
+_OBJ_COMENTARIO = re.compile(rb'#[^\n]*')
+_OBJ_CONTINUACAO = re.compile(rb'\\[ \t\r]*\n')
+
+# Registro de 50 bytes de cada triângulo do STL binário
+STL_BINARY_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('atributos', '<u2'),
+])
+
+# Tipos escalares do PLY
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+# Formato do módulo struct para cada tipo PLY (contagens das listas binárias)
+_PLY_STRUCT = {'i1': 'b', 'u1': 'B', 'i2': 'h', 'u2': 'H', 'i4': 'i', 'u4': 'I', 'f4': 'f', 'f8': 'd'}
+
+# Linhas de início e fim de sólido do STL ASCII
+_STL_SOLID = re.compile(rb'solid[^\n]*')
+
+
+class MeshData:
+    """Malha triangulada com objetos e materiais por face"""
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray,
+                 face_object: np.ndarray, object_names: List[str],
+                 face_material: np.ndarray, material_names: List[str],
+                 up_axis: int = UP_AXIS_Y, escala: Optional[float] = None):
+        self.vertices = vertices            # (n, 3) float64
+        self.faces = faces                  # (m, 3) int64, índices base 0
+        self.face_object = face_object      # (m,) índice em object_names
+        self.object_names = object_names
+        self.face_material = face_material  # (m,) índice em material_names (-1 = nenhum)
+        self.material_names = material_names
+        self.up_axis = up_axis
+        self.escala = escala                # metros por unidade declarados no arquivo (None = não declarado)
+
+    @property
+    def num_faces(self) -> int:
+        return len(self.faces)
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.vertices)
+
+
+def spool_upload(uploaded_file: BinaryIO, suffix: str = '', diretorio: Optional[str] = None) -> str:
+    """Copia o upload em blocos para um arquivo temporário e retorna o caminho"""
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=diretorio) as tmp:
+        shutil.copyfileobj(uploaded_file, tmp, CHUNK_SIZE)
+        return tmp.name
+
+
+def iter_chunks(mm: mmap.mmap, chunk_size: int = CHUNK_SIZE, inicio: int = 0):
+    """Itera sobre blocos do arquivo terminados em quebra de linha"""
+    size = len(mm)
+
+    while inicio < size:
+        fim = min(inicio + chunk_size, size)
+        if fim < size:
+            quebra = mm.rfind(b'\n', inicio, fim)
+            if quebra > inicio:
+                fim = quebra + 1
+            else:
+                # Linha maior que o bloco: avançar até a próxima quebra
+                quebra = mm.find(b'\n', fim)
+                fim = size if quebra == -1 else quebra + 1
+
+        yield mm[inicio:fim], fim
+        inicio = fim
+
+
+def _open_mmap(path: str):
+    """Abre o arquivo mapeado em memória (None para arquivos vazios)"""
+    f = open(path, 'rb')
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Arquivo vazio não pode ser mapeado
+        return f, None
+
+
+def _parse_floats(tokens: List[bytes]) -> np.ndarray:
+    """Converte tokens numéricos em float64"""
+    return np.array(tokens, dtype=np.bytes_).astype(np.float64)
+
+
+def _register_name(names: List[str], index: Dict[str, int], nome: str) -> int:
+    """Retorna o índice do nome, registrando-o se for novo"""
+    idx = index.get(nome)
+    if idx is None:
+        idx = len(names)
+        index[nome] = idx
+        names.append(nome)
+    return idx
+
+
+def _empty_mesh(up_axis: int) -> MeshData:
+    return MeshData(
+        np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64),
+        np.zeros(0, dtype=np.int64), [], np.zeros(0, dtype=np.int64), [],
+        up_axis
+    )
+
+
+def _fan_triangulate(poligonos: np.ndarray) -> np.ndarray:
+    """Triangula em leque polígonos com o mesmo número de vértices"""
+    lados = poligonos.shape[1]
+    if lados == 3:
+        return poligonos
+    tri = [np.stack([poligonos[:, 0], poligonos[:, i], poligonos[:, i + 1]], axis=1)
+           for i in range(1, lados - 1)]
+    return np.stack(tri, axis=1).reshape(-1, 3)
+
+
+def _iter_obj_chunks(mm: mmap.mmap):
+    """Blocos do OBJ sem comentários e com as linhas continuadas ('\\' no fim) unidas
+
+    Cada bloco termina em quebra de linha; uma linha que continua no bloco
+    seguinte é adiada para ele.
+    """
+    resto = b''
+    for chunk, lidos in iter_chunks(mm):
+        if resto:
+            chunk, resto = resto + chunk, b''
+        if b'#' in chunk:
+            chunk = _OBJ_COMENTARIO.sub(b'', chunk)
+        if b'\\' in chunk:
+            chunk = _OBJ_CONTINUACAO.sub(b' ', chunk)
+        if not chunk.endswith(b'\n'):
+            corte = chunk.rfind(b'\n') + 1
+            chunk, resto = chunk[:corte], chunk[corte:]
+        if chunk:
+            yield chunk, lidos
+    if resto:
+        yield resto + b'\n', len(mm)
+
+
+def _parse_obj_vertices(bloco: bytes) -> np.ndarray:
+    """Converte uma sequência de linhas 'v' em coordenadas (n, 3)"""
+    linhas = bloco.count(b'\n')
+    valores = np.fromstring(bloco.replace(b'v', b' '), dtype=np.float64, sep=' ')
+
+    por_linha = len(bloco[:bloco.index(b'\n')].split()) - 1
+    if por_linha >= 3 and valores.size == por_linha * linhas:
+        return valores.reshape(linhas, por_linha)[:, :3]
+
+    # Linhas irregulares (w opcional, cores por vértice)
+    return _parse_floats([t for linha in bloco.splitlines() for t in linha.split()[1:4]]).reshape(-1, 3)
+
+
+def _parse_obj_faces(bloco: bytes, num_vertices: int) -> np.ndarray:
+    """Converte uma sequência de linhas 'f' em triângulos com índices base 0"""
+    linhas = bloco.count(b'\n')
+    refs = bloco[:bloco.index(b'\n')].split()[1:]
+    lados = len(refs)
+    # Valores por vértice: v, v/vt, v//vn ou v/vt/vn
+    por_ref = len(refs[0].replace(b'/', b' ').split()) if refs else 0
+    valores = np.fromstring(bloco.replace(b'f', b' ').replace(b'/', b' '), dtype=np.int64, sep=' ')
+
+    if lados >= 3 and valores.size == lados * por_ref * linhas:
+        # Caminho rápido: todas as faces com o mesmo formato
+        triangulos = _fan_triangulate(valores.reshape(linhas, lados * por_ref)[:, ::por_ref])
+    else:
+        poligonos = []
+        for linha in bloco.splitlines():
+            indices = [int(ref.split(b'/', 1)[0]) for ref in linha.split()[1:]]
+            if len(indices) >= 3:
+                poligonos.append(_fan_triangulate(np.array([indices], dtype=np.int64)))
+        if not poligonos:
+            return np.zeros((0, 3), dtype=np.int64)
+        triangulos = np.concatenate(poligonos)
+
+    return np.where(triangulos > 0, triangulos - 1, num_vertices + triangulos)
+
+
+def parse_obj(path: str, progress: Optional[Callable[[int], None]] = None) -> MeshData:
+    """Lê um arquivo OBJ em blocos, sem carregar o arquivo inteiro na memória"""
+    f, mm = _open_mmap(path)
+    if mm is None:
+        f.close()
+        return _empty_mesh(UP_AXIS_Y)
+
+    coords: List[np.ndarray] = []
+    blocos_faces: List[np.ndarray] = []
+    blocos_obj: List[np.ndarray] = []
+    blocos_mat: List[np.ndarray] = []
+
+    object_names: List[str] = []
+    object_index: Dict[str, int] = {}
+    material_names: List[str] = []
+    material_index: Dict[str, int] = {}
+
+    num_vertices = 0
+    obj_atual = -1
+    mat_atual = -1
+
+    try:
+        for chunk, lidos in _iter_obj_chunks(mm):
+            # Sequências de linhas do mesmo tipo são convertidas de uma vez
+            for trecho in _OBJ_RUNS.finditer(chunk):
+                tipo = trecho.lastgroup
+                bloco = trecho.group()
+
+                if tipo == 'v':
+                    coords.append(_parse_obj_vertices(bloco))
+                    num_vertices += len(coords[-1])
+                elif tipo == 'f':
+                    if obj_atual < 0:
+                        obj_atual = _register_name(object_names, object_index, 'objeto')
+                    triangulos = _parse_obj_faces(bloco, num_vertices)
+                    blocos_faces.append(triangulos)
+                    blocos_obj.append(np.full(len(triangulos), obj_atual, dtype=np.int64))
+                    blocos_mat.append(np.full(len(triangulos), mat_atual, dtype=np.int64))
+                elif tipo == 'linha':
+                    registro = _OBJ_NOMEADO.match(bloco)
+                    if registro is None:
+                        continue
+                    nome = (registro.group(2) or b'').strip().decode('utf-8', 'replace')
+                    if registro.group(1) == b'usemtl':
+                        mat_atual = _register_name(material_names, material_index, nome)
+                    else:
+                        obj_atual = _register_name(object_names, object_index, nome or 'objeto')
+
+            if progress:
+                progress(lidos)
+    finally:
+        mm.close()
+        f.close()
+
+    vertices = np.concatenate(coords) if coords else np.zeros((0, 3))
+    if not blocos_faces:
+        mesh = _empty_mesh(UP_AXIS_Y)
+        mesh.vertices = vertices
+        return mesh
+
+    faces = np.concatenate(blocos_faces)
+    if faces.min() < 0 or faces.max() >= len(vertices):
+        raise ValueError("Índice de vértice fora do intervalo no arquivo OBJ")
+
+    return MeshData(
+        vertices,
+        faces,
+        np.concatenate(blocos_obj),
+        object_names,
+        np.concatenate(blocos_mat),
+        material_names,
+        UP_AXIS_Y
+    )
+
+
+def _stl_is_binary(mm: mmap.mmap) -> bool:
+    """Detecta STL binário pelo tamanho declarado no cabeçalho"""
+    if len(mm) < 84:
+        return False
+    num_triangulos = int(np.frombuffer(mm, dtype='<u4', count=1, offset=80)[0])
+    if 84 + 50 * num_triangulos == len(mm):
+        return True
+    # Exportadores que começam o cabeçalho binário com 'solid' não batem o tamanho acima
+    return not mm[:5].lower() == b'solid'
+
+
+def _parse_stl_binary(mm: mmap.mmap) -> np.ndarray:
+    """Lê os triângulos do STL binário com um único frombuffer sobre o mapa"""
+    num_triangulos = int(np.frombuffer(mm, dtype='<u4', count=1, offset=80)[0])
+    if 84 + 50 * num_triangulos > len(mm):
+        raise ValueError("Arquivo STL binário truncado")
+
+    registros = np.frombuffer(mm, dtype=STL_BINARY_DTYPE, count=num_triangulos, offset=84)
+    # Única cópia: vértices (n, 3, 3) de float32 para float64
+    return registros['vertices'].astype(np.float64)
+
+
+def _parse_stl_ascii(mm: mmap.mmap, progress: Optional[Callable[[int], None]],
+                     object_names: List[str], blocos_obj: List[np.ndarray]) -> np.ndarray:
+    """Lê STL ASCII em blocos, convertendo cada sequência de facetas de uma vez"""
+    object_index: Dict[str, int] = {}
+    blocos: List[np.ndarray] = []
+    obj_atual = -1
+    # Coordenadas de uma faceta dividida entre dois blocos
+    pendente = np.zeros(0)
+
+    def converter(trecho: bytes):
+        nonlocal pendente, obj_atual
+        # Cada faceta vira 12 números: normal (3) + vértices (9)
+        for palavra in (b'endfacet', b'endloop', b'outer loop', b'facet normal', b'vertex'):
+            trecho = trecho.replace(palavra, b' ')
+        if not trecho.strip():
+            return
+        valores = np.fromstring(trecho, dtype=np.float64, sep=' ')
+        if pendente.size:
+            valores = np.concatenate([pendente, valores])
+        completos = valores.size - valores.size % 12
+        pendente = valores[completos:]
+        if completos:
+            if obj_atual < 0:
+                obj_atual = _register_name(object_names, object_index, 'objeto')
+            blocos.append(valores[:completos].reshape(-1, 12)[:, 3:].reshape(-1, 3, 3))
+            blocos_obj.append(np.full(len(blocos[-1]), obj_atual, dtype=np.int64))
+
+    for chunk, lidos in iter_chunks(mm):
+        inicio = 0
+        # Linhas 'solid nome' e 'endsolid nome' delimitam os trechos de facetas
+        for marca in _STL_SOLID.finditer(chunk):
+            fim_trecho = marca.start()
+            encerra = chunk[max(fim_trecho - 3, 0):fim_trecho] == b'end'
+            converter(chunk[inicio:fim_trecho - 3 if encerra else fim_trecho])
+            if not encerra:
+                nome = marca.group()[5:].strip().decode('utf-8', 'replace') or 'objeto'
+                obj_atual = _register_name(object_names, object_index, nome)
+            inicio = marca.end()
+        converter(chunk[inicio:])
+
+        if progress:
+            progress(lidos)
+
+    if pendente.size:
+        raise ValueError("Faceta incompleta no arquivo STL ASCII")
+
+    return np.concatenate(blocos) if blocos else np.zeros((0, 3, 3))
+
+
+def parse_stl(path: str, progress: Optional[Callable[[int], None]] = None) -> MeshData:
+    """Lê STL binário ou ASCII
+
+    Os vértices não são compartilhados entre triângulos (o STL não guarda
+    topologia): cada face aponta para três vértices próprios.
+    """
+    f, mm = _open_mmap(path)
+    if mm is None:
+        f.close()
+        return _empty_mesh(UP_AXIS_Z)
+
+    object_names: List[str] = []
+    blocos_obj: List[np.ndarray] = []
+
+    try:
+        if _stl_is_binary(mm):
+            triangulos = _parse_stl_binary(mm)
+            object_names.append('objeto')
+            face_object = np.zeros(len(triangulos), dtype=np.int64)
+            if progress:
+                progress(len(mm))
+        else:
+            triangulos = _parse_stl_ascii(mm, progress, object_names, blocos_obj)
+            face_object = np.concatenate(blocos_obj) if blocos_obj else np.zeros(0, dtype=np.int64)
+    finally:
+        mm.close()
+        f.close()
+
+    num_faces = len(triangulos)
+    return MeshData(
+        triangulos.reshape(-1, 3),
+        np.arange(num_faces * 3, dtype=np.int64).reshape(-1, 3),
+        face_object,
+        object_names,
+        np.full(num_faces, -1, dtype=np.int64),
+        [],
+        UP_AXIS_Z
+    )
+
+
+def _parse_ply_header(mm: mmap.mmap):
+    """Lê o cabeçalho PLY: formato, elementos e posição do corpo"""
+    fim = mm.find(b'end_header')
+    if not mm[:3] == b'ply' or fim == -1:
+        raise ValueError("Cabeçalho PLY inválido")
+    corpo = mm.find(b'\n', fim) + 1
+
+    formato = None
+    elementos = []
+    for linha in mm[:fim].decode('ascii', 'replace').splitlines():
+        partes = linha.split()
+        if not partes:
+            continue
+        if partes[0] == 'format':
+            formato = partes[1]
+        elif partes[0] == 'element':
+            elementos.append({'nome': partes[1], 'quantidade': int(partes[2]), 'propriedades': []})
+        elif partes[0] == 'property' and elementos:
+            if partes[1] == 'list':
+                prop = {'nome': partes[4], 'lista': True,
+                        'tipo_contagem': PLY_TYPES[partes[2]], 'tipo': PLY_TYPES[partes[3]]}
+            else:
+                prop = {'nome': partes[2], 'lista': False, 'tipo': PLY_TYPES[partes[1]]}
+            elementos[-1]['propriedades'].append(prop)
+
+    if formato not in ('ascii', 'binary_little_endian', 'binary_big_endian'):
+        raise ValueError(f"Formato PLY não suportado: {formato}")
+
+    return formato, elementos, corpo
+
+
+def _ply_face_property(elemento: Dict) -> Optional[str]:
+    """Nome da lista de índices de vértices do elemento face"""
+    for prop in elemento['propriedades']:
+        if prop['lista'] and prop['nome'] in ('vertex_indices', 'vertex_index'):
+            return prop['nome']
+    return None
+
+
+def _ply_vertex_coords(registros: np.ndarray) -> np.ndarray:
+    """Copia apenas x/y/z dos registros de vértice"""
+    return np.stack([registros['x'], registros['y'], registros['z']], axis=1).astype(np.float64)
+
+
+def _walk_ply_binary_lists(mm: mmap.mmap, offset: int, elemento: Dict, ordem: str,
+                           nome_indices: Optional[str]):
+    """Percorre um elemento binário com listas de tamanho variável
+
+    O laço em Python só lê as contagens e anota onde começa a lista de
+    índices de cada registro; os índices são copiados depois, de uma vez por
+    tamanho de polígono, e triangulados como no PLY ASCII. Retorna (faces ou
+    None, próximo offset).
+    """
+    # Cada lista: bytes fixos antes dela, formato da contagem, tamanho do item
+    listas = []
+    fixo = 0
+    for prop in elemento['propriedades']:
+        if prop['lista']:
+            contagem = struct.Struct(ordem + _PLY_STRUCT[prop['tipo_contagem']])
+            listas.append((fixo, contagem.unpack_from, contagem.size, np.dtype(prop['tipo']).itemsize,
+                           prop['nome'] == nome_indices))
+            fixo = 0
+        else:
+            fixo += np.dtype(prop['tipo']).itemsize
+
+    inicios = []
+    contagens = []
+    try:
+        for _ in range(elemento['quantidade']):
+            for antes, ler_contagem, tamanho_contagem, tamanho_item, indices in listas:
+                offset += antes
+                quantidade = int(ler_contagem(mm, offset)[0])
+                offset += tamanho_contagem
+                if indices:
+                    inicios.append(offset)
+                    contagens.append(quantidade)
+                offset += quantidade * tamanho_item
+            offset += fixo
+    except struct.error:
+        raise ValueError("Arquivo PLY truncado")
+    if offset > len(mm):
+        raise ValueError("Arquivo PLY truncado")
+
+    if not nome_indices:
+        return None, offset
+
+    tipo = np.dtype(next(p['tipo'] for p in elemento['propriedades'] if p['nome'] == nome_indices))
+    tipo = tipo.newbyteorder(ordem)
+    inicios = np.array(inicios, dtype=np.int64)
+    contagens = np.array(contagens, dtype=np.int64)
+    validos = contagens >= 3
+    inicios, contagens = inicios[validos], contagens[validos]
+
+    # Índices de todos os polígonos em ordem, copiados byte a byte por tamanho
+    bytes_arquivo = np.frombuffer(mm, dtype=np.uint8)
+    destino = np.concatenate([[0], np.cumsum(contagens)[:-1]]).astype(np.int64)
+    indices = np.empty(int(contagens.sum()), dtype=np.int64)
+    for tamanho in np.unique(contagens):
+        grupo = np.flatnonzero(contagens == tamanho)
+        registros = np.empty((len(grupo), int(tamanho) * tipo.itemsize), dtype=np.uint8)
+        for k in range(registros.shape[1]):
+            registros[:, k] = bytes_arquivo[inicios[grupo] + k]
+        indices[destino[grupo, None] + np.arange(tamanho)] = registros.view(tipo)
+    return _fan_triangulate_counts(indices, contagens), offset
+
+
+def _read_ply_binary_element(mm: mmap.mmap, offset: int, elemento: Dict, ordem: str):
+    """Mapeia um elemento binário em um dtype estruturado sem copiar os dados
+
+    Retorna (registros, próximo offset); registros é None quando o elemento
+    tem listas de tamanho variável.
+    """
+    campos = []
+    for prop in elemento['propriedades']:
+        if prop['lista']:
+            # Supor listas de tamanho fixo, lendo o tamanho do primeiro registro
+            inicio = offset + (np.dtype(campos).itemsize if campos else 0)
+            tipo_contagem = np.dtype(prop['tipo_contagem']).newbyteorder(ordem)
+            if inicio + tipo_contagem.itemsize > len(mm):
+                return None, offset
+            tamanho = int(np.frombuffer(mm, dtype=tipo_contagem, count=1, offset=inicio)[0])
+            campos.append((prop['nome'] + '__n', tipo_contagem))
+            campos.append((prop['nome'], np.dtype(prop['tipo']).newbyteorder(ordem), (tamanho,)))
+        else:
+            campos.append((prop['nome'], np.dtype(prop['tipo']).newbyteorder(ordem)))
+
+    dtype = np.dtype(campos)
+    if offset + dtype.itemsize * elemento['quantidade'] > len(mm):
+        return None, offset
+
+    registros = np.frombuffer(mm, dtype=dtype, count=elemento['quantidade'], offset=offset)
+    for prop in elemento['propriedades']:
+        if prop['lista'] and not (registros[prop['nome'] + '__n'] == registros.dtype[prop['nome']].shape[0]).all():
+            return None, offset
+
+    return registros, offset + dtype.itemsize * elemento['quantidade']
+
+
+def _parse_ply_binary(mm: mmap.mmap, elementos: List[Dict], corpo: int, ordem: str):
+    """Lê vértices e faces de um PLY binário"""
+    vertices = None
+    faces = None
+    offset = corpo
+
+    for elemento in elementos:
+        if vertices is not None and faces is not None:
+            # Elementos seguintes (arestas, materiais) não são usados
+            break
+
+        registros, proximo = _read_ply_binary_element(mm, offset, elemento, ordem)
+        nome_indices = _ply_face_property(elemento) if elemento['nome'] == 'face' else None
+
+        if registros is None:
+            if not any(p['lista'] for p in elemento['propriedades']):
+                raise ValueError("Arquivo PLY truncado")
+            triangulos, proximo = _walk_ply_binary_lists(mm, offset, elemento, ordem, nome_indices)
+            if triangulos is not None:
+                faces = triangulos
+        elif elemento['nome'] == 'vertex':
+            vertices = _ply_vertex_coords(registros)
+        elif nome_indices:
+            if len(registros) and registros.dtype[nome_indices].shape[0] >= 3:
+                faces = _fan_triangulate(registros[nome_indices].astype(np.int64))
+            else:
+                faces = np.zeros((0, 3), dtype=np.int64)
+
+        offset = proximo
+
+    return (vertices if vertices is not None else np.zeros((0, 3)),
+            faces if faces is not None else np.zeros((0, 3), dtype=np.int64))
+
+
+def _parse_ply_ascii(mm: mmap.mmap, elementos: List[Dict], corpo: int,
+                     progress: Optional[Callable[[int], None]]):
+    """Lê vértices e faces de um PLY ASCII em blocos de linhas"""
+    vertices: List[np.ndarray] = []
+    poligonos: List[np.ndarray] = []
+    pendentes = [e for e in elementos if e['quantidade'] > 0]
+    restante = pendentes[0]['quantidade'] if pendentes else 0
+
+    for chunk, lidos in iter_chunks(mm, inicio=corpo):
+        if not chunk.endswith(b'\n'):
+            chunk += b'\n'
+        quebras = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+        linha = 0
+        inicio = 0
+
+        while pendentes and linha < len(quebras):
+            elemento = pendentes[0]
+            n = min(restante, len(quebras) - linha)
+            fim = int(quebras[linha + n - 1]) + 1
+            bloco = chunk[inicio:fim]
+
+            if elemento['nome'] == 'vertex':
+                vertices.append(_parse_ply_ascii_vertices(bloco, n, elemento))
+            elif elemento['nome'] == 'face' and _ply_face_property(elemento):
+                poligonos.extend(_parse_ply_ascii_faces(bloco, n, elemento))
+
+            linha += n
+            inicio = fim
+            restante -= n
+            if restante == 0:
+                pendentes.pop(0)
+                restante = pendentes[0]['quantidade'] if pendentes else 0
+
+        if progress:
+            progress(lidos)
+        if not pendentes:
+            break
+
+    return (np.concatenate(vertices) if vertices else np.zeros((0, 3)),
+            np.concatenate(poligonos) if poligonos else np.zeros((0, 3), dtype=np.int64))
+
+
+def _parse_ply_ascii_vertices(bloco: bytes, linhas: int, elemento: Dict) -> np.ndarray:
+    nomes = [p['nome'] for p in elemento['propriedades']]
+    valores = np.fromstring(bloco, dtype=np.float64, sep=' ')
+    if any(p['lista'] for p in elemento['propriedades']) or valores.size != linhas * len(nomes):
+        raise ValueError("Vértices PLY ASCII com número inesperado de valores")
+    colunas = [nomes.index(eixo) for eixo in ('x', 'y', 'z')]
+    return valores.reshape(linhas, len(nomes))[:, colunas]
+
+
+def _parse_ply_ascii_faces(bloco: bytes, linhas: int, elemento: Dict) -> List[np.ndarray]:
+    valores = np.fromstring(bloco, dtype=np.float64, sep=' ').astype(np.int64)
+    props = elemento['propriedades']
+    nome_indices = _ply_face_property(elemento)
+
+    if len(props) == 1 and linhas and valores.size:
+        lados = int(valores[0])
+        if lados >= 3 and valores.size == linhas * (lados + 1):
+            tabela = valores.reshape(linhas, lados + 1)
+            if (tabela[:, 0] == lados).all():
+                # Caminho rápido: todas as faces com o mesmo número de lados
+                return [_fan_triangulate(tabela[:, 1:])]
+
+    poligonos = []
+    pos = 0
+    for _ in range(linhas):
+        for prop in props:
+            if prop['lista']:
+                quantidade = int(valores[pos])
+                if prop['nome'] == nome_indices and quantidade >= 3:
+                    poligonos.append(_fan_triangulate(valores[None, pos + 1:pos + 1 + quantidade]))
+                pos += 1 + quantidade
+            else:
+                pos += 1
+    return poligonos
+
+
+def parse_ply(path: str, progress: Optional[Callable[[int], None]] = None) -> MeshData:
+    """Lê PLY ASCII ou binário (little/big endian), decodificando apenas x/y/z e faces"""
+    f, mm = _open_mmap(path)
+    if mm is None:
+        f.close()
+        return _empty_mesh(UP_AXIS_Z)
+
+    try:
+        formato, elementos, corpo = _parse_ply_header(mm)
+        if formato == 'ascii':
+            vertices, faces = _parse_ply_ascii(mm, elementos, corpo, progress)
+        else:
+            ordem = '<' if formato == 'binary_little_endian' else '>'
+            vertices, faces = _parse_ply_binary(mm, elementos, corpo, ordem)
+            if progress:
+                progress(len(mm))
+    finally:
+        mm.close()
+        f.close()
+
+    if len(faces) and (faces.min() < 0 or faces.max() >= len(vertices)):
+        raise ValueError("Índice de vértice fora do intervalo no arquivo PLY")
+
+    num_faces = len(faces)
+    return MeshData(
+        vertices,
+        faces,
+        np.zeros(num_faces, dtype=np.int64),
+        ['objeto'] if num_faces else [],
+        np.full(num_faces, -1, dtype=np.int64),
+        [],
+        UP_AXIS_Z
+    )
+
+
+def _dae_tag(elem) -> str:
+    """Nome da tag sem o namespace do COLLADA"""
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _fan_triangulate_counts(indices: np.ndarray, contagens: np.ndarray) -> np.ndarray:
+    """Triangula em leque polígonos de tamanhos variados (polylist)"""
+    contagens = contagens[contagens >= 3]
+    inicios = np.concatenate([[0], np.cumsum(contagens)[:-1]])
+    tri_por_poligono = contagens - 2
+    poligono = np.repeat(np.arange(len(contagens)), tri_por_poligono)
+    passo = np.arange(len(poligono)) - np.repeat(np.cumsum(tri_por_poligono) - tri_por_poligono,
+                                                 tri_por_poligono) + 1
+    base = inicios[poligono]
+    return np.stack([indices[base], indices[base + passo], indices[base + passo + 1]], axis=1)
+
+
+def _dae_matrix(elem, tag: str) -> np.ndarray:
+    """Converte matrix/translate/rotate/scale em matriz 4x4"""
+    valores = np.array((elem.text or '').split(), dtype=np.float64)
+    m = np.eye(4)
+    if tag == 'matrix' and valores.size == 16:
+        m = valores.reshape(4, 4)
+    elif tag == 'translate' and valores.size == 3:
+        m[:3, 3] = valores
+    elif tag == 'scale' and valores.size == 3:
+        m[:3, :3] = np.diag(valores)
+    elif tag == 'rotate' and valores.size == 4:
+        eixo = valores[:3] / (np.linalg.norm(valores[:3]) or 1.0)
+        angulo = np.radians(valores[3])
+        k = np.array([[0, -eixo[2], eixo[1]], [eixo[2], 0, -eixo[0]], [-eixo[1], eixo[0], 0]])
+        m[:3, :3] = np.eye(3) + np.sin(angulo) * k + (1 - np.cos(angulo)) * (k @ k)
+    return m
+
+
+def parse_dae(path: str, progress: Optional[Callable[[int], None]] = None) -> MeshData:
+    """Lê COLLADA com iterparse, sem montar a árvore XML completa
+
+    Cada float_array e <p> é convertido para NumPy assim que termina e o
+    elemento é descartado; nós nomeados do visual_scene viram objetos.
+    """
+    geometrias: Dict[str, tuple] = {}
+    nos: Dict[str, Dict] = {}
+    raizes: List[Dict] = []
+
+    # Estado da geometria em leitura
+    arrays: Dict[str, np.ndarray] = {}
+    fonte_array: Dict[str, str] = {}
+    fonte_passo: Dict[str, int] = {}
+    vertices_fonte: Dict[str, str] = {}
+    geometria_faces: List[np.ndarray] = []
+    geometria_materiais: List[str] = []
+    primitiva: Optional[Dict] = None
+    fonte_atual = vertices_atual = None
+
+    pilha_elem = []
+    pilha_nos: List[Dict] = []
+    em_cena = False
+    up_axis = UP_AXIS_Y
+    metros = None
+
+    with open(path, 'rb') as f:
+        for evento, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = _dae_tag(elem)
+
+            if evento == 'start':
+                pilha_elem.append(elem)
+                if tag == 'source':
+                    fonte_atual = elem.get('id')
+                elif tag == 'accessor' and fonte_atual:
+                    fonte_passo[fonte_atual] = int(elem.get('stride', 1))
+                elif tag == 'vertices':
+                    vertices_atual = elem.get('id')
+                elif tag in ('triangles', 'polylist', 'polygons'):
+                    primitiva = {'tipo': tag, 'offset_vertice': 0, 'passo': 1, 'fonte': None,
+                                 'material': elem.get('material', ''), 'indices': [], 'vcount': None}
+                elif tag == 'input':
+                    semantica = elem.get('semantic')
+                    origem = (elem.get('source') or '').lstrip('#')
+                    if primitiva is not None:
+                        offset = int(elem.get('offset', 0))
+                        primitiva['passo'] = max(primitiva['passo'], offset + 1)
+                        if semantica == 'VERTEX':
+                            primitiva['offset_vertice'] = offset
+                            primitiva['fonte'] = origem
+                    elif vertices_atual and semantica == 'POSITION':
+                        vertices_fonte[vertices_atual] = origem
+                elif tag == 'visual_scene':
+                    em_cena = True
+                elif tag == 'node':
+                    no = {'nome': elem.get('name') or elem.get('id') or 'objeto',
+                          'matriz': np.eye(4), 'geometrias': [], 'instancias': [], 'filhos': []}
+                    if elem.get('id'):
+                        nos[elem.get('id')] = no
+                    if pilha_nos:
+                        pilha_nos[-1]['filhos'].append(no)
+                    elif em_cena:
+                        raizes.append(no)
+                    pilha_nos.append(no)
+                elif tag == 'instance_geometry' and pilha_nos:
+                    pilha_nos[-1]['geometrias'].append((elem.get('url') or '').lstrip('#'))
+                elif tag == 'instance_node' and pilha_nos:
+                    pilha_nos[-1]['instancias'].append((elem.get('url') or '').lstrip('#'))
+                continue
+
+            pilha_elem.pop()
+
+            if tag == 'float_array':
+                arrays[elem.get('id')] = np.fromstring(elem.text or '', dtype=np.float64, sep=' ')
+                if fonte_atual:
+                    fonte_array[fonte_atual] = elem.get('id')
+            elif tag == 'vcount' and primitiva is not None:
+                primitiva['vcount'] = np.fromstring(elem.text or '', dtype=np.int64, sep=' ')
+            elif tag == 'p' and primitiva is not None:
+                indices = np.fromstring(elem.text or '', dtype=np.int64, sep=' ')
+                indices = indices[:indices.size - indices.size % primitiva['passo']]
+                primitiva['indices'].append(
+                    indices.reshape(-1, primitiva['passo'])[:, primitiva['offset_vertice']])
+            elif tag in ('triangles', 'polylist', 'polygons') and primitiva is not None:
+                blocos = primitiva['indices']
+                if blocos:
+                    if primitiva['tipo'] == 'triangles' or (
+                            primitiva['tipo'] == 'polylist' and primitiva['vcount'] is None):
+                        indices = np.concatenate(blocos)
+                        faces = indices[:indices.size - indices.size % 3].reshape(-1, 3)
+                    elif primitiva['tipo'] == 'polylist':
+                        faces = _fan_triangulate_counts(blocos[0], primitiva['vcount'])
+                    else:
+                        faces = _fan_triangulate_counts(
+                            np.concatenate(blocos), np.array([len(b) for b in blocos]))
+                    geometria_faces.append(faces)
+                    geometria_materiais.extend([primitiva['material']] * len(faces))
+                primitiva = None
+            elif tag == 'source':
+                fonte_atual = None
+            elif tag == 'vertices':
+                vertices_atual = None
+            elif tag == 'geometry':
+                fontes = set(vertices_fonte.values())
+                posicoes = np.zeros((0, 3))
+                if fontes:
+                    fonte = fontes.pop()
+                    dados = arrays.get(fonte_array.get(fonte), np.zeros(0))
+                    passo = fonte_passo.get(fonte, 3)
+                    posicoes = dados[:dados.size - dados.size % passo].reshape(-1, passo)[:, :3]
+                faces = np.concatenate(geometria_faces) if geometria_faces else np.zeros((0, 3), dtype=np.int64)
+                geometrias[elem.get('id')] = (posicoes, faces, geometria_materiais)
+                arrays, fonte_array, fonte_passo, vertices_fonte = {}, {}, {}, {}
+                geometria_faces, geometria_materiais = [], []
+            elif tag in ('matrix', 'translate', 'rotate', 'scale') and pilha_nos:
+                pilha_nos[-1]['matriz'] = pilha_nos[-1]['matriz'] @ _dae_matrix(elem, tag)
+            elif tag == 'node':
+                pilha_nos.pop()
+            elif tag == 'visual_scene':
+                em_cena = False
+            elif tag == 'up_axis':
+                up_axis = {'X_UP': 0, 'Y_UP': UP_AXIS_Y, 'Z_UP': UP_AXIS_Z}.get(
+                    (elem.text or '').strip(), UP_AXIS_Y)
+            elif tag == 'unit':
+                metros = float(elem.get('meter', 1.0))
+
+            # Descartar o elemento já processado para manter a memória estável
+            elem.clear()
+            if pilha_elem and len(pilha_elem[-1]) and pilha_elem[-1][-1] is elem:
+                del pilha_elem[-1][-1]
+
+            if progress and tag in ('geometry', 'node'):
+                progress(f.tell())
+
+    return _dae_build_mesh(geometrias, nos, raizes, up_axis, metros)
+
+
+def _dae_build_mesh(geometrias: Dict[str, tuple], nos: Dict[str, Dict], raizes: List[Dict],
+                    up_axis: int, metros: Optional[float]) -> MeshData:
+    """Instancia as geometrias da cena com as transformações acumuladas"""
+    # Um nó raiz sem geometria própria (ex: 'SketchUp') apenas agrupa os componentes
+    while len(raizes) == 1 and not raizes[0]['geometrias'] and raizes[0]['filhos']:
+        matriz = raizes[0]['matriz']
+        raizes = [dict(filho, matriz=matriz @ filho['matriz']) for filho in raizes[0]['filhos']]
+
+    vertices: List[np.ndarray] = []
+    faces: List[np.ndarray] = []
+    face_obj: List[np.ndarray] = []
+    face_mat: List[np.ndarray] = []
+    object_names: List[str] = []
+    object_index: Dict[str, int] = {}
+    material_names: List[str] = []
+    material_index: Dict[str, int] = {}
+    num_vertices = 0
+
+    def instanciar(no: Dict, matriz: np.ndarray, obj: int, profundidade: int = 0):
+        nonlocal num_vertices
+        if profundidade > 64:
+            return
+        for url in no['geometrias']:
+            if url not in geometrias:
+                continue
+            posicoes, tri, materiais = geometrias[url]
+            if not len(tri):
+                continue
+            vertices.append(posicoes @ matriz[:3, :3].T + matriz[:3, 3])
+            faces.append(tri + num_vertices)
+            num_vertices += len(posicoes)
+            face_obj.append(np.full(len(tri), obj, dtype=np.int64))
+            face_mat.append(np.array([_register_name(material_names, material_index, m) if m else -1
+                                      for m in materiais], dtype=np.int64))
+        for filho in no['filhos']:
+            instanciar(filho, matriz @ filho['matriz'], obj, profundidade + 1)
+        for url in no['instancias']:
+            if url in nos:
+                instanciar(nos[url], matriz @ nos[url]['matriz'], obj, profundidade + 1)
+
+    for raiz in raizes:
+        obj = _register_name(object_names, object_index, raiz['nome'])
+        instanciar(raiz, raiz['matriz'], obj)
+
+    if not faces:
+        return _empty_mesh(up_axis)
+
+    return MeshData(
+        np.concatenate(vertices),
+        np.concatenate(faces),
+        np.concatenate(face_obj),
+        object_names,
+        np.concatenate(face_mat),
+        material_names,
+        up_axis,
+        metros
+    )
+
+
+PARSERS = {
+    'obj': parse_obj,
+    'stl': parse_stl,
+    'ply': parse_ply,
+    'dae': parse_dae,
+}
+
+
+def parse_mesh(path: str, file_extension: str,
+               progress: Optional[Callable[[int], None]] = None) -> Optional[MeshData]:
+    """Lê a malha conforme o formato (None se o formato não tiver leitor)"""
+    parser = PARSERS.get(file_extension)
+    if parser is None:
+        return None
+    return parser(path, progress)
@@ -0,0 +1,103 @@
+"""
+Segmentação de Malhas em Peças
+"""
+
+import numpy as np
+
+from mesh_metrics import resolve_unit, triangle_areas
+from mesh_parser import MeshData
+
+# Peças menores que isso (ferragens, parafusos modelados) não viram componentes
+AREA_MINIMA_M2 = 0.01
+
+
+def weld_vertices(vertices: np.ndarray, faces: np.ndarray):
+    """Une vértices com coordenadas idênticas (STL não compartilha vértices)"""
+    if len(vertices) == 0:
+        return vertices, faces
+
+    bits = np.ascontiguousarray(vertices, dtype=np.float64).view(np.uint64).reshape(-1, 3)
+    chave = (bits[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+             ^ bits[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+             ^ bits[:, 2] * np.uint64(0x165667B19E3779F9))
+    _, primeiro, inverso = np.unique(chave, return_index=True, return_inverse=True)
+    unicos = vertices[primeiro]
+
+    if not np.array_equal(unicos[inverso], vertices):
+        # Colisão de hash: recorrer à comparação exata das linhas
+        unicos, inverso = np.unique(vertices, axis=0, return_inverse=True)
+
+    return unicos, inverso.reshape(-1)[faces]
+
+
+def ensure_welded(vertices: np.ndarray, faces: np.ndarray):
+    """Solda os vértices quando cada face tem vértices próprios (STL)"""
+    if len(vertices) >= faces.size:
+        return weld_vertices(vertices, faces)
+    return vertices, faces
+
+
+def connected_components(num_vertices: int, faces: np.ndarray) -> np.ndarray:
+    """Rótulo da peça de cada face, por union-find em arrays
+
+    Cada rodada liga as raízes das arestas (a maior aponta para a menor) e
+    comprime os caminhos por saltos de ponteiro; o número de rodadas é
+    logarítmico, sem laço Python por face.
+    """
+    pai = np.arange(num_vertices)
+    u = np.concatenate([faces[:, 0], faces[:, 1]])
+    v = np.concatenate([faces[:, 1], faces[:, 2]])
+
+    while True:
+        ru, rv = pai[u], pai[v]
+        diferentes = ru != rv
+        if not diferentes.any():
+            break
+        u, v = u[diferentes], v[diferentes]
+        ru, rv = ru[diferentes], rv[diferentes]
+        np.minimum.at(pai, np.maximum(ru, rv), np.minimum(ru, rv))
+
+        # Compressão total: todo vértice aponta direto para a raiz
+        while True:
+            avo = pai[pai]
+            if np.array_equal(avo, pai):
+                break
+            pai = avo
+
+    _, rotulos = np.unique(pai[faces[:, 0]], return_inverse=True)
+    return rotulos
+
+
+def segment_mesh(malha: MeshData, base: str = 'peca', escala: float = None) -> MeshData:
+    """Divide uma malha sem grupos em peças conectadas (uma por painel ou caixa)"""
+    if malha.num_faces == 0:
+        return malha
+
+    vertices, faces = ensure_welded(malha.vertices, malha.faces)
+    rotulos = connected_components(len(vertices), faces)
+
+    escala = resolve_unit(malha)[0] if escala is None else escala
+    areas, _ = triangle_areas(vertices * escala, faces)
+    area_peca = np.bincount(rotulos, weights=areas)
+
+    # Numerar as peças da maior para a menor, descartando as muito pequenas
+    ordem = np.argsort(-area_peca, kind='stable')
+    ordem = ordem[area_peca[ordem] >= AREA_MINIMA_M2]
+    if len(ordem) == 0:
+        return malha
+    novo_rotulo = np.full(len(area_peca), -1)
+    novo_rotulo[ordem] = np.arange(len(ordem))
+
+    face_object = novo_rotulo[rotulos]
+    manter = face_object >= 0
+
+    return MeshData(
+        vertices,
+        faces[manter],
+        face_object[manter],
+        [f"{base}_{i + 1}" for i in range(len(ordem))] if len(ordem) > 1 else [base],
+        malha.face_material[manter],
+        malha.material_names,
+        malha.up_axis,
+        malha.escala
+    )
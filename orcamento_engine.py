@@ -2,116 +2,344 @@
 Engine de Orçamento Profissional
 """
 
+import hashlib
+import json
+import threading
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+from catalogo_precos import CatalogoPrecos
+from componentes import (Acessorio, Componente, LinhaOrcamento, NUM_ACESSORIOS, compactar_orcamento,
+                         componentes_de, vetor_precos)
 from config import Config
+from plano_corte import OtimizadorCorte, extrair_pecas
+from relatorios import blocos_markdown
 
 class OrcamentoEngine:
-    def __init__(self):
+    # Percentual de mão de obra sobre o subtotal, por complexidade
+    PERCENTUAL_MAO_OBRA = {
+        'simples': 0.20,
+        'media': 0.35,
+        'complexa': 0.50,
+        'premium': 0.70
+    }
+    
+    # Corte e usinagem
+    CUSTO_CORTE_METRO = 2.50
+    CUSTO_FURO = 1.50
+    TAXA_MINIMA_CORTE = 15.00
+    ACESSORIOS_COM_FURO = (Acessorio.DOBRADICA, Acessorio.FECHADURA)
+    
+    # A partir deste número de componentes o cálculo é feito em colunas (NumPy)
+    LIMITE_COLUNAR = 200
+    
+    # Margens comparadas na matriz de cenários (mesma faixa do slider)
+    MARGENS_CENARIOS = list(range(10, 55, 5))
+    
+    # Gráficos: figuras guardadas por processo e tamanho máximo das séries
+    GRAFICOS_CACHE_ENTRADAS = 32
+    LIMITE_BARRAS = 30
+    LIMITE_PONTOS = 500
+    
+    def __init__(self, catalogo: Optional[CatalogoPrecos] = None):
         self.config = Config()
+        self.catalogo = catalogo or CatalogoPrecos(Config.CATALOGO_DB)
+        self._graficos: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._graficos_lock = threading.Lock()
     
-    def calcular_orcamento(self, analise: Dict, configuracoes: Dict) -> Dict:
-        """Calcula orçamento completo baseado na análise"""
+    def calcular_orcamento(self, analise: Dict, configuracoes: Dict, colunar: Optional[bool] = None,
+                           versao: Optional[int] = None) -> Dict:
+        """Calcula orçamento completo baseado na análise
+        
+        Com colunar=None o modo é escolhido pelo número de componentes; os
+        dois modos dão exatamente os mesmos valores. Os preços vêm da versão
+        do catálogo em configuracoes['versao_precos'] (ou `versao`, ou a
+        atual), que fica registrada no orçamento.
+        """
         if not analise or not analise.get('componentes'):
             return {}
         
         try:
+            versao = self.catalogo.resolver(configuracoes.get('versao_precos') or versao)
+            
             # Calcular custos por componente
-            componentes_detalhados = []
-            custo_total_material = 0
-            custo_total_acessorios = 0
-            custo_total_corte = 0
+            componentes = componentes_de(analise)
+            if colunar is None:
+                colunar = len(componentes) >= self.LIMITE_COLUNAR
             
-            for comp in analise['componentes']:
-                detalhes = self._calcular_componente(comp, configuracoes)
-                componentes_detalhados.append(detalhes)
-                
-                custo_total_material += detalhes['custo_material']
-                custo_total_acessorios += detalhes['custo_acessorios']
-                custo_total_corte += detalhes['custo_corte']
+            # Plano de corte: desperdício real no lugar do percentual fixo
+            plano_corte = None
+            desperdicio = None
+            if configuracoes.get('otimizar_corte'):
+                plano_corte = self.gerar_plano_corte(analise, configuracoes, versao)
+                if plano_corte['area_pecas_m2'] > 0:
+                    desperdicio = plano_corte['area_chapas_m2'] / plano_corte['area_pecas_m2'] - 1
             
-            # Calcular totais
-            subtotal = custo_total_material + custo_total_acessorios + custo_total_corte
+            if colunar:
+                componentes_detalhados, totais = self._calcular_componentes_colunar(
+                    componentes, configuracoes, desperdicio, versao
+                )
+            else:
+                componentes_detalhados = [
+                    self._calcular_componente(comp, configuracoes, desperdicio, versao)
+                    for comp in componentes
+                ]
+                totais = None
             
-            # Aplicar margem de lucro
-            margem = configuracoes.get('margem_lucro', 30) / 100
-            valor_margem = subtotal * margem
+            orcamento = {
+                'componentes': componentes_detalhados,
+                'resumo': self._calcular_resumo(analise, componentes_detalhados, configuracoes, totais),
+                'configuracoes': configuracoes,
+                'data_orcamento': datetime.now().isoformat(),
+                'versao_precos': versao,
+                'fonte_precos': self.catalogo.fonte_precos(versao)
+            }
+            if plano_corte is not None:
+                orcamento['plano_corte'] = plano_corte
             
-            # Calcular mão de obra (baseado na complexidade)
-            complexidade = configuracoes.get('complexidade', 'media')
-            percentual_mao_obra = {
-                'simples': 0.20,
-                'media': 0.35,
-                'complexa': 0.50,
-                'premium': 0.70
-            }.get(complexidade, 0.35)
+            return orcamento
             
-            custo_mao_obra = subtotal * percentual_mao_obra
+        except Exception as e:
+            st.error(f"Erro ao calcular orçamento: {e}")
+            return {}
+    
+    def recalcular_orcamento(self, orcamento: Dict, analise: Dict, novas_configuracoes: Dict) -> Dict:
+        """Reprecifica um orçamento existente quando só as configurações mudam
+        
+        Recalcula apenas o que depende das configurações alteradas: material e
+        acessórios refazem os custos dos componentes; margem e complexidade só
+        o resumo. Corte depende apenas da análise e é reaproveitado. O
+        resultado é idêntico ao de calcular_orcamento com as novas configurações.
+        
+        A versão de preços do orçamento é mantida, a menos que as novas
+        configurações tragam outra em 'versao_precos'.
+        """
+        versao = novas_configuracoes.get('versao_precos') or (orcamento or {}).get('versao_precos')
+        if not orcamento or not orcamento.get('componentes'):
+            return self.calcular_orcamento(analise, novas_configuracoes, versao=versao)
+        
+        anteriores = orcamento.get('configuracoes', {})
+        alteradas = {
+            chave for chave in set(anteriores) | set(novas_configuracoes)
+            if anteriores.get(chave) != novas_configuracoes.get(chave)
+        }
+        if not alteradas:
+            return orcamento
+        
+        # O plano de corte depende do material (veio): refazer o cálculo completo
+        if 'otimizar_corte' in alteradas or (
+                novas_configuracoes.get('otimizar_corte') and
+                alteradas & {'material', 'tempo_corte_s', 'processos_corte', 'versao_precos'}):
+            return self.calcular_orcamento(analise, novas_configuracoes, versao=versao)
+        
+        try:
+            versao = self.catalogo.resolver(versao)
+            orcamento = compactar_orcamento(orcamento)
+            componentes_detalhados = orcamento['componentes']
+            
+            # Outra tabela de preços muda material e acessórios
+            if orcamento.get('versao_precos') != versao:
+                alteradas |= {'material', 'acessorios'}
             
-            # Total final
-            total_final = subtotal + valor_margem + custo_mao_obra
+            if alteradas & {'material', 'acessorios'}:
+                material = novas_configuracoes.get('material', 'MDF 15mm')
+                tipo_acessorio = novas_configuracoes.get('acessorios', 'comum')
+                
+                componentes_detalhados = []
+                for comp, linha in zip(componentes_de(analise), orcamento['componentes']):
+                    campos = {}
+                    if 'material' in alteradas:
+                        campos['material'] = material
+                        campos['area_com_desperdicio'], campos['custo_material'] = \
+                            self._calcular_custo_material(comp, material, versao=versao)
+                    if 'acessorios' in alteradas:
+                        campos['custo_acessorios'], campos['precos'] = \
+                            self._calcular_custo_acessorios(comp, tipo_acessorio, versao)
+                    
+                    campos['custo_total'] = (campos.get('custo_material', linha.custo_material) +
+                                             campos.get('custo_acessorios', linha.custo_acessorios) +
+                                             linha.custo_corte)
+                    componentes_detalhados.append(linha.substituir(**campos))
             
             return {
+                **orcamento,
                 'componentes': componentes_detalhados,
-                'resumo': {
-                    'area_total_m2': analise['area_total_m2'],
-                    'total_componentes': len(componentes_detalhados),
-                    'custo_material': custo_total_material,
-                    'custo_acessorios': custo_total_acessorios,
-                    'custo_corte': custo_total_corte,
-                    'subtotal': subtotal,
-                    'custo_mao_obra': custo_mao_obra,
-                    'valor_margem': valor_margem,
-                    'total_final': total_final,
-                    'preco_por_m2': total_final / analise['area_total_m2'] if analise['area_total_m2'] > 0 else 0
-                },
-                'configuracoes': configuracoes,
+                'resumo': self._calcular_resumo(analise, componentes_detalhados, novas_configuracoes),
+                'configuracoes': novas_configuracoes,
                 'data_orcamento': datetime.now().isoformat(),
-                'fonte_precos': 'Léo Madeiras - Atualizado em 30/06/2025'
+                'versao_precos': versao,
+                'fonte_precos': self.catalogo.fonte_precos(versao)
             }
             
         except Exception as e:
-            st.error(f"Erro ao calcular orçamento: {e}")
+            st.error(f"Erro ao recalcular orçamento: {e}")
             return {}
     
-    def _calcular_componente(self, componente: Dict, configuracoes: Dict) -> Dict:
-        """Calcula custo de um componente específico"""
-        # Obter preços do material
-        material = configuracoes.get('material', 'MDF 15mm')
-        info_material = Config.PRECOS_MATERIAIS.get(material, Config.PRECOS_MATERIAIS['MDF 15mm'])
+    def calcular_cenarios(self, analise: Dict, materiais: Optional[List[str]] = None,
+                          acessorios: Optional[List[str]] = None, complexidades: Optional[List[str]] = None,
+                          margens: Optional[List[float]] = None, versao: Optional[int] = None) -> Dict:
+        """Preços de todos os cenários material × acessórios × complexidade × margem
         
-        # Calcular área com desperdício
-        area_base = componente['area_m2']
-        desperdicio = info_material['desperdicio']
-        area_com_desperdicio = area_base * (1 + desperdicio)
+        Os custos dos componentes são calculados uma vez em colunas e os
+        cenários saem por broadcasting, na mesma ordem de operações do
+        orçamento: cada célula é igual ao total_final de calcular_orcamento
+        com aquela configuração (desperdício padrão do material).
+        """
+        if not analise or not analise.get('componentes'):
+            return {}
         
-        # Custo do material
-        custo_material = area_com_desperdicio * info_material['preco_m2']
+        versao = self.catalogo.resolver(versao)
+        materiais = list(materiais or self.catalogo.nomes_materiais(versao))
+        acessorios = list(acessorios or self.catalogo.linhas_acessorios(versao))
+        complexidades = list(complexidades or self.PERCENTUAL_MAO_OBRA)
+        margens = list(margens or self.MARGENS_CENARIOS)
         
-        # Calcular acessórios
-        tipo_acessorio = configuracoes.get('acessorios', 'comum')
-        precos_acessorios = Config.PRECOS_ACESSORIOS.get(tipo_acessorio, Config.PRECOS_ACESSORIOS['comum'])
+        colunas = self._colunas_componentes(componentes_de(analise))
         
-        custo_acessorios = 0
-        acessorios_detalhados = {}
+        # Material: (materiais, componentes)
+        infos = [self._info_material(m, versao) for m in materiais]
+        desperdicio = np.array([info['desperdicio'] for info in infos])[:, None]
+        preco_m2 = np.array([info['preco_m2'] for info in infos])[:, None]
+        custo_material = colunas['area'] * (1 + desperdicio) * preco_m2
+        
+        # Acessórios: (tabelas de preço, componentes)
+        precos = np.array([vetor_precos(self._precos_acessorios(a, versao)) for a in acessorios], dtype=np.float64)
+        custo_acessorios = self._somar_acessorios(colunas['contagens'], precos)
         
-        for acessorio in componente.get('acessorios', []):
-            preco_unitario = precos_acessorios.get(acessorio, 0)
-            custo_acessorios += preco_unitario
+        # Totais por soma acumulada sequencial (mesma ordem do laço por componente)
+        total_material = np.cumsum(custo_material, axis=1)[:, -1]
+        total_acessorios = np.cumsum(custo_acessorios, axis=1)[:, -1]
+        total_corte = float(np.cumsum(colunas['custo_corte'])[-1])
+        
+        # Eixos: (material, acessórios, complexidade, margem)
+        subtotal = (total_material[:, None] + total_acessorios[None, :] + total_corte)[:, :, None, None]
+        margem = (np.array(margens, dtype=np.float64) / 100)[None, None, None, :]
+        percentual = np.array([self.PERCENTUAL_MAO_OBRA.get(c, 0.35) for c in complexidades])[None, None, :, None]
+        
+        valor_margem = subtotal * margem
+        custo_mao_obra = subtotal * percentual
+        total_final = subtotal + valor_margem + custo_mao_obra
+        
+        area_total = analise['area_total_m2']
+        preco_por_m2 = total_final / area_total if area_total > 0 else np.zeros_like(total_final)
+        
+        return {
+            'materiais': materiais,
+            'acessorios': acessorios,
+            'complexidades': complexidades,
+            'margens': margens,
+            'custo_material': total_material.tolist(),
+            'custo_acessorios': total_acessorios.tolist(),
+            'custo_corte': total_corte,
+            'subtotal': subtotal[:, :, 0, 0].tolist(),
+            'total_final': total_final.tolist(),
+            'preco_por_m2': preco_por_m2.tolist()
+        }
+    
+    def tabela_cenarios(self, cenarios: Dict, margem: Optional[float] = None) -> List[Dict]:
+        """Linhas da matriz de cenários para exibição (opcionalmente uma margem só)"""
+        linhas = []
+        for i, material in enumerate(cenarios.get('materiais', [])):
+            for j, acessorio in enumerate(cenarios['acessorios']):
+                for k, complexidade in enumerate(cenarios['complexidades']):
+                    for g, valor_margem in enumerate(cenarios['margens']):
+                        if margem is not None and valor_margem != margem:
+                            continue
+                        linhas.append({
+                            'material': material,
+                            'acessorios': acessorio,
+                            'complexidade': complexidade,
+                            'margem_lucro': valor_margem,
+                            'total_final': cenarios['total_final'][i][j][k][g],
+                            'preco_por_m2': cenarios['preco_por_m2'][i][j][k][g]
+                        })
+        return linhas
+    
+    def gerar_plano_corte(self, analise: Dict, configuracoes: Dict, versao: Optional[int] = None) -> Dict:
+        """Plano de corte das peças da análise na chapa padrão
+        
+        configuracoes['tempo_corte_s'] > 0 ativa a busca por um plano melhor
+        dentro desse prazo, em paralelo quando configuracoes['processos_corte'] > 1.
+        """
+        material = configuracoes.get('material', 'MDF 15mm')
+        info_material = self._info_material(material, versao)
+        chapa = Config.CHAPA_PADRAO
+        
+        otimizador = OtimizadorCorte(chapa['comprimento_mm'], chapa['largura_mm'],
+                                     chapa['kerf_mm'], chapa['refilo_mm'])
+        pecas = extrair_pecas(analise)
+        veio = info_material.get('veio', False)
+        tempo_limite_s = configuracoes.get('tempo_corte_s', 0)
+        
+        processos = configuracoes.get('processos_corte', 1)
+        if processos > 1 and tempo_limite_s > 0:
+            return otimizador.otimizar_paralelo(pecas, veio, tempo_limite_s, processos)
+        return otimizador.otimizar(pecas, veio, tempo_limite_s)
+    
+    def _calcular_resumo(self, analise: Dict, componentes_detalhados: List[LinhaOrcamento], configuracoes: Dict,
+                         totais: Optional[Tuple[float, float, float]] = None) -> Dict:
+        """Totais, mão de obra e margem a partir dos custos dos componentes"""
+        if totais is not None:
+            custo_total_material, custo_total_acessorios, custo_total_corte = totais
+        else:
+            custo_total_material = 0
+            custo_total_acessorios = 0
+            custo_total_corte = 0
             
-            if acessorio in acessorios_detalhados:
-                acessorios_detalhados[acessorio]['quantidade'] += 1
-                acessorios_detalhados[acessorio]['custo_total'] += preco_unitario
-            else:
-                acessorios_detalhados[acessorio] = {
-                    'quantidade': 1,
-                    'preco_unitario': preco_unitario,
-                    'custo_total': preco_unitario
-                }
+            for linha in componentes_detalhados:
+                custo_total_material += linha.custo_material
+                custo_total_acessorios += linha.custo_acessorios
+                custo_total_corte += linha.custo_corte
+        
+        # Calcular totais
+        subtotal = custo_total_material + custo_total_acessorios + custo_total_corte
+        
+        # Aplicar margem de lucro
+        margem = configuracoes.get('margem_lucro', 30) / 100
+        valor_margem = subtotal * margem
+        
+        # Calcular mão de obra (baseado na complexidade)
+        complexidade = configuracoes.get('complexidade', 'media')
+        percentual_mao_obra = self.PERCENTUAL_MAO_OBRA.get(complexidade, 0.35)
+        
+        custo_mao_obra = subtotal * percentual_mao_obra
+        
+        # Total final
+        total_final = subtotal + valor_margem + custo_mao_obra
+        
+        return {
+            'area_total_m2': analise['area_total_m2'],
+            'total_componentes': len(componentes_detalhados),
+            'custo_material': custo_total_material,
+            'custo_acessorios': custo_total_acessorios,
+            'custo_corte': custo_total_corte,
+            'subtotal': subtotal,
+            'custo_mao_obra': custo_mao_obra,
+            'valor_margem': valor_margem,
+            'total_final': total_final,
+            'preco_por_m2': total_final / analise['area_total_m2'] if analise['area_total_m2'] > 0 else 0
+        }
+    
+    def _info_material(self, material: str, versao: Optional[int] = None) -> Dict:
+        """Preço e desperdício do material na versão do catálogo (MDF 15mm se ausente)"""
+        return self.catalogo.material(material, versao) or self.catalogo.material('MDF 15mm', versao)
+    
+    def _precos_acessorios(self, tipo_acessorio: str, versao: Optional[int] = None) -> Dict[str, float]:
+        """Tabela de preços da linha de acessórios (comum se ausente)"""
+        return self.catalogo.precos_acessorios(tipo_acessorio, versao) or self.catalogo.precos_acessorios('comum', versao)
+    
+    def _calcular_componente(self, componente: Componente, configuracoes: Dict,
+                             desperdicio: Optional[float] = None, versao: Optional[int] = None) -> LinhaOrcamento:
+        """Calcula custo de um componente específico"""
+        # Custo do material (com desperdício)
+        material = configuracoes.get('material', 'MDF 15mm')
+        area_com_desperdicio, custo_material = self._calcular_custo_material(componente, material, desperdicio, versao)
+        
+        # Calcular acessórios
+        tipo_acessorio = configuracoes.get('acessorios', 'comum')
+        custo_acessorios, precos = self._calcular_custo_acessorios(componente, tipo_acessorio, versao)
         
         # Calcular custo de corte
         custo_corte = self._calcular_custo_corte(componente)
@@ -119,50 +347,191 @@ class OrcamentoEngine:
         # Total do componente
         custo_total = custo_material + custo_acessorios + custo_corte
         
-        return {
-            'id': componente['id'],
-            'nome': componente['nome'],
-            'tipo': componente['tipo'],
-            'area_m2': area_base,
-            'area_com_desperdicio': area_com_desperdicio,
-            'material': material,
-            'custo_material': custo_material,
-            'custo_acessorios': custo_acessorios,
-            'custo_corte': custo_corte,
-            'custo_total': custo_total,
-            'acessorios_detalhados': acessorios_detalhados,
-            'preco_por_m2': custo_total / area_base if area_base > 0 else 0
-        }
+        return LinhaOrcamento(
+            componente.id, componente.nome, componente.tipo, componente.area_m2, material,
+            area_com_desperdicio, custo_material, custo_acessorios, custo_corte, custo_total,
+            componente.acessorios, precos
+        )
+    
+    def _calcular_custo_material(self, componente: Componente, material: str, desperdicio: Optional[float] = None,
+                                 versao: Optional[int] = None) -> Tuple[float, float]:
+        """Área com desperdício e custo do material de um componente
+        
+        Sem desperdício informado (plano de corte), usa o percentual do material.
+        """
+        info_material = self._info_material(material, versao)
+        if desperdicio is None:
+            desperdicio = info_material['desperdicio']
+        
+        # Calcular área com desperdício
+        area_com_desperdicio = componente.area_m2 * (1 + desperdicio)
+        
+        return area_com_desperdicio, area_com_desperdicio * info_material['preco_m2']
+    
+    def _calcular_custo_acessorios(self, componente: Componente, tipo_acessorio: str,
+                                   versao: Optional[int] = None) -> Tuple[float, Tuple[float, ...]]:
+        """Custo dos acessórios de um componente e o vetor de preços unitários usado
+        
+        Um único acumulador, item a item na ordem de Acessorio: a mesma
+        sequência de somas da lista de nomes original (0 inteiro sem acessórios).
+        """
+        precos = vetor_precos(self._precos_acessorios(tipo_acessorio, versao))
+        
+        custo_acessorios = 0
+        for quantidade, preco in zip(componente.acessorios, precos):
+            for _ in range(quantidade):
+                custo_acessorios += preco
+        
+        return custo_acessorios, precos
     
-    def _calcular_custo_corte(self, componente: Dict) -> float:
+    def _calcular_custo_corte(self, componente: Componente) -> float:
         """Calcula custo de corte baseado no componente"""
         # Estimar metros lineares de corte baseado nas dimensões
-        largura_m = componente['largura_cm'] / 100
-        altura_m = componente['altura_cm'] / 100
-        profundidade_m = componente['profundidade_cm'] / 100
+        largura_m = componente.largura_cm / 100
+        altura_m = componente.altura_cm / 100
+        profundidade_m = componente.profundidade_cm / 100
         
         # Perímetro aproximado para cortes
         perimetro = 2 * (largura_m + profundidade_m) + 2 * (altura_m + profundidade_m)
         
-        # Custo por metro linear de corte
-        custo_por_metro = 2.50
-        
         # Furos para acessórios
-        num_furos = len([a for a in componente.get('acessorios', []) if a in ['dobradica', 'fechadura']])
-        custo_furos = num_furos * 1.50
-        
-        # Taxa mínima por peça
-        taxa_minima = 15.00
+        num_furos = sum(componente.acessorios[a] for a in self.ACESSORIOS_COM_FURO)
+        custo_furos = num_furos * self.CUSTO_FURO
         
-        custo_total = max(perimetro * custo_por_metro + custo_furos, taxa_minima)
+        # Custo por metro linear de corte, com taxa mínima por peça
+        custo_total = max(perimetro * self.CUSTO_CORTE_METRO + custo_furos, self.TAXA_MINIMA_CORTE)
         
         return custo_total
     
+    def _colunas_componentes(self, componentes: List[Componente]) -> Dict:
+        """Componentes em colunas: medidas, contagens de acessórios e custo de corte
+        
+        Nada aqui depende das configurações; os custos de material e acessórios
+        são aplicados sobre estas colunas.
+        """
+        n = len(componentes)
+        
+        # Colunas de medidas
+        medidas = np.array([
+            (c.area_m2, c.largura_cm, c.altura_cm, c.profundidade_cm)
+            for c in componentes
+        ], dtype=np.float64).reshape(n, 4)
+        area, largura, altura, profundidade = medidas.T
+        
+        # Acessórios: (componente, Acessorio)
+        contagens = np.array([c.acessorios for c in componentes], dtype=np.int64).reshape(n, NUM_ACESSORIOS)
+        
+        # Corte e furos
+        num_furos = contagens[:, list(self.ACESSORIOS_COM_FURO)].sum(axis=1)
+        perimetro = 2 * (largura / 100 + profundidade / 100) + 2 * (altura / 100 + profundidade / 100)
+        custo_corte = np.maximum(perimetro * self.CUSTO_CORTE_METRO + num_furos * self.CUSTO_FURO,
+                                 self.TAXA_MINIMA_CORTE)
+        
+        return {
+            'area': area,
+            'contagens': contagens,
+            'custo_corte': custo_corte
+        }
+    
+    def _somar_acessorios(self, contagens: np.ndarray, precos: np.ndarray) -> np.ndarray:
+        """Custo de acessórios por componente, na mesma ordem de _calcular_custo_acessorios
+        
+        `precos` tem o preço unitário por Acessorio na última dimensão e pode
+        ter dimensões extras à esquerda (uma linha por tabela de preços); o
+        resultado tem essas dimensões mais a dos componentes.
+        """
+        custo = np.zeros(precos.shape[:-1] + (len(contagens),))
+        for k in range(NUM_ACESSORIOS):
+            # Uma unidade por vez no mesmo acumulador, só onde ainda há unidades
+            preco = precos[..., k, None]
+            for q in range(int(contagens[:, k].max(initial=0))):
+                custo = np.where(contagens[:, k] > q, custo + preco, custo)
+        return custo
+    
+    def _calcular_componentes_colunar(self, componentes: List[Componente], configuracoes: Dict,
+                                      desperdicio: Optional[float] = None,
+                                      versao: Optional[int] = None) -> Tuple[List[LinhaOrcamento], Tuple[float, float, float]]:
+        """Mesmo cálculo de _calcular_componente, com os componentes em colunas
+        
+        Retorna os componentes detalhados e os totais de material, acessórios e
+        corte. As somas seguem a ordem do cálculo por componente (acessórios na
+        ordem de Acessorio, quantidades somadas uma a uma, totais acumulados
+        sequencialmente), então os valores são iguais bit a bit aos do caminho
+        componente a componente.
+        """
+        material = configuracoes.get('material', 'MDF 15mm')
+        info_material = self._info_material(material, versao)
+        tipo_acessorio = configuracoes.get('acessorios', 'comum')
+        precos = vetor_precos(self._precos_acessorios(tipo_acessorio, versao))
+        
+        colunas = self._colunas_componentes(componentes)
+        area = colunas['area']
+        
+        # Material
+        if desperdicio is None:
+            desperdicio = info_material['desperdicio']
+        area_com_desperdicio = area * (1 + desperdicio)
+        custo_material = area_com_desperdicio * info_material['preco_m2']
+        
+        custo_acessorios = self._somar_acessorios(colunas['contagens'], np.array(precos, dtype=np.float64))
+        custo_corte = colunas['custo_corte']
+        
+        custo_total = custo_material + custo_acessorios + custo_corte
+        
+        # Soma acumulada é sequencial: mesmos totais do laço em _calcular_resumo
+        totais = tuple(np.cumsum(np.stack([custo_material, custo_acessorios, custo_corte]),
+                                 axis=1)[:, -1].tolist())
+        
+        componentes_detalhados = [
+            LinhaOrcamento(comp.id, comp.nome, comp.tipo, comp.area_m2, material,
+                           acd, cm, ca, cc, ct, comp.acessorios, precos)
+            for comp, acd, cm, ca, cc, ct in zip(
+                componentes, area_com_desperdicio.tolist(), custo_material.tolist(),
+                custo_acessorios.tolist(), custo_corte.tolist(), custo_total.tolist()
+            )
+        ]
+        
+        return componentes_detalhados, totais
+    
     def gerar_graficos(self, orcamento: Dict) -> Dict:
-        """Gera gráficos para visualização"""
+        """Gera gráficos para visualização
+        
+        As figuras ficam num cache LRU pela impressão digital do orçamento,
+        então um rerun do Streamlit com o mesmo orçamento não as refaz.
+        """
         if not orcamento or not orcamento.get('resumo'):
             return {}
         
+        chave = self._impressao_graficos(orcamento)
+        with self._graficos_lock:
+            if chave in self._graficos:
+                self._graficos.move_to_end(chave)
+                return self._graficos[chave]
+        
+        graficos = self._montar_graficos(orcamento)
+        with self._graficos_lock:
+            self._graficos[chave] = graficos
+            while len(self._graficos) > self.GRAFICOS_CACHE_ENTRADAS:
+                self._graficos.popitem(last=False)
+        return graficos
+    
+    def _impressao_graficos(self, orcamento: Dict) -> str:
+        """Hash estável do resumo e dos custos dos componentes (o que os gráficos mostram)"""
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(json.dumps(orcamento['resumo'], sort_keys=True, default=str).encode('utf-8'))
+        
+        componentes = orcamento.get('componentes', [])
+        hasher.update('\0'.join(comp.nome for comp in componentes).encode('utf-8'))
+        hasher.update(np.array(
+            [(comp.custo_total, comp.area_m2, comp.preco_por_m2) for comp in componentes],
+            dtype=np.float64
+        ).tobytes())
+        return hasher.hexdigest()
+    
+    def _montar_graficos(self, orcamento: Dict) -> Dict:
+        # Plotly só é importado quando os gráficos são pedidos (fora do caminho de login)
+        import plotly.express as px
+        
         resumo = orcamento['resumo']
         
         # Gráfico de pizza - Distribuição de custos
@@ -182,44 +551,63 @@ class OrcamentoEngine:
             color_discrete_sequence=px.colors.qualitative.Set3
         )
         
-        # Gráfico de barras - Custo por componente
         componentes = orcamento.get('componentes', [])
-        if componentes:
-            nomes = [comp['nome'] for comp in componentes]
-            custos = [comp['custo_total'] for comp in componentes]
-            
-            fig_barras = px.bar(
-                x=nomes,
-                y=custos,
-                title="Custo por Componente",
-                labels={'x': 'Componentes', 'y': 'Custo (R$)'},
-                color=custos,
-                color_continuous_scale='viridis'
-            )
-            fig_barras.update_layout(
-    xaxis={'tickangle': 45},
-    xaxis_title="Componentes",
-    yaxis_title="Custo (R$)"
+        if not componentes:
+            return {'pizza': fig_pizza, 'barras': None, 'area': None}
+        
+        nomes = [comp.nome for comp in componentes]
+        custos = np.array([comp.custo_total for comp in componentes], dtype=np.float64)
+        # Do mais caro para o mais barato; empates mantêm a ordem do projeto
+        ordem = np.argsort(-custos, kind='stable')
+        
+        # Gráfico de barras - Custo por componente (os N maiores + "Outros")
+        titulo_barras = "Custo por Componente"
+        if len(componentes) > self.LIMITE_BARRAS:
+            topo, resto = ordem[:self.LIMITE_BARRAS - 1], ordem[self.LIMITE_BARRAS - 1:]
+            nomes_barras = [nomes[i] for i in topo] + [f"Outros ({len(resto)} componentes)"]
+            custos_barras = custos[topo].tolist() + [float(custos[resto].sum())]
+            titulo_barras += f" ({self.LIMITE_BARRAS - 1} maiores de {len(componentes)})"
         else:
-            fig_barras = None
+            nomes_barras, custos_barras = nomes, custos.tolist()
         
-        # Gráfico de área - Custo por m²
-        if componentes:
-            areas = [comp['area_m2'] for comp in componentes]
-            precos_m2 = [comp['preco_por_m2'] for comp in componentes]
-            
-            fig_area = px.scatter(
-                x=areas,
-                y=precos_m2,
-                size=[comp['custo_total'] for comp in componentes],
-                hover_name=nomes,
-                title="Custo por m² vs Área",
-                labels={'x': 'Área (m²)', 'y': 'Preço por m² (R$)'},
-                color=custos,
-                color_continuous_scale='plasma'
-            )
+        fig_barras = px.bar(
+            x=nomes_barras,
+            y=custos_barras,
+            title=titulo_barras,
+            labels={'x': 'Componentes', 'y': 'Custo (R$)'},
+            color=custos_barras,
+            color_continuous_scale='viridis'
+        )
+        fig_barras.update_layout(
+            xaxis={'tickangle': 45},
+            xaxis_title="Componentes",
+            yaxis_title="Custo (R$)"
+        )
+        
+        # Gráfico de área - Custo por m² (amostra: os mais caros + o resto espaçado por área)
+        areas = np.array([comp.area_m2 for comp in componentes], dtype=np.float64)
+        precos_m2 = np.array([comp.preco_por_m2 for comp in componentes], dtype=np.float64)
+        titulo_area = "Custo por m² vs Área"
+        if len(componentes) > self.LIMITE_PONTOS:
+            metade = self.LIMITE_PONTOS // 2
+            resto = ordem[metade:]
+            resto = resto[np.argsort(areas[resto], kind='stable')]
+            amostra = resto[np.linspace(0, len(resto) - 1, self.LIMITE_PONTOS - metade).astype(int)]
+            pontos = np.concatenate([ordem[:metade], amostra])
+            titulo_area += f" (amostra de {len(pontos)} de {len(componentes)})"
         else:
-            fig_area = None
+            pontos = np.arange(len(componentes))
+        
+        fig_area = px.scatter(
+            x=areas[pontos].tolist(),
+            y=precos_m2[pontos].tolist(),
+            size=custos[pontos].tolist(),
+            hover_name=[nomes[i] for i in pontos],
+            title=titulo_area,
+            labels={'x': 'Área (m²)', 'y': 'Preço por m² (R$)'},
+            color=custos[pontos].tolist(),
+            color_continuous_scale='plasma'
+        )
         
         return {
             'pizza': fig_pizza,
@@ -227,97 +615,12 @@ class OrcamentoEngine:
             'area': fig_area
         }
     
-    def gerar_relatorio_detalhado(self, orcamento: Dict, cliente: str, ambiente: str) -> str:
-        """Gera relatório detalhado em texto"""
-        if not orcamento:
-            return ""
-        
-        resumo = orcamento['resumo']
-        data_atual = datetime.now().strftime("%d/%m/%Y %H:%M")
-        
-        relatorio = f"""
-# 📋 ORÇAMENTO DETALHADO - ORÇA INTERIORES
-
-**Data:** {data_atual}
-**Cliente:** {cliente}
-**Ambiente:** {ambiente}
-
----
-
-## 📊 RESUMO EXECUTIVO
-
-• **Área Total:** {resumo['area_total_m2']:.2f} m²
-• **Total de Componentes:** {resumo['total_componentes']}
-• **Valor Total:** R$ {resumo['total_final']:,.2f}
-• **Preço por m²:** R$ {resumo['preco_por_m2']:,.2f}
-
----
-
-## 💰 BREAKDOWN DE CUSTOS
-
-| Item | Valor | Percentual |
-|------|-------|------------|
-| Material | R$ {resumo['custo_material']:,.2f} | {(resumo['custo_material']/resumo['total_final']*100):.1f}% |
-| Acessórios | R$ {resumo['custo_acessorios']:,.2f} | {(resumo['custo_acessorios']/resumo['total_final']*100):.1f}% |
-| Corte/Usinagem | R$ {resumo['custo_corte']:,.2f} | {(resumo['custo_corte']/resumo['total_final']*100):.1f}% |
-| Mão de Obra | R$ {resumo['custo_mao_obra']:,.2f} | {(resumo['custo_mao_obra']/resumo['total_final']*100):.1f}% |
-| Margem | R$ {resumo['valor_margem']:,.2f} | {(resumo['valor_margem']/resumo['total_final']*100):.1f}% |
-
-**TOTAL:** R$ {resumo['total_final']:,.2f}
-
----
-
-## 🧩 DETALHAMENTO POR COMPONENTE
-
-"""
-        
-        for comp in orcamento.get('componentes', []):
-            relatorio += f"""
-### {comp['nome']}
-
-• **Tipo:** {comp['tipo'].replace('_', ' ').title()}
-• **Área:** {comp['area_m2']:.2f} m²
-• **Material:** {comp['material']}
-• **Custo Total:** R$ {comp['custo_total']:,.2f}
-
-**Breakdown:**
-- Material: R$ {comp['custo_material']:,.2f}
-- Acessórios: R$ {comp['custo_acessorios']:,.2f}
-- Corte: R$ {comp['custo_corte']:,.2f}
-
-"""
-            
-            if comp['acessorios_detalhados']:
-                relatorio += "**Acessórios:**\n"
-                for acessorio, info in comp['acessorios_detalhados'].items():
-                    relatorio += f"- {info['quantidade']}x {acessorio.replace('_', ' ').title()} @ R$ {info['preco_unitario']:.2f} = R$ {info['custo_total']:.2f}\n"
-            
-            relatorio += "\n---\n"
-        
-        relatorio += f"""
-
-## ⚙️ CONFIGURAÇÕES UTILIZADAS
-
-• **Material Principal:** {orcamento['configuracoes'].get('material', 'MDF 15mm')}
-• **Tipo de Acessórios:** {orcamento['configuracoes'].get('acessorios', 'Comum').title()}
-• **Complexidade:** {orcamento['configuracoes'].get('complexidade', 'Média').title()}
-• **Margem de Lucro:** {orcamento['configuracoes'].get('margem_lucro', 30)}%
-
----
-
-## 📝 OBSERVAÇÕES
-
-• Preços baseados na tabela da Léo Madeiras (atualizada em 30/06/2025)
-• Valores incluem desperdício de material conforme padrão da indústria
-• Mão de obra calculada baseada na complexidade do projeto
-• Orçamento válido por 30 dias
-• Não inclui entrega e instalação
-
----
-
-**Orçamento gerado pelo sistema Orça Interiores SaaS**
-*Sistema Profissional de Orçamento de Marcenaria*
-"""
+    def gerar_relatorio_detalhado(self, orcamento: Dict, cliente: str, ambiente: str,
+                                  limite_componentes: Optional[int] = None) -> str:
+        """Gera relatório detalhado em texto (Markdown)
         
-        return relatorio
+        Para arquivos grandes use relatorios.arquivo_relatorio, que grava os
+        blocos direto no arquivo sem montar o texto inteiro.
+        """
+        return ''.join(blocos_markdown(orcamento, cliente, ambiente, limite_componentes))
 
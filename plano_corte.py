@@ -0,0 +1,504 @@
+"""
+Plano de Corte - Otimização do Aproveitamento de Chapas
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from componentes import componentes_de
+
+# Componentes com uma dimensão até esta espessura (cm) são uma chapa única
+ESPESSURA_PAINEL_CM = 6.0
+
+HEURISTICAS = ('guilhotina', 'maxrects')
+
+# Combinações (ordem, heurística) das passadas gulosas; a primeira é a mais barata
+GULOSAS = tuple((criterio, heuristica) for criterio in ('area', 'lado') for heuristica in HEURISTICAS)
+
+# Tempo para os processos devolverem o plano depois do prazo da busca
+TOLERANCIA_PRAZO_S = 0.25
+
+# A cada quantas peças os retângulos livres inúteis são descartados
+INTERVALO_PODA = 32
+
+
+def extrair_pecas(analise: Dict) -> List[Dict]:
+    """Lista de peças a cortar a partir da análise (ver iter_pecas)"""
+    return list(iter_pecas(analise))
+
+
+def iter_pecas(analise: Dict) -> Iterator[Dict]:
+    """Peças a cortar a partir da análise, uma a uma
+
+    Usa as chapas detectadas na malha; componentes sem chapas detectadas são
+    decompostos em caixa (2 laterais, base e tampo, fundo e frente).
+    """
+    com_chapas = set()
+    for chapa in analise.get('chapas', []):
+        com_chapas.add(chapa['componente_id'])
+        yield {
+            'id': chapa['id'],
+            'componente_id': chapa['componente_id'],
+            'comprimento_mm': chapa['comprimento_mm'],
+            'largura_mm': chapa['largura_mm']
+        }
+
+    for comp in componentes_de(analise):
+        if comp.id in com_chapas:
+            continue
+
+        largura = comp.largura_cm * 10
+        altura = comp.altura_cm * 10
+        profundidade = comp.profundidade_cm * 10
+        medidas = sorted((largura, altura, profundidade), reverse=True)
+
+        if medidas[2] <= ESPESSURA_PAINEL_CM * 10:
+            faces = [('painel', medidas[0], medidas[1])]
+        else:
+            faces = [
+                ('lateral_1', altura, profundidade), ('lateral_2', altura, profundidade),
+                ('base', largura, profundidade), ('tampo', largura, profundidade),
+                ('fundo', largura, altura), ('frente', largura, altura)
+            ]
+
+        for nome, a, b in faces:
+            if min(a, b) <= 0:
+                continue
+            yield {
+                'id': f"{comp.id}_{nome}",
+                'componente_id': comp.id,
+                'comprimento_mm': round(max(a, b), 1),
+                'largura_mm': round(min(a, b), 1)
+            }
+
+
+def _pontuar(fw: np.ndarray, fh: np.ndarray, pw: float, ph: float) -> np.ndarray:
+    """Best Short Side Fit: menor sobra no lado mais justo (inf se não couber)"""
+    sobra_w, sobra_h = fw - pw, fh - ph
+    cabe = (sobra_w >= 0) & (sobra_h >= 0)
+    curta = np.minimum(sobra_w, sobra_h)
+    longa = np.maximum(sobra_w, sobra_h)
+    # Desempate pela sobra maior, sem misturar as escalas
+    return np.where(cabe, curta * 1e6 + longa, np.inf)
+
+
+class _Livres:
+    """Retângulos livres de todas as chapas em arrays (x, y, w, h, chapa)"""
+
+    def __init__(self, capacidade: int):
+        self.dados = np.zeros((max(capacidade, 16), 5))
+        self.n = 0
+
+    def adicionar(self, linhas: np.ndarray):
+        linhas = np.atleast_2d(linhas)
+        if self.n + len(linhas) > len(self.dados):
+            novo = np.zeros((max(2 * len(self.dados), self.n + len(linhas)), 5))
+            novo[:self.n] = self.dados[:self.n]
+            self.dados = novo
+        self.dados[self.n:self.n + len(linhas)] = linhas
+        self.n += len(linhas)
+
+    def remover(self, indices: np.ndarray):
+        manter = np.ones(self.n, dtype=bool)
+        manter[indices] = False
+        restantes = self.dados[:self.n][manter]
+        self.n = len(restantes)
+        self.dados[:self.n] = restantes
+
+    def view(self) -> np.ndarray:
+        return self.dados[:self.n]
+
+
+def _melhor_posicao(livres: _Livres, pw: float, ph: float, girar: bool):
+    """Retângulo livre e orientação de menor sobra, ou None"""
+    f = livres.view()
+    if len(f) == 0:
+        return None
+
+    pontos = _pontuar(f[:, 2], f[:, 3], pw, ph)
+    melhor = int(np.argmin(pontos))
+    melhor_ponto, girada = pontos[melhor], False
+
+    if girar and pw != ph:
+        pontos_g = _pontuar(f[:, 2], f[:, 3], ph, pw)
+        melhor_g = int(np.argmin(pontos_g))
+        if pontos_g[melhor_g] < melhor_ponto:
+            melhor, melhor_ponto, girada = melhor_g, pontos_g[melhor_g], True
+
+    if not np.isfinite(melhor_ponto):
+        return None
+    return melhor, girada
+
+
+def _dividir_guilhotina(livres: _Livres, indice: int, pw: float, ph: float):
+    """Corte guilhotina do retângulo usado, pelo eixo da menor sobra"""
+    x, y, w, h, chapa = livres.view()[indice]
+    if w - pw < h - ph:
+        direita = (x + pw, y, w - pw, ph, chapa)
+        acima = (x, y + ph, w, h - ph, chapa)
+    else:
+        direita = (x + pw, y, w - pw, h, chapa)
+        acima = (x, y + ph, pw, h - ph, chapa)
+
+    livres.remover(np.array([indice]))
+    novos = [r for r in (direita, acima) if r[2] > 0 and r[3] > 0]
+    if novos:
+        livres.adicionar(np.array(novos))
+
+
+def _dividir_maxrects(livres: _Livres, indice: int, pw: float, ph: float):
+    """MaxRects: recorta todos os livres da chapa que cruzam a peça e poda os contidos"""
+    f = livres.view()
+    x, y, _, _, chapa = f[indice]
+    px2, py2 = x + pw, y + ph
+
+    cruza = ((f[:, 4] == chapa) & (f[:, 0] < px2) & (f[:, 0] + f[:, 2] > x)
+             & (f[:, 1] < py2) & (f[:, 1] + f[:, 3] > y))
+    c = f[cruza]
+    cx2, cy2 = c[:, 0] + c[:, 2], c[:, 1] + c[:, 3]
+
+    partes = np.concatenate([
+        np.column_stack([c[:, 0], c[:, 1], x - c[:, 0], c[:, 3], c[:, 4]]),          # esquerda
+        np.column_stack([np.full(len(c), px2), c[:, 1], cx2 - px2, c[:, 3], c[:, 4]]),  # direita
+        np.column_stack([c[:, 0], c[:, 1], c[:, 2], y - c[:, 1], c[:, 4]]),          # abaixo
+        np.column_stack([c[:, 0], np.full(len(c), py2), c[:, 2], cy2 - py2, c[:, 4]])   # acima
+    ])
+    partes = partes[(partes[:, 2] > 0) & (partes[:, 3] > 0)]
+    livres.remover(np.flatnonzero(cruza))
+
+    # Podar retângulos contidos em outro da mesma chapa
+    mesma = np.flatnonzero(livres.view()[:, 4] == chapa)
+    todos = np.concatenate([livres.view()[mesma], partes])
+    x1, y1 = todos[:, 0], todos[:, 1]
+    x2, y2 = x1 + todos[:, 2], y1 + todos[:, 3]
+    contido = ((x1[:, None] >= x1[None, :]) & (y1[:, None] >= y1[None, :])
+               & (x2[:, None] <= x2[None, :]) & (y2[:, None] <= y2[None, :]))
+    np.fill_diagonal(contido, False)
+    # Entre retângulos idênticos, manter o de menor índice
+    indices = np.arange(len(todos))
+    contido &= ~(contido.T & (indices[None, :] > indices[:, None]))
+    descartar = contido.any(axis=1)
+
+    livres.remover(mesma[descartar[:len(mesma)]])
+    novos = partes[~descartar[len(mesma):]]
+    if len(novos):
+        livres.adicionar(novos)
+
+
+def empacotar(dimensoes: np.ndarray, pode_girar: np.ndarray, ordem: np.ndarray,
+              largura_util: float, altura_util: float, heuristica: str = 'guilhotina'):
+    """Encaixa as peças (já com kerf) na ordem dada, abrindo chapas quando preciso
+
+    Retorna (num_chapas, chapa, x, y, girada) por peça, em arrays.
+    """
+    n = len(dimensoes)
+    chapa = np.full(n, -1, dtype=np.int64)
+    x = np.zeros(n)
+    y = np.zeros(n)
+    girada = np.zeros(n, dtype=bool)
+    dividir = _dividir_maxrects if heuristica == 'maxrects' else _dividir_guilhotina
+
+    # Menor lado e menor área entre as peças ainda não encaixadas: retângulos
+    # livres abaixo disso não recebem mais nada e saem da busca
+    lado_restante = np.minimum.accumulate(dimensoes.min(axis=1)[ordem][::-1])[::-1]
+    area_restante = np.minimum.accumulate(dimensoes.prod(axis=1)[ordem][::-1])[::-1]
+
+    livres = _Livres(2 * n + 8)
+    num_chapas = 0
+    for passo, i in enumerate(ordem):
+        if passo % INTERVALO_PODA == 0 and livres.n:
+            f = livres.view()
+            inuteis = ((np.minimum(f[:, 2], f[:, 3]) < lado_restante[passo])
+                       | (f[:, 2] * f[:, 3] < area_restante[passo]))
+            if inuteis.any():
+                livres.remover(np.flatnonzero(inuteis))
+
+        pw, ph = dimensoes[i]
+        posicao = _melhor_posicao(livres, pw, ph, bool(pode_girar[i]))
+        if posicao is None:
+            livres.adicionar(np.array([0.0, 0.0, largura_util, altura_util, num_chapas]))
+            num_chapas += 1
+            posicao = _melhor_posicao(livres, pw, ph, bool(pode_girar[i]))
+            if posicao is None:
+                continue
+
+        indice, gira = posicao
+        if gira:
+            pw, ph = ph, pw
+        fx, fy, _, _, fs = livres.view()[indice]
+        chapa[i], x[i], y[i], girada[i] = int(fs), fx, fy, gira
+        dividir(livres, indice, pw, ph)
+
+    return num_chapas, chapa, x, y, girada
+
+
+def ordenar(dimensoes: np.ndarray, criterio: str = 'area', ruido: Optional[np.ndarray] = None) -> np.ndarray:
+    """Ordem decrescente das peças por área, lado maior ou perímetro"""
+    if criterio == 'lado':
+        chave = dimensoes.max(axis=1)
+    elif criterio == 'perimetro':
+        chave = dimensoes.sum(axis=1)
+    else:
+        chave = dimensoes.prod(axis=1)
+    if ruido is not None:
+        chave = chave * ruido
+    return np.argsort(-chave, kind='stable')
+
+
+def avaliar(dimensoes: np.ndarray, pode_girar: np.ndarray, ordem: np.ndarray,
+            largura_util: float, altura_util: float, heuristica: str):
+    """Executa uma heurística; pontuação = (chapas, área ocupada na última chapa)"""
+    resultado = empacotar(dimensoes, pode_girar, ordem, largura_util, altura_util, heuristica)
+    num_chapas, chapa = resultado[0], resultado[1]
+    ultima = float(dimensoes[chapa == num_chapas - 1].prod(axis=1).sum()) if num_chapas else 0.0
+    return (num_chapas, ultima), resultado, heuristica
+
+
+def buscar(dimensoes: np.ndarray, pode_girar: np.ndarray, largura_util: float, altura_util: float,
+           prazo: float, minimo: int, semente: Optional[int] = None, melhor=None,
+           gulosas: Tuple[Tuple[str, str], ...] = ()):
+    """Busca por ordens aleatórias perturbadas até o prazo (time.time())
+
+    Também é a função executada nos processos da busca paralela: recebe só
+    arrays e escalares. As passadas `gulosas` (ordem sem ruído) são tentadas
+    primeiro. Uma tentativa só começa se a mais demorada até agora ainda
+    caberia antes do prazo. Retorna o melhor (pontuação, resultado,
+    heurística), ou None se o prazo acabou antes da primeira tentativa.
+    """
+    rng = np.random.default_rng(semente)
+    gulosas = list(gulosas)
+    duracao = 0.0
+    while time.time() + duracao < prazo and (melhor is None or melhor[0][0] > minimo):
+        inicio = time.time()
+        if gulosas:
+            criterio, heuristica = gulosas.pop(0)
+            ordem = ordenar(dimensoes, criterio)
+        else:
+            ruido = rng.uniform(0.85, 1.15, len(dimensoes))
+            ordem = ordenar(dimensoes, rng.choice(['area', 'lado', 'perimetro']), ruido)
+            heuristica = rng.choice(HEURISTICAS)
+        candidato = avaliar(dimensoes, pode_girar, ordem, largura_util, altura_util, heuristica)
+        duracao = max(duracao, time.time() - inicio)
+        if melhor is None or candidato[0] < melhor[0]:
+            melhor = candidato
+    return melhor
+
+
+# Pools de processos reaproveitados entre orçamentos, por número de processos
+_EXECUTORES: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _executor(processos: int) -> ProcessPoolExecutor:
+    if processos not in _EXECUTORES:
+        # spawn: o servidor tem várias threads, e fork copiaria locks em uso
+        _EXECUTORES[processos] = ProcessPoolExecutor(max_workers=processos,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+    return _EXECUTORES[processos]
+
+
+def _descartar_executor(processos: int):
+    executor = _EXECUTORES.pop(processos, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class OtimizadorCorte:
+    """Encaixe das peças em chapas padrão (guilhotina e maxrects)
+
+    O kerf (espessura da serra) é somado a cada peça e a chapa útil desconta o
+    refilo das bordas. Peças com veio não giram: o comprimento da peça fica no
+    comprimento da chapa.
+    """
+
+    def __init__(self, comprimento_mm: float, largura_mm: float, kerf_mm: float = 3.0,
+                 refilo_mm: float = 10.0):
+        self.comprimento_mm = comprimento_mm
+        self.largura_mm = largura_mm
+        self.kerf_mm = kerf_mm
+        self.refilo_mm = refilo_mm
+        self.largura_util = comprimento_mm - 2 * refilo_mm + kerf_mm
+        self.altura_util = largura_mm - 2 * refilo_mm + kerf_mm
+
+    def preparar(self, pecas: List[Dict], veio: bool = False) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+        """Peças maiores que a chapa são divididas; retorna peças e arrays (dimensões com kerf, giro)"""
+        cabe_w = self.largura_util - self.kerf_mm
+        cabe_h = self.altura_util - self.kerf_mm
+
+        divididas = []
+        for peca in pecas:
+            comprimento, largura = peca['comprimento_mm'], peca['largura_mm']
+            if veio:
+                # Veio no comprimento da chapa: só o comprimento pode ser dividido
+                partes_c = math.ceil(comprimento / cabe_w)
+                partes_l = math.ceil(largura / cabe_h)
+            elif comprimento <= cabe_w and largura <= cabe_h or comprimento <= cabe_h and largura <= cabe_w:
+                partes_c = partes_l = 1
+            else:
+                partes_c = math.ceil(comprimento / cabe_w)
+                partes_l = math.ceil(largura / cabe_h)
+
+            if partes_c * partes_l == 1:
+                divididas.append(peca)
+                continue
+            for k in range(partes_c * partes_l):
+                divididas.append({
+                    **peca,
+                    'id': f"{peca['id']}_{k + 1}",
+                    'comprimento_mm': round(comprimento / partes_c, 1),
+                    'largura_mm': round(largura / partes_l, 1)
+                })
+
+        dimensoes = np.array([(p['comprimento_mm'], p['largura_mm']) for p in divididas],
+                             dtype=np.float64).reshape(-1, 2) + self.kerf_mm
+        pode_girar = np.full(len(divididas), not veio)
+        return divididas, dimensoes, pode_girar
+
+    def otimizar(self, pecas: List[Dict], veio: bool = False, tempo_limite_s: float = 0.0,
+                 semente: Optional[int] = None) -> Dict:
+        """Melhor plano de corte entre as heurísticas gulosas
+
+        Com tempo_limite_s > 0, continua buscando ordens perturbadas até o
+        prazo (ou até atingir o mínimo teórico de chapas).
+        """
+        pecas, dimensoes, pode_girar = self.preparar(pecas, veio)
+        if not pecas:
+            return self._vazio()
+
+        prazo = time.time() + tempo_limite_s
+        minimo = self._minimo(dimensoes)
+        melhor = self._gulosa(dimensoes, pode_girar)
+        if tempo_limite_s > 0:
+            melhor = buscar(dimensoes, pode_girar, self.largura_util, self.altura_util,
+                            prazo, minimo, semente, melhor)
+
+        _, resultado, heuristica = melhor
+        return self._resultado(pecas, dimensoes, *resultado, heuristica)
+
+    def otimizar_paralelo(self, pecas: List[Dict], veio: bool = False, tempo_limite_s: float = 2.0,
+                          processos: Optional[int] = None, semente: Optional[int] = None) -> Dict:
+        """Busca multi-início em vários processos, com prazo de relógio
+
+        Cada processo recebe só os arrays das peças (dimensões e giro), uma
+        semente própria e sua parte das passadas gulosas; roda-as e busca
+        ordens aleatórias até o prazo, devolvendo o seu melhor plano; fica o
+        de menos chapas. A espera termina assim que um plano atinge o mínimo
+        teórico ou no prazo (mais TOLERANCIA_PRAZO_S), e as buscas restantes
+        são canceladas: o pool é compartilhado entre sessões. Só se o pool
+        falhar ou nada chegar a tempo roda aqui a passada gulosa mais barata.
+        """
+        processos = processos or os.cpu_count() or 1
+        if processos <= 1 or tempo_limite_s <= 0:
+            return self.otimizar(pecas, veio, tempo_limite_s, semente)
+
+        pecas, dimensoes, pode_girar = self.preparar(pecas, veio)
+        if not pecas:
+            return self._vazio()
+
+        prazo = time.time() + tempo_limite_s
+        minimo = self._minimo(dimensoes)
+        sementes = np.random.SeedSequence(semente).generate_state(processos)
+
+        futuros = []
+        try:
+            executor = _executor(processos)
+            futuros = [
+                executor.submit(buscar, dimensoes, pode_girar, self.largura_util, self.altura_util,
+                                prazo, minimo, int(s), gulosas=GULOSAS[i::processos])
+                for i, s in enumerate(sementes)
+            ]
+        except (BrokenProcessPool, OSError, RuntimeError):
+            _descartar_executor(processos)
+
+        melhor = None
+        pendentes = set(futuros)
+        while pendentes and (melhor is None or melhor[0][0] > minimo):
+            restante = max(0.0, prazo + TOLERANCIA_PRAZO_S - time.time())
+            prontos, pendentes = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+            if not prontos:
+                break
+            for futuro in prontos:
+                try:
+                    candidato = futuro.result()
+                except (BrokenProcessPool, OSError, RuntimeError):
+                    _descartar_executor(processos)
+                    continue
+                if candidato is not None and (melhor is None or candidato[0] < melhor[0]):
+                    melhor = candidato
+
+        # Buscas ainda na fila do pool (de outras sessões à frente) não começam mais
+        for futuro in pendentes:
+            futuro.cancel()
+
+        if melhor is None:
+            melhor = self._gulosa(dimensoes, pode_girar, GULOSAS[:1])
+
+        _, resultado, heuristica = melhor
+        return self._resultado(pecas, dimensoes, *resultado, heuristica)
+
+    def _minimo(self, dimensoes: np.ndarray) -> int:
+        """Limite inferior de chapas pela área"""
+        return math.ceil(dimensoes.prod(axis=1).sum() / (self.largura_util * self.altura_util))
+
+    def _gulosa(self, dimensoes: np.ndarray, pode_girar: np.ndarray,
+                gulosas: Tuple[Tuple[str, str], ...] = GULOSAS):
+        """Melhor combinação de ordem (área, lado maior) e heurística"""
+        melhor = None
+        for criterio, heuristica in gulosas:
+            candidato = avaliar(dimensoes, pode_girar, ordenar(dimensoes, criterio),
+                                self.largura_util, self.altura_util, heuristica)
+            if melhor is None or candidato[0] < melhor[0]:
+                melhor = candidato
+        return melhor
+
+    def _vazio(self) -> Dict:
+        return self._resultado([], np.zeros((0, 2)), 0, np.array([], dtype=np.int64),
+                               np.array([]), np.array([]), np.array([], dtype=bool), 'guilhotina')
+
+    def _resultado(self, pecas: List[Dict], dimensoes: np.ndarray, num_chapas: int, chapa: np.ndarray,
+                   x: np.ndarray, y: np.ndarray, girada: np.ndarray, heuristica: str) -> Dict:
+        """Plano de corte: chapas com as posições das peças e o desperdício real"""
+        reais = dimensoes - self.kerf_mm
+        area_pecas_m2 = float(reais[chapa >= 0].prod(axis=1).sum()) / 1e6
+        area_chapas_m2 = num_chapas * self.comprimento_mm * self.largura_mm / 1e6
+
+        chapas = [{'indice': i + 1, 'pecas': [], 'area_pecas_m2': 0.0} for i in range(num_chapas)]
+        for i in np.flatnonzero(chapa >= 0):
+            comprimento, largura = reais[i]
+            if girada[i]:
+                comprimento, largura = largura, comprimento
+            destino = chapas[chapa[i]]
+            destino['pecas'].append({
+                'id': pecas[i]['id'],
+                'componente_id': pecas[i].get('componente_id'),
+                'x_mm': round(float(x[i]) + self.refilo_mm, 1),
+                'y_mm': round(float(y[i]) + self.refilo_mm, 1),
+                'comprimento_mm': round(float(comprimento), 1),
+                'largura_mm': round(float(largura), 1),
+                'girada': bool(girada[i])
+            })
+            destino['area_pecas_m2'] += float(comprimento * largura) / 1e6
+
+        area_chapa_m2 = self.comprimento_mm * self.largura_mm / 1e6
+        for c in chapas:
+            c['aproveitamento'] = round(c['area_pecas_m2'] / area_chapa_m2, 4)
+            c['area_pecas_m2'] = round(c['area_pecas_m2'], 4)
+
+        return {
+            'chapa_mm': [self.comprimento_mm, self.largura_mm],
+            'kerf_mm': self.kerf_mm,
+            'heuristica': heuristica,
+            'num_chapas': num_chapas,
+            'num_pecas': int((chapa >= 0).sum()),
+            'area_pecas_m2': round(area_pecas_m2, 4),
+            'area_chapas_m2': round(area_chapas_m2, 4),
+            'desperdicio': round(1 - area_pecas_m2 / area_chapas_m2, 4) if area_chapas_m2 > 0 else 0.0,
+            'nao_encaixadas': [pecas[i]['id'] for i in np.flatnonzero(chapa < 0)],
+            'chapas': chapas
+        }
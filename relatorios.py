@@ -0,0 +1,297 @@
+"""
+Relatórios de Orçamento - Geração em Blocos para Markdown, CSV, JSON e PDF
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from componentes import para_json
+from plano_corte import iter_pecas
+
+# reportlab é opcional; sem ele não há exportação em PDF (importado só ao gerar um)
+TEM_REPORTLAB = importlib.util.find_spec('reportlab') is not None
+
+# Arquivos de download ficam em memória até este tamanho e depois vão para o disco
+LIMITE_MEMORIA_BYTES = 4 * 1024 * 1024
+
+
+def _percentual(valor: float, total: float) -> float:
+    return valor / total * 100 if total else 0.0
+
+
+def blocos_markdown(orcamento: Dict, cliente: str, ambiente: str,
+                    limite_componentes: Optional[int] = None) -> Iterator[str]:
+    """Relatório detalhado em Markdown, um bloco por seção/componente
+
+    Com `limite_componentes` só os primeiros componentes são detalhados (prévia na tela).
+    """
+    if not orcamento:
+        return
+
+    resumo = orcamento['resumo']
+    total = resumo['total_final']
+    data_atual = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    yield f"""
+# 📋 ORÇAMENTO DETALHADO - ORÇA INTERIORES
+
+**Data:** {data_atual}
+**Cliente:** {cliente}
+**Ambiente:** {ambiente}
+
+---
+
+## 📊 RESUMO EXECUTIVO
+
+• **Área Total:** {resumo['area_total_m2']:.2f} m²
+• **Total de Componentes:** {resumo['total_componentes']}
+• **Valor Total:** R$ {total:,.2f}
+• **Preço por m²:** R$ {resumo['preco_por_m2']:,.2f}
+
+---
+
+## 💰 BREAKDOWN DE CUSTOS
+
+| Item | Valor | Percentual |
+|------|-------|------------|
+| Material | R$ {resumo['custo_material']:,.2f} | {_percentual(resumo['custo_material'], total):.1f}% |
+| Acessórios | R$ {resumo['custo_acessorios']:,.2f} | {_percentual(resumo['custo_acessorios'], total):.1f}% |
+| Corte/Usinagem | R$ {resumo['custo_corte']:,.2f} | {_percentual(resumo['custo_corte'], total):.1f}% |
+| Mão de Obra | R$ {resumo['custo_mao_obra']:,.2f} | {_percentual(resumo['custo_mao_obra'], total):.1f}% |
+| Margem | R$ {resumo['valor_margem']:,.2f} | {_percentual(resumo['valor_margem'], total):.1f}% |
+
+**TOTAL:** R$ {total:,.2f}
+
+---
+
+## 🧩 DETALHAMENTO POR COMPONENTE
+
+"""
+
+    componentes = orcamento.get('componentes', [])
+    for i, comp in enumerate(componentes):
+        if limite_componentes is not None and i >= limite_componentes:
+            yield f"\n*... e mais {len(componentes) - i} componentes no arquivo baixado.*\n\n---\n"
+            break
+
+        partes = [f"""
+### {comp.nome}
+
+• **Tipo:** {comp.tipo.replace('_', ' ').title()}
+• **Área:** {comp.area_m2:.2f} m²
+• **Material:** {comp.material}
+• **Custo Total:** R$ {comp.custo_total:,.2f}
+
+**Breakdown:**
+- Material: R$ {comp.custo_material:,.2f}
+- Acessórios: R$ {comp.custo_acessorios:,.2f}
+- Corte: R$ {comp.custo_corte:,.2f}
+
+"""]
+        if comp.acessorios_detalhados:
+            partes.append("**Acessórios:**\n")
+            for acessorio, info in comp.acessorios_detalhados.items():
+                partes.append(f"- {info['quantidade']}x {acessorio.replace('_', ' ').title()} "
+                              f"@ R$ {info['preco_unitario']:.2f} = R$ {info['custo_total']:.2f}\n")
+        partes.append("\n---\n")
+        yield ''.join(partes)
+
+    configuracoes = orcamento['configuracoes']
+    yield f"""
+
+## ⚙️ CONFIGURAÇÕES UTILIZADAS
+
+• **Material Principal:** {configuracoes.get('material', 'MDF 15mm')}
+• **Tipo de Acessórios:** {configuracoes.get('acessorios', 'Comum').title()}
+• **Complexidade:** {configuracoes.get('complexidade', 'Média').title()}
+• **Margem de Lucro:** {configuracoes.get('margem_lucro', 30)}%
+
+---
+
+## 📝 OBSERVAÇÕES
+
+• Preços baseados na tabela {orcamento.get('fonte_precos', 'Léo Madeiras - Atualizado em 30/06/2025')} (versão {orcamento.get('versao_precos', 1)})
+• Valores incluem desperdício de material conforme padrão da indústria
+• Mão de obra calculada baseada na complexidade do projeto
+• Orçamento válido por 30 dias
+• Não inclui entrega e instalação
+
+---
+
+**Orçamento gerado pelo sistema Orça Interiores SaaS**
+*Sistema Profissional de Orçamento de Marcenaria*
+"""
+
+
+class EscritorRelatorio(ABC):
+    """Formato de download: grava o relatório em um arquivo binário"""
+
+    nome = ''
+    extensao = ''
+    mime = 'text/plain'
+
+    @abstractmethod
+    def escrever(self, destino: BinaryIO, orcamento: Dict, analise: Dict, cliente: str, ambiente: str):
+        """Grava o relatório em `destino`"""
+
+
+class EscritorTexto(EscritorRelatorio):
+    """Formato de texto: o conteúdo é gerado em blocos por `blocos`"""
+
+    @abstractmethod
+    def blocos(self, orcamento: Dict, analise: Dict, cliente: str, ambiente: str) -> Iterator[str]:
+        """Trechos do documento, na ordem"""
+
+    def escrever(self, destino, orcamento, analise, cliente, ambiente):
+        """Grava os blocos em `destino` (UTF-8) sem montar o documento inteiro"""
+        texto = io.TextIOWrapper(destino, encoding='utf-8', newline='')
+        for bloco in self.blocos(orcamento, analise, cliente, ambiente):
+            texto.write(bloco)
+        texto.flush()
+        texto.detach()
+
+
+class EscritorMarkdown(EscritorTexto):
+    nome = 'Markdown'
+    extensao = 'md'
+    mime = 'text/markdown'
+
+    def blocos(self, orcamento, analise, cliente, ambiente):
+        return blocos_markdown(orcamento, cliente, ambiente)
+
+
+class _Linha:
+    """Alvo do csv.writer que devolve a linha formatada em vez de gravá-la"""
+
+    def write(self, linha: str) -> str:
+        return linha
+
+
+class EscritorCSV(EscritorTexto):
+    """Lista de corte: uma linha por peça, com componente, material e chapa do plano"""
+
+    nome = 'CSV (lista de corte)'
+    extensao = 'csv'
+    mime = 'text/csv'
+
+    COLUNAS = ['peca', 'componente', 'tipo', 'material', 'comprimento_mm', 'largura_mm', 'area_m2', 'chapa']
+
+    def blocos(self, orcamento, analise, cliente, ambiente):
+        linha = csv.writer(_Linha(), delimiter=';')
+        componentes = {comp.id: comp for comp in orcamento.get('componentes', [])}
+        chapa_da_peca = {
+            peca['id']: chapa['indice']
+            for chapa in orcamento.get('plano_corte', {}).get('chapas', [])
+            for peca in chapa['pecas']
+        }
+
+        yield linha.writerow(self.COLUNAS)
+        for peca in iter_pecas(analise):
+            comp = componentes.get(peca['componente_id'])
+            yield linha.writerow([
+                peca['id'],
+                comp.nome if comp else '',
+                comp.tipo if comp else '',
+                comp.material if comp else '',
+                peca['comprimento_mm'],
+                peca['largura_mm'],
+                round(peca['comprimento_mm'] * peca['largura_mm'] / 1e6, 4),
+                chapa_da_peca.get(peca['id'], '')
+            ])
+
+
+class EscritorJSON(EscritorTexto):
+    """Análise e orçamento completos (mesmo conteúdo do download antigo)"""
+
+    nome = 'JSON'
+    extensao = 'json'
+    mime = 'application/json'
+
+    def blocos(self, orcamento, analise, cliente, ambiente):
+        return json.JSONEncoder(indent=2, ensure_ascii=False, default=para_json).iterencode({
+            'cliente': cliente,
+            'ambiente': ambiente,
+            'analise': analise,
+            'orcamento': orcamento
+        })
+
+
+class EscritorPDF(EscritorRelatorio):
+    """O relatório em Markdown desenhado como texto simples em páginas A4 (reportlab)"""
+
+    nome = 'PDF'
+    extensao = 'pdf'
+    mime = 'application/pdf'
+
+    MARGEM = 50
+    FONTE = 'Helvetica'
+    TAMANHOS = {'#': 16, '##': 13, '###': 11}
+    TAMANHO_TEXTO = 9
+
+    def escrever(self, destino, orcamento, analise, cliente, ambiente):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.utils import simpleSplit
+        from reportlab.pdfgen import canvas
+
+        largura, altura = A4
+        largura_util = largura - 2 * self.MARGEM
+        pdf = canvas.Canvas(destino, pagesize=A4)
+        y = altura - self.MARGEM
+
+        for bloco in blocos_markdown(orcamento, cliente, ambiente):
+            for linha in bloco.split('\n'):
+                marcador, _, resto = linha.partition(' ')
+                tamanho = self.TAMANHOS.get(marcador, self.TAMANHO_TEXTO)
+                texto = resto if marcador in self.TAMANHOS else linha
+                # Sem marcação Markdown e sem caracteres fora das fontes padrão (emojis)
+                texto = re.sub(r'\*+|^\|-.*|^---$', '', texto).strip()
+                texto = texto.encode('cp1252', 'ignore').decode('cp1252').strip()
+                fonte = f'{self.FONTE}-Bold' if marcador in self.TAMANHOS else self.FONTE
+
+                # Nenhum caractere é mais largo que o corpo da fonte: linha curta não precisa quebrar
+                if len(texto) * tamanho <= largura_util:
+                    trechos = [texto]
+                else:
+                    trechos = simpleSplit(texto, fonte, tamanho, largura_util) or ['']
+
+                for trecho in trechos:
+                    if y < self.MARGEM:
+                        pdf.showPage()
+                        y = altura - self.MARGEM
+                    if trecho:
+                        pdf.setFont(fonte, tamanho)
+                        pdf.drawString(self.MARGEM, y, trecho)
+                    y -= tamanho * 1.4 if trecho else self.TAMANHO_TEXTO * 0.6
+
+        pdf.save()
+
+
+ESCRITORES: Dict[str, EscritorRelatorio] = {
+    'md': EscritorMarkdown(),
+    'csv': EscritorCSV(),
+    'json': EscritorJSON()
+}
+if TEM_REPORTLAB:
+    ESCRITORES['pdf'] = EscritorPDF()
+
+
+def arquivo_relatorio(formato: str, orcamento: Dict, analise: Dict, cliente: str, ambiente: str,
+                      limite_memoria: int = LIMITE_MEMORIA_BYTES) -> SpooledTemporaryFile:
+    """Arquivo do relatório no formato pedido, pronto para leitura (posição 0)"""
+    arquivo = SpooledTemporaryFile(max_size=limite_memoria)
+    ESCRITORES[formato].escrever(arquivo, orcamento, analise, cliente, ambiente)
+    arquivo.seek(0)
+    return arquivo
+
+
+def conteudo_relatorio(formato: str, orcamento: Dict, analise: Dict, cliente: str, ambiente: str) -> bytes:
+    """Bytes do relatório para o st.download_button (não aceita SpooledTemporaryFile)"""
+    with arquivo_relatorio(formato, orcamento, analise, cliente, ambiente) as arquivo:
+        return arquivo.read()